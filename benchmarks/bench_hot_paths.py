@@ -0,0 +1,244 @@
+"""Benchmarks of the lottery and elicitation hot paths: throughput and peak memory, with baseline comparison.
+
+    Run from the repository root:
+
+        python benchmarks/bench_hot_paths.py                          #all cases, results as a table
+        python benchmarks/bench_hot_paths.py --quick -k reduce        #smaller sizes, only the cases matching 'reduce'
+        python benchmarks/bench_hot_paths.py --save baseline.json     #store the results as a baseline
+        python benchmarks/bench_hot_paths.py --compare baseline.json  #exit status 1 if a case got slower or bigger
+        python benchmarks/bench_hot_paths.py --compare baseline.json --max-slowdown 1.1   #fail at 10% slower
+
+    Every case builds its inputs from a fixed seed outside the timed region, so two runs time the same work.
+    A case is run --repeat times and the fastest run is reported (the least disturbed by the rest of the
+    machine); peak memory is measured in one more run under tracemalloc, which would slow the timed runs down.
+    The reduction cache is cleared before every run, so the numbers are for lotteries seen for the first time,
+    except in the warm scalar_api cases, which time repeated calls on lotteries already in the cache.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, NamedTuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) #run from a checkout, no install needed
+
+import numpy as np
+
+from risk_preferences import (cara, certainty_equivalent, clear_reduction_cache, crra, expected_utility, expected_value,
+                              reduce_lottery, risk_premium)
+from risk_preferences.choice import build_holt_laury, holt_laury_choices, lottery_choice
+from risk_preferences.elicitation import build_piecewise_utility, fifty_fifty_ce, stepwise_elicitation
+from risk_preferences.testing import nested_lottery
+
+SEED = 20240601
+RESULTS_FORMAT = 'risk_preferences.bench_hot_paths'
+
+
+class Case(NamedTuple):
+    """One benchmark: setup() builds the inputs (not timed), run(inputs) is timed and handles items units of work."""
+    name: str #unique id, also the key in the saved results
+    setup: Callable
+    run: Callable
+    items: int
+    unit: str
+
+
+def make_lotteries(number, outcomes, depth):
+    rng = random.Random(f"{SEED}-{number}-{outcomes}-{depth}")
+    return [nested_lottery(rng, outcomes, depth) for _ in range(number)]
+
+
+def _lottery_cases(quick):
+    """The single-lottery functions over lottery sizes (outcomes per node) and nesting depths."""
+    number = 200 if quick else 2_000
+    shapes = [(2, 0), (10, 0), (50, 0), (10, 1), (10, 3)] #(outcomes per node, depth)
+    u = cara
+    functions = {
+        'expected_value': lambda lots: [expected_value(lot) for lot in lots],
+        'expected_utility': lambda lots: [expected_utility(lot, u) for lot in lots],
+        'reduce_lottery': lambda lots: [reduce_lottery(lot) for lot in lots],
+        'certainty_equivalent': lambda lots: [certainty_equivalent(lot, u) for lot in lots],
+        'risk_premium': lambda lots: [risk_premium(lot, u) for lot in lots],
+    }
+    cases = []
+    for function_name, function in functions.items():
+        for outcomes, depth in shapes:
+            def setup(outcomes=outcomes, depth=depth):
+                clear_reduction_cache() #cold cache, like a stream of new lotteries
+                return make_lotteries(number, outcomes, depth)
+            cases.append(Case(f"{function_name}[outcomes={outcomes},depth={depth}]", setup, function, number, 'lotteries'))
+    return cases
+
+
+def _scalar_api_cases(quick):
+    """The scalar functions called the way the original code calls them: one lottery at a time, plain cara / crra.
+
+        Small lotteries, so the per-call cost (utility lookup, cache keying) shows and is not hidden by the
+        reduction; with a warm cache it is nearly all that is left.
+    """
+    number = 500 if quick else 5_000
+    functions = {'expected_utility': expected_utility, 'certainty_equivalent': certainty_equivalent, 'risk_premium': risk_premium}
+    cases = []
+    for function_name, function in functions.items():
+        for u in (cara, crra):
+            def run(lots, function=function, u=u):
+                return [function(lot, u) for lot in lots]
+            for outcomes, depth in ((2, 0), (10, 1)):
+                lots = make_lotteries(number, outcomes, depth)
+                def cold(lots=lots):
+                    clear_reduction_cache()
+                    return lots
+                def warm(lots=lots):
+                    run(lots) #fills the reduction cache
+                    return lots
+                for cache, setup in (('cold', cold), ('warm', warm)):
+                    name = f"scalar_api[{function_name},u={u.__name__},{cache},outcomes={outcomes},depth={depth}]"
+                    cases.append(Case(name, setup, run, number, 'lotteries'))
+    return cases
+
+
+def _choice_cases(quick):
+    cases = []
+    for number in ((10, 100, 1_000) if quick else (10, 1_000, 20_000)):
+        def setup(number=number):
+            clear_reduction_cache()
+            return make_lotteries(number, 10, 1)
+        cases.append(Case(f"lottery_choice[menu={number}]", setup, lambda lots: lottery_choice(lots, cara), number, 'lotteries'))
+    for steps in ((10, 100) if quick else (10, 100, 1_000)):
+        rows = build_holt_laury(steps=steps)
+        cases.append(Case(f"holt_laury_choices[rows={steps}]", lambda rows=rows: rows,
+                          lambda rows: holt_laury_choices(rows, u=cara), len(rows), 'rows'))
+    return cases
+
+
+def _elicitation_cases(quick):
+    cases = []
+    def get_ce(low, high): #a CRRA subject with gamma = 0.5 answers every question
+        return float(fifty_fifty_ce('crra', low, high, 0.5))
+    for questions in ((10, 100) if quick else (10, 100, 1_000)):
+        cases.append(Case(f"stepwise_elicitation[questions={questions}]", lambda: None,
+                          lambda _, questions=questions: stepwise_elicitation(1.0, 100.0, questions, get_ce=get_ce),
+                          questions, 'questions'))
+    payoffs = np.linspace(0.0, 110.0, 10_000) #evaluated once per build, so the case also covers using the result
+    for size in ((10, 1_000) if quick else (10, 1_000, 100_000)):
+        def setup(size=size):
+            rng = random.Random(f"{SEED}-points-{size}")
+            xs = sorted(rng.uniform(1.0, 100.0) for _ in range(size))
+            return [(x, 100.0 * math.sqrt(x / 100.0)) for x in xs]
+        cases.append(Case(f"build_piecewise_utility[points={size}]", setup,
+                          lambda points: build_piecewise_utility(points)(payoffs), size, 'points'))
+    return cases
+
+
+def all_cases(quick=False):
+    return _lottery_cases(quick) + _scalar_api_cases(quick) + _choice_cases(quick) + _elicitation_cases(quick)
+
+
+def measure(case, repeat):
+    """Times a case (best of repeat runs) and measures its peak traced memory in one more run.
+
+        returns:
+            dict with seconds, throughput (items per second), items, unit and peak_bytes
+    """
+    best = math.inf
+    for _ in range(repeat):
+        inputs = case.setup()
+        start = time.perf_counter()
+        case.run(inputs)
+        best = min(best, time.perf_counter() - start)
+    inputs = case.setup()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    case.run(inputs)
+    peak = tracemalloc.get_traced_memory()[1] #memory allocated by the run on top of its inputs
+    tracemalloc.stop()
+    return {'seconds': best, 'throughput': case.items / best if best > 0 else math.inf, 'items': case.items,
+            'unit': case.unit, 'peak_bytes': peak}
+
+
+def run_benchmarks(cases, repeat=5, stream=sys.stdout):
+    results = {}
+    print(f"{'case':<66} {'seconds':>10} {'items/s':>12} {'peak KiB':>10}", file=stream)
+    for case in cases:
+        result = results[case.name] = measure(case, repeat)
+        print(f"{case.name:<66} {result['seconds']:>10.5f} {result['throughput']:>12,.0f} {result['peak_bytes'] / 1024:>10.1f}",
+              file=stream, flush=True)
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+            'platform': platform.platform(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results, baseline, threshold=0.2, max_slowdown=1.25, stream=sys.stdout):
+    """Compares results with a stored baseline.
+
+        A case regresses when its time per item grows by more than the ratio max_slowdown (1.25 = 25% slower)
+        or its peak memory grows by more than threshold (0.2 = 20%, and by more than 64 KiB, so tiny
+        allocations do not count).
+
+        returns:
+            list of names of the regressed cases
+    """
+    regressions = []
+    print(f"\n{'case':<66} {'time':>9} {'memory':>9}", file=stream)
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<66} {'new':>9}", file=stream)
+            continue
+        slowdown = base['throughput'] / result['throughput'] #new time per item over the baseline's
+        memory = result['peak_bytes'] / base['peak_bytes'] - 1 if base['peak_bytes'] else 0.0
+        slower = slowdown > max_slowdown
+        bigger = memory > threshold and result['peak_bytes'] - base['peak_bytes'] > 64 * 1024
+        flag = '  REGRESSION' if slower or bigger else ''
+        print(f"{name:<66} {slowdown:>8.2f}x {memory:>+9.1%}{flag}", file=stream)
+        if flag:
+            regressions.append(name)
+    for name in sorted(baseline.keys() - results.keys()):
+        print(f"{name:<66} {'missing':>9}", file=stream)
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the lottery and elicitation hot paths.")
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, for a fast check")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case, the fastest is kept (default: 5)")
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON (a baseline for --compare)")
+    parser.add_argument("--compare", metavar="PATH", help="compare with a baseline saved by --save")
+    parser.add_argument("--max-slowdown", type=float, default=1.25, metavar="RATIO",
+                        help="allowed time per item over the baseline's before --compare fails (default: 1.25)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed memory growth (default: 0.2 = 20%%)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cases = [case for case in all_cases(args.quick) if args.filter in case.name]
+    results = run_benchmarks(cases, args.repeat)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'format': RESULTS_FORMAT, 'quick': args.quick, 'environment': environment(), 'results': results},
+                      f, indent=1)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('quick') != args.quick:
+            print("warning: the baseline was run with different --quick sizes", file=sys.stderr)
+        selected = {name: result for name, result in baseline['results'].items() if args.filter in name}
+        regressions = compare(results, selected, args.threshold, args.max_slowdown)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s).", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Risk preferences and elicitation: utility functions, lotteries, lottery choice and utility elicitation.
+
+    Importing the package has no side effects and does not import NumPy. The plain Python parts
+    (utilities.py, lotteries.py) are loaded right away; the NumPy-backed names below are loaded from
+    their module the first time they are used. The interactive demos run with
+
+        python -m risk_preferences demo
+
+    and lottery files (JSON Lines or CSV) are scored from the command line with
+
+        python -m risk_preferences score lotteries.jsonl --family crra --param gamma=0.5:3:6 --workers 4
+"""
+from .utilities import (as_utility, cara, cara_derivative, cara_inverse, crra, crra_derivative, crra_inverse,
+                        invertible_utility, linear_utility, linear_utility_derivative, linear_utility_inverse, quadratic,
+                        quadratic_derivative, quadratic_inverse)
+from .lotteries import (LotterySummary, certainty_equivalent, clear_reduction_cache, expected_utility, expected_value,
+                        flatten_lottery, input_lottery, lottery_key, lottery_summary, make_random_lotteries, reduce_lottery,
+                        reduction_cache_info, risk_premium, set_reduction_cache_size)
+from .instrumentation import Instrumentation, instrumented
+
+_LAZY_MODULES = { #module -> public names it provides, imported on first use (most of them need NumPy)
+    'families': ['linear_utility_vec', 'cara_vec', 'crra_vec', 'quadratic_vec',
+                 'linear_utility_inverse_vec', 'linear_utility_derivative_vec', 'cara_inverse_vec', 'cara_derivative_vec',
+                 'crra_inverse_vec', 'crra_derivative_vec', 'quadratic_inverse_vec', 'quadratic_derivative_vec',
+                 'UtilityFamily', 'LinearUtility', 'CARAUtility', 'CRRAUtility', 'QuadraticUtility'],
+    'arrays': ['Lottery', 'LotteryBatch', 'lottery_rng', 'make_random_lottery_batch', 'batch_expected_values',
+               'batch_expected_utilities', 'batch_certainty_equivalents', 'batch_risk_premiums'],
+    'streaming': ['iter_random_lottery_batches', 'iter_lottery_chunks', 'evaluate_batch', 'RunningStats',
+                  'stream_lottery_statistics'],
+    'choice': ['lottery_choice', 'build_holt_laury', 'holt_laury_choices', 'holt_laury_eu_matrix',
+               'holt_laury_choice_matrix', 'holt_laury_switch_points', 'holt_laury_thresholds', 'holt_laury_intervals'],
+    'parallel': ['SharedLotteryBatch', 'parallel_sweep', 'parallel_expected_utilities', 'parallel_certainty_equivalents',
+                 'parallel_lottery_choice'],
+    'elicitation': ['width_priority', 'utility_gap_priority', 'width_curvature_priority', 'SegmentScheduler',
+                    'stepwise_elicitation', 'fifty_fifty_ce', 'ElicitationBatchResult', 'simulate_elicitation_batch',
+                    'PiecewiseUtility', 'build_piecewise_utility'],
+    'estimation': ['choice_probabilities', 'simulate_choices', 'RiskFit', 'estimate_risk_parameters'],
+    'lottery_io': ['lottery_from_json', 'lottery_to_json', 'lottery_from_csv_rows', 'lottery_to_csv_rows',
+                   'iter_lottery_file', 'write_lottery_file'],
+    'scoring': ['parse_param_grid', 'score_file'],
+    'store': ['LotteryStore', 'LotteryStoreWriter', 'open_lottery_store', 'write_lottery_store'],
+    'sampling': ['AliasTree', 'MonteCarloResult', 'monte_carlo_evaluate', 'sample_payoffs'],
+    'incremental': ['LotteryHandle'],
+    'dominance': ['DominanceIndex'],
+    'tabulation': ['TabulatedUtility', 'tabulate_utility'],
+}
+_LAZY_NAMES = {name: module for module, names in _LAZY_MODULES.items() for name in names}
+
+__all__ = [
+    'as_utility', 'cara', 'cara_derivative', 'cara_inverse', 'crra', 'crra_derivative', 'crra_inverse',
+    'invertible_utility', 'linear_utility', 'linear_utility_derivative', 'linear_utility_inverse', 'quadratic',
+    'quadratic_derivative', 'quadratic_inverse',
+    'LotterySummary', 'certainty_equivalent', 'clear_reduction_cache', 'expected_utility', 'expected_value',
+    'flatten_lottery', 'input_lottery', 'lottery_key', 'lottery_summary', 'make_random_lotteries', 'reduce_lottery',
+    'reduction_cache_info', 'risk_premium', 'set_reduction_cache_size',
+    'Instrumentation', 'instrumented',
+] + list(_LAZY_NAMES)
+
+
+def __getattr__(name):
+    """Loads the module of a NumPy-backed name the first time the name is used (PEP 562)."""
+    module = _LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value #later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES))
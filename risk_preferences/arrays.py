@@ -0,0 +1,475 @@
+"""Array-backed lotteries (Lottery, LotteryBatch), random lottery batches and the batched evaluations.
+
+    Needs NumPy; the package imports this module the first time one of its names is used.
+"""
+import math
+import time
+
+import numpy as np
+
+from . import instrumentation
+from .families import UtilityFamily
+from .lotteries import _flatten
+
+
+# Array-backed lottery
+# The list-of-dictionaries lottery in lotteries.py costs one dict per outcome. Lottery below stores the same tree in
+# flat NumPy arrays (CSR style): every node (the top lottery and each sub-lottery) owns a contiguous run of
+# entries, and offsets[k]:offsets[k+1] are the entries of node k.
+
+def _utility_of_array(u, payoffs):
+    """Evaluate utility function u on every payoff in a 1-D array.
+
+        Calls u once on the whole array when u is array-aware (like cara_vec), otherwise
+        falls back to calling u(float(x)) for each payoff like the loops in lotteries.py do.
+
+        args:
+            u, utility function over payoffs
+            payoffs, 1-D ndarray of floats
+        returns:
+            utils, 1-D ndarray of floats, u of every payoff
+    """
+    if isinstance(u, UtilityFamily):
+        u._require_scalar_params() #array parameters would broadcast against the payoffs
+    try:
+        utils = np.asarray(u(payoffs), dtype=float) #works for array-aware utility functions
+    except (TypeError, ValueError): #scalar-only functions (math.exp, if m <= 0, ...) fail on arrays
+        utils = None
+    stats = instrumentation._active
+    if utils is None or utils.shape != payoffs.shape: #anything that did not come back one utility per payoff
+        utils = np.fromiter((u(float(x)) for x in payoffs), dtype=float, count=payoffs.size) #one call per payoff
+        if stats is not None:
+            stats.count('utility.calls', payoffs.size)
+    elif stats is not None:
+        stats.count('utility.calls')
+    if stats is not None:
+        stats.count('utility.evaluations', payoffs.size)
+    return utils
+
+
+def _tree_lists(lottery):
+    """Flattens a list-of-dictionaries lottery into the lists (payoffs, probs, children, offsets) of a Lottery."""
+    nodes = [lottery] #nodes waiting to be stored, in the order they are numbered
+    payoffs, probs, children, offsets = [], [], [], [0]
+    k = 0
+    while k < len(nodes): #walks the tree breadth first, so no recursion is needed
+        for outcome in nodes[k]:
+            out = outcome['out']
+            probs.append(float(outcome['prob']))
+            if isinstance(out, list): #sub-lottery, number it and store it later
+                payoffs.append(math.nan)
+                children.append(len(nodes))
+                nodes.append(out)
+            else:
+                payoffs.append(float(out))
+                children.append(-1)
+        offsets.append(len(payoffs)) #end of node k's entries
+        k += 1
+    return payoffs, probs, children, offsets
+
+
+class Lottery:
+    """Compact lottery stored in contiguous arrays.
+
+        Node 0 is the lottery itself; sub-lotteries are numbered after their parents.
+        The entries of node k are offsets[k]:offsets[k+1] and for every entry i:
+            payoffs[i], float payoff (nan when the entry is a sub-lottery)
+            probs[i], float probability of the entry inside its own node
+            children[i], int node number of the sub-lottery, or -1 when the entry is a payoff
+
+        Test case:
+            Lottery.from_dicts([{'out': [{'out': 0, 'prob': 0.5}, {'out': 10, 'prob': 0.5}], 'prob': 0.6}, {'out': 10, 'prob': 0.4}])
+            has payoffs [nan, 10, 0, 10], probs [0.6, 0.4, 0.5, 0.5], children [1, -1, -1, -1] and offsets [0, 2, 4]
+    """
+    __slots__ = ('payoffs', 'probs', 'children', 'offsets') #no per-instance __dict__, just the four arrays
+
+    def __init__(self, payoffs, probs, children=None, offsets=None):
+        self.payoffs = np.asarray(payoffs, dtype=float)
+        self.probs = np.asarray(probs, dtype=float)
+        if children is None: #a simple lottery: every entry is a payoff
+            children = np.full(self.payoffs.size, -1, dtype=np.intp)
+        if offsets is None: #a simple lottery has only node 0
+            offsets = [0, self.payoffs.size]
+        self.children = np.asarray(children, dtype=np.intp)
+        self.offsets = np.asarray(offsets, dtype=np.intp)
+        if not (self.payoffs.shape == self.probs.shape == self.children.shape):
+            raise ValueError("payoffs, probs and children must have the same length.")
+        if self.offsets[-1] != self.payoffs.size:
+            raise ValueError("offsets must end at the number of entries.")
+
+    @classmethod
+    def from_dicts(cls, lottery):
+        """Builds a Lottery from the list-of-dictionaries format.
+
+            args:
+                lottery, list of dictionaries with keys 'out' (payoff or sub-lottery) and 'prob'
+            returns:
+                Lottery with the same outcomes, probabilities and nesting
+        """
+        payoffs, probs, children, offsets = _tree_lists(lottery)
+        return cls(payoffs, probs, children, offsets)
+
+    def to_dicts(self):
+        """Converts back to the list-of-dictionaries format.
+
+            returns:
+                lottery, list of dictionaries with keys 'out' and 'prob' (payoffs come back as floats)
+        """
+        payoffs = self.payoffs.tolist()
+        probs = self.probs.tolist()
+        children = self.children.tolist()
+        offsets = self.offsets.tolist()
+        built = [None] * (len(offsets) - 1)
+        for k in range(len(built) - 1, -1, -1): #children have larger numbers than parents, so build from the back
+            built[k] = [{'out': payoffs[i] if children[i] < 0 else built[children[i]], 'prob': probs[i]}
+                        for i in range(offsets[k], offsets[k + 1])]
+        return built[0]
+
+    def __len__(self):
+        return int(self.offsets[1] - self.offsets[0]) #number of top-level outcomes, like len() of the list format
+
+    def __repr__(self):
+        return f"Lottery(entries={self.payoffs.size}, nodes={self.num_nodes})"
+
+    @property
+    def num_nodes(self):
+        return self.offsets.size - 1
+
+    def is_compound(self):
+        return self.num_nodes > 1
+
+    def leaves(self):
+        """Returns (payoffs, probs) of every payoff entry, with probs multiplied down the tree.
+
+            returns:
+                payoffs, 1-D ndarray of leaf payoffs
+                probs, 1-D ndarray of the probability of reaching each leaf
+        """
+        is_leaf = self.children < 0
+        if not self.is_compound():
+            return self.payoffs, self.probs
+        weight = self.probs.copy() #becomes the probability of reaching each entry
+        for k in range(self.num_nodes): #parents come before children, so each node's weight is ready when it is reached
+            start, stop = self.offsets[k], self.offsets[k + 1]
+            node_children = self.children[start:stop]
+            sub = node_children >= 0
+            if sub.any():
+                child_weight = weight[start:stop][sub]
+                for child, w in zip(node_children[sub], child_weight): #scale the child's entries by the branch probability
+                    weight[self.offsets[child]:self.offsets[child + 1]] *= w
+        return self.payoffs[is_leaf], weight[is_leaf]
+
+    def payoff_range(self):
+        """Returns (lowest payoff, highest payoff) over all leaves."""
+        payoffs = self.payoffs[self.children < 0]
+        return float(payoffs.min()), float(payoffs.max())
+
+    def expected_value(self):
+        payoffs, probs = self.leaves()
+        return float(np.dot(probs, payoffs))
+
+    def expected_utility(self, u):
+        payoffs, probs = self.leaves()
+        return float(np.dot(probs, _utility_of_array(u, payoffs)))
+
+    def reduce(self):
+        """Reduces to a simple Lottery with each payoff once, sorted by payoff (like reduce_lottery)."""
+        payoffs, probs = self.leaves()
+        unique_payoffs, where = np.unique(payoffs, return_inverse=True) #sorted distinct payoffs and where each leaf goes
+        return Lottery(unique_payoffs, np.bincount(where, weights=probs, minlength=unique_payoffs.size))
+
+
+
+class LotteryBatch:
+    """Many lotteries packed into one set of segmented arrays.
+
+        Every lottery is stored as its leaves: lottery j owns payoffs[offsets[j]:offsets[j+1]]
+        and probs[offsets[j]:offsets[j+1]], where probs are the probabilities of reaching each
+        leaf. Lotteries can have different numbers of outcomes (ragged). from_lotteries stores a
+        list-of-dictionaries lottery reduced, each payoff once, and a Lottery as its leaves.
+
+        Test case:
+            LotteryBatch.from_lotteries([[{'out': 0, 'prob': 0.5}, {'out': 10, 'prob': 0.5}], [{'out': 4, 'prob': 1.0}]])
+            has payoffs [0, 10, 4], probs [0.5, 0.5, 1.0] and offsets [0, 2, 3]
+    """
+    __slots__ = ('payoffs', 'probs', 'offsets', '_ids')
+
+    def __init__(self, payoffs, probs, offsets):
+        self.payoffs = np.asarray(payoffs, dtype=float)
+        self.probs = np.asarray(probs, dtype=float)
+        self.offsets = np.asarray(offsets, dtype=np.intp)
+        if self.payoffs.shape != self.probs.shape or self.offsets[-1] != self.payoffs.size:
+            raise ValueError("payoffs and probs must have the same length and offsets must end at that length.")
+        self._ids = None #lottery number of every leaf, built the first time it is needed
+
+    @classmethod
+    def from_lotteries(cls, lotteries):
+        """Packs an iterable of lotteries (list-of-dictionaries or Lottery) once.
+
+            args:
+                lotteries, iterable of lotteries
+            returns:
+                LotteryBatch with one segment per lottery, in the same order
+        """
+        payoffs, probs, offsets = [], [], [0]
+        for lot in lotteries:
+            if isinstance(lot, Lottery):
+                lot_payoffs, lot_probs = lot.leaves()
+                payoffs.extend(lot_payoffs.tolist())
+                probs.extend(lot_probs.tolist())
+            else:
+                payoff_prob, _ev = _flatten(lot) #the same single pass the scalar functions use
+                payoffs.extend(payoff_prob)
+                probs.extend(payoff_prob.values())
+            offsets.append(len(payoffs)) #end of this lottery's segment
+        return cls(payoffs, probs, offsets)
+
+    def __len__(self):
+        return self.offsets.size - 1
+
+    def __repr__(self):
+        return f"LotteryBatch(lotteries={len(self)}, leaves={self.payoffs.size})"
+
+    def __getitem__(self, j):
+        """batch[j] is lottery j as a simple Lottery; batch[start:stop:step] is a LotteryBatch of those lotteries."""
+        if isinstance(j, slice):
+            chosen = np.arange(len(self))[j]
+            sizes = np.diff(self.offsets)[chosen]
+            offsets = np.concatenate(([0], np.cumsum(sizes)))
+            leaves = np.arange(offsets[-1]) + np.repeat(self.offsets[chosen] - offsets[:-1], sizes) #positions of the chosen leaves
+            return LotteryBatch(self.payoffs[leaves], self.probs[leaves], offsets)
+        j = range(len(self))[j] #negative positions count from the end, out of range raises IndexError
+        start, stop = self.offsets[j], self.offsets[j + 1]
+        return Lottery(self.payoffs[start:stop], self.probs[start:stop])
+
+    def lottery_ids(self):
+        """Returns the lottery number of every leaf (0, 0, 1, 1, 1, ...)."""
+        if self._ids is None:
+            self._ids = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        return self._ids
+
+    def segment_sum(self, values):
+        """Adds up a per-leaf array within each lottery, returning one number per lottery."""
+        return np.bincount(self.lottery_ids(), weights=values, minlength=len(self))
+
+    def expected_values(self):
+        return self.segment_sum(self.probs * self.payoffs)
+
+    def expected_utilities(self, u):
+        return self.segment_sum(self.probs * _utility_of_array(u, self.payoffs))
+
+    def payoff_ranges(self):
+        """Returns arrays (low, high) with the smallest and largest payoff of every lottery."""
+        if np.any(np.diff(self.offsets) == 0):
+            raise ValueError("Every lottery needs at least one outcome.")
+        starts = self.offsets[:-1]
+        return np.minimum.reduceat(self.payoffs, starts), np.maximum.reduceat(self.payoffs, starts)
+
+
+def lottery_rng(seed=None, stream=0):
+    """Returns a numpy.random.Generator for one independent stream of random numbers.
+
+        The same (seed, stream) pair gives the same numbers in any process, and different streams
+        of the same seed do not overlap, so worker k of a run can simply use stream=k.
+
+        args:
+            seed, int or None (None draws fresh entropy from the operating system)
+            stream, int >= 0, which stream of the seed to use
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream,)))
+
+
+def make_random_lottery_batch(number=2, max_pay=100, depth=0, negative=False, min_outcomes=2, max_outcomes=10, seed=None, stream=0, rng=None):
+    """Builds random lotteries directly as a LotteryBatch, with NumPy instead of one draw at a time.
+
+        Same recipe as make_random_lotteries: each (sub-)lottery has min_outcomes to max_outcomes
+        outcomes, payoffs are uniform between min_pay and max_pay and probabilities are random
+        weights normalized to sum to one (Dirichlet(1, ..., 1)). With depth > 0 one outcome of
+        each lottery is a sub-lottery, one outcome of that is a sub-sub-lottery, and so on depth
+        levels down; the batch stores the leaves with their probabilities multiplied down the tree.
+
+        args:
+            number = int > 0, number of lotteries.
+            max_pay = float > 0, maximum payoff in lottery.
+            depth = int >= 0, levels of nesting (0 simple lotteries, 1 like compound=True).
+            negative = bool, if False min_pay = 0, if True min_pay = -max_pay.
+            min_outcomes, max_outcomes = int, range of the number of outcomes of each (sub-)lottery.
+            seed, stream = reproducible random stream (see lottery_rng).
+            rng = optional numpy.random.Generator to draw from instead of (seed, stream).
+        returns:
+            LotteryBatch holding the number lotteries
+
+        Test case:
+            len(make_random_lottery_batch(number=1000, depth=2, seed=1)) should return 1000
+    """
+    if rng is None:
+        rng = lottery_rng(seed, stream)
+    min_pay = -float(max_pay) if negative else 0.0 #min_pay will be the negative of max_pay if it's negative
+    max_pay = float(max_pay)
+    ids_parts, payoff_parts, prob_parts = [], [], []
+    branch = np.ones(number) #probability of reaching the current level's (sub-)lottery
+    for level in range(depth + 1):
+        counts = rng.integers(min_outcomes, max_outcomes + 1, size=number) #outcomes of every lottery at this level
+        ids = np.repeat(np.arange(number), counts) #which lottery each outcome belongs to
+        payoffs = rng.uniform(min_pay, max_pay, size=ids.size)
+        weights = rng.standard_exponential(ids.size)
+        probs = weights / np.bincount(ids, weights=weights, minlength=number)[ids] * branch[ids] #normalize within each lottery, then scale by the branch probability
+        if level < depth: #one outcome per lottery becomes the next level's sub-lottery
+            starts = np.cumsum(counts) - counts
+            nested = starts + rng.integers(0, counts) #position of the nested outcome
+            branch = probs[nested]
+            keep = np.ones(ids.size, dtype=bool)
+            keep[nested] = False
+            ids, payoffs, probs = ids[keep], payoffs[keep], probs[keep]
+        ids_parts.append(ids)
+        payoff_parts.append(payoffs)
+        prob_parts.append(probs)
+    ids = np.concatenate(ids_parts)
+    order = np.argsort(ids, kind='stable') #group the leaves of each lottery together, levels in order
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(ids, minlength=number))))
+    return LotteryBatch(np.concatenate(payoff_parts)[order], np.concatenate(prob_parts)[order], offsets)
+
+
+
+# Batched versions: pack many lotteries once, then one vectorized reduction for all of them
+
+def batch_expected_values(lotteries):
+    """Calculate the expected value of every lottery in a collection at once.
+
+        args:
+            lotteries, LotteryBatch or iterable of lotteries (list of dictionaries or Lottery)
+        returns:
+            evs, 1-D ndarray, evs[j] is the expected value of lottery j
+    """
+    if not isinstance(lotteries, LotteryBatch):
+        lotteries = LotteryBatch.from_lotteries(lotteries) #walk the dictionaries only once
+    return lotteries.expected_values()
+
+
+def batch_expected_utilities(lotteries, u):
+    """Calculate the expected utility of every lottery in a collection at once.
+
+        args:
+            lotteries, LotteryBatch or iterable of lotteries (list of dictionaries or Lottery)
+            u, utility function over payoffs (array-aware functions like cara_vec are called once for all payoffs)
+        returns:
+            eus, 1-D ndarray, eus[j] is the expected utility of lottery j
+
+        Test case:
+            batch_expected_utilities([[{'out': 0, 'prob': 0.5}, {'out': 10, 'prob': 0.5}], [{'out': 4, 'prob': 1.0}]], linear_utility_vec)
+            should return array([8.75, 8.0])
+    """
+    if not isinstance(lotteries, LotteryBatch):
+        lotteries = LotteryBatch.from_lotteries(lotteries)
+    return lotteries.expected_utilities(u)
+
+
+
+# Batched certainty equivalents: every lottery's ce is solved at the same time, one lane per lottery
+
+def batch_certainty_equivalents(lotteries, u, tol=1e-9, maxiter=200, eus=None):
+    """ Returns the certainty equivalent of every lottery in a collection.
+
+        Lanes whose ce comes out of u.inverse in closed form are done right away. The other lanes
+        are solved together: each iteration evaluates u once on an array holding the current guess
+        of every unfinished lane, then takes a Newton step (if u.derivative exists and the step stays
+        inside the lane's bracket) or a bisection step. Finished lanes are masked out.
+
+        args:
+            lotteries, LotteryBatch or iterable of lotteries
+            u, utility function over payoffs (array-aware utilities like invertible_utility(cara_vec, a=0.5) are fastest)
+            tol, float, accuracy of the searched certainty equivalents
+            maxiter, int, most iterations for the lanes that are searched
+            eus, optional 1-D ndarray of the expected utilities if they were already computed
+        returns:
+            ces, 1-D ndarray, ces[j] is the certainty equivalent of lottery j
+    """
+    if not isinstance(lotteries, LotteryBatch):
+        lotteries = LotteryBatch.from_lotteries(lotteries)
+    stats = instrumentation._active
+    if stats is not None:
+        stats.count('batch.lotteries', len(lotteries))
+        start = time.perf_counter()
+    if eus is None:
+        eus = lotteries.expected_utilities(u)
+    if stats is not None:
+        stats.add_time('batch.expected_utilities', time.perf_counter() - start)
+        start = time.perf_counter()
+    low, high = lotteries.payoff_ranges() #every lane's ce lies between its lowest and highest payoff
+    ces = np.full(eus.shape, np.nan)
+
+    degenerate = np.abs(high - low) < 1e-12 #only one payoff, ce is that payoff
+    ces[degenerate] = low[degenerate]
+    todo = ~degenerate
+
+    inverse = getattr(u, 'inverse', None)
+    if inverse is not None and todo.any():
+        try:
+            with np.errstate(all='ignore'):
+                guess = np.asarray(_utility_of_array(inverse, eus[todo]), dtype=float) #closed form for every lane at once
+        except (ValueError, OverflowError, ZeroDivisionError):
+            guess = np.full(int(todo.sum()), np.nan)
+        solved = np.isfinite(guess) #lanes outside the inverse's range still need a search
+        lanes = np.flatnonzero(todo)[solved]
+        ces[lanes] = np.clip(guess[solved], low[lanes], high[lanes]) #rounding can push ce a hair outside the payoffs
+        todo[lanes] = False
+
+    lanes = np.flatnonzero(todo)
+    if lanes.size:
+        ces[lanes] = _lockstep_root(u, getattr(u, 'derivative', None), eus[lanes], low[lanes], high[lanes], tol, maxiter)
+    if stats is not None:
+        stats.add_time('batch.solve', time.perf_counter() - start)
+    return ces
+
+
+def _lockstep_root(u, derivative, targets, low, high, tol=1e-9, maxiter=200):
+    """Solves u(x[j]) = targets[j] inside [low[j], high[j]] for every lane j at once (u increasing).
+
+        returns:
+            x, 1-D ndarray of roots
+    """
+    low, high = low.astype(float), high.astype(float) #copies, the brackets shrink in place
+    x = 0.5 * (low + high)
+    active = np.arange(x.size) #lanes still being solved
+    stats = instrumentation._active
+    for _ in range(maxiter):
+        if active.size == 0:
+            break
+        if stats is not None:
+            stats.count('batch.lockstep.iterations')
+        x_act, lo_act, hi_act = x[active], low[active], high[active]
+        gap = _utility_of_array(u, x_act) - targets[active] #one utility call for all unfinished lanes
+        below = gap < 0 #ce is to the right of x in these lanes
+        lo_act = np.where(below, x_act, lo_act)
+        hi_act = np.where(below, hi_act, x_act)
+        x_new = 0.5 * (lo_act + hi_act) #bisection step
+        if derivative is not None:
+            with np.errstate(all='ignore'):
+                slope = np.asarray(_utility_of_array(derivative, x_act), dtype=float)
+                newton = x_act - gap / slope
+            use_newton = (slope > 0) & (newton > lo_act) & (newton < hi_act) #only Newton steps that stay inside the bracket
+            x_new = np.where(use_newton, newton, x_new)
+        exact = gap == 0
+        x_new = np.where(exact, x_act, x_new)
+        done = exact | (np.abs(x_new - x_act) < tol) | ((hi_act - lo_act) < tol)
+        x[active], low[active], high[active] = x_new, lo_act, hi_act
+        active = active[~done] #mask out converged lanes
+    return x
+
+
+def batch_risk_premiums(lotteries, u, tol=1e-9):
+    """ Returns the risk premium of every lottery in a collection.
+
+        rp[j] = expected_value(lottery j) - certainty_equivalent(lottery j, u)
+
+        args:
+            lotteries, LotteryBatch or iterable of lotteries
+            u, utility function over payoffs
+        returns:
+            rps, 1-D ndarray of risk premiums (values within tol of 0 are set to exactly 0.0)
+    """
+    if not isinstance(lotteries, LotteryBatch):
+        lotteries = LotteryBatch.from_lotteries(lotteries) #pack once for both the evs and the ces
+    rps = lotteries.expected_values() - batch_certainty_equivalents(lotteries, u, tol)
+    rps[np.abs(rps) < tol] = 0.0
+    return rps
@@ -0,0 +1,242 @@
+"""Choosing between lotteries: lottery_choice and the Holt-Laury procedure (one row at a time or vectorized)."""
+import numpy as np
+
+from .arrays import LotteryBatch, batch_expected_utilities
+from .utilities import as_utility
+
+
+# Step Five:  Lottery choice function
+
+
+def _best_index(eus):
+    """Returns (index, eu) of the largest expected utility, the first one on ties, ignoring nan.
+        (None, -inf) if there is nothing better than negative infinity, like the original loop."""
+    eus = np.where(np.isnan(eus), -np.inf, eus) #a nan expected utility can never be the best one
+    if eus.size == 0 or eus.max() == -np.inf: #nothing beats negative infinity, same as the old loop
+        return None, float("-inf")
+    best = int(np.argmax(eus)) #argmax returns the first best index when there are ties
+    return best, float(eus[best])
+
+
+def lottery_choice(lottery_list, u):
+    """Calculate expected utility of a lottery
+    
+        arg:
+            lottery_list, list of lotteries (or a LotteryBatch) 
+            u, utility function, returns utility of a payoff outcome (or a utility object such as CARAUtility(a=0.5))
+        
+        returns:
+            lottery_index, eu  expected utility of the lottery
+        
+            the index of the lottery in lottery_list with the highest expected utility and its expected utility value
+    """
+    eus = batch_expected_utilities(lottery_list, as_utility(u)) #expected utility of every lottery in one vectorized pass
+    lottery_index, eu = _best_index(eus)
+    return lottery_index, eu
+
+
+
+# Step Six:  The Holt-Laury procedure
+
+
+
+def build_holt_laury(high_A=6.0, low_A=4.0, high_B=10.0, low_B=1.0, steps=10):
+    """Returns list of Holt-Laury lottery pairs.
+
+        args (the defaults are the standard Holt-Laury menu):
+            high_A, low_A, floats, payoffs of the safer lottery A
+            high_B, low_B, floats, payoffs of the riskier lottery B
+            steps, int, number of rows; prob goes 1/steps, 2/steps, ..., 1.0
+        returns:
+            holt_laury_lotteries, list of lists
+                inner list is a pair of lotteries for choice
+        
+    Each pair has two lotteries, A and B. Lottery A is the safer option,
+    paying 6 with probability prob, else 4. Lottery B is the riskier option,
+    paying 10 with probability prob, else 1. The probability prob varies from
+    0.1 to 1.0 in increments of 0.1 across the 10 pairs.
+    
+    """
+    pairs = [] #starts an empty list to hold all the lottery pairs
+    for prob_increment in range(1, steps+1): #loops through 1 to steps to create probabilities from 1/steps to 1.0
+        prob = prob_increment / float(steps) #with steps=10 this makes the probabilities 0.1,0.2...1.0
+
+        option_A = [
+            {'prob': prob, 'out': high_A}, #lottery A paying 6 with probability prob
+            {'prob': 1-prob, 'out': low_A}, #lottery A paying 4 with probability 1-prob
+        ]
+
+        option_B = [
+            {'prob': prob, 'out': high_B}, #lottery B paying 10 with probability prob
+            {'prob': 1-prob, 'out': low_B}, #lottery B paying 1 with probability 1-prob
+        ]
+
+        pairs.append([option_A, option_B]) #adds the pair of lotteries to the list of pairs
+    return pairs
+
+
+def holt_laury_choices(lottery_list, u = None):
+    """Returns list of lottery choices from lottery_list
+    
+        If u == None, human makes choices, otherwise
+            lottery choice(inner_list, u) makes choices.
+    
+        args:
+            lottery_list = [[lottery, ..., lottery], ..., 
+                            [lottery, ..., lottery]]
+            u, utility function over payoffs, or None
+        returns:
+            lottery_list_choices
+                list of integers, 0 or 1, for each pair in lottery_list
+            
+    """
+    if u is not None: #score every lottery of every row in one vectorized pass, then pick the best in each row
+        eus = batch_expected_utilities([lot for pair in lottery_list for lot in pair], u)
+        choices = []
+        start = 0
+        for pair in lottery_list:
+            idx, _eu = _best_index(eus[start:start + len(pair)]) #same choice lottery_choice(pair, u) makes
+            choices.append(idx)
+            start += len(pair)
+        return choices
+    choices = [] #starts an empty list to hold the choices made
+    for row_idx, pair in enumerate(lottery_list): #Go through each holt laury pair, no utility function is provided so ask the user to make the choice
+        while True: #keeps asking until valid input
+            resp = input(f"Row {row_idx}: choose 0 (left) or 1 (right): ").strip() #asks user to choose which lottery it wants and removes whitespace
+            if resp in ("0", "1"): #checks if input is valid
+                choices.append(int(resp)) #asks user to choose which lottery it wants and appends their choice to the list choices 
+                break
+            else: 
+                print("Please enter 0 or 1.") #prompts user to re-enter if input invalid
+    return choices
+
+
+# Vectorized Holt-Laury engine: every row of a menu for a whole vector of risk parameters in one array operation
+
+def _pack_menu(pairs):
+    """Packs a menu (list of rows, each a list of lotteries) into one LotteryBatch. Returns (batch, options per row)."""
+    sizes = {len(pair) for pair in pairs}
+    if len(sizes) != 1:
+        raise ValueError("Every row of the menu needs the same number of lotteries.")
+    return LotteryBatch.from_lotteries([lot for pair in pairs for lot in pair]), sizes.pop()
+
+
+def holt_laury_eu_matrix(pairs, kernel, param_name, values, chunk_size=100_000):
+    """Expected utility of every lottery of a menu for every parameter value.
+
+        args:
+            pairs, menu from build_holt_laury (or any list of equally long rows of lotteries)
+            kernel, array utility function such as crra_vec or cara_vec
+            param_name, str, 'gamma' for crra_vec, 'a' for cara_vec, ...
+            values, 1-D array of parameter values (one per subject or grid point)
+            chunk_size, int, parameter values per array operation (bounds memory)
+        returns:
+            eus, ndarray of shape (len(values), rows, options per row)
+    """
+    batch, options = _pack_menu(pairs)
+    values = np.atleast_1d(np.asarray(values, dtype=float))
+    eus = np.empty((values.size, len(batch)))
+    for start in range(0, values.size, chunk_size):
+        block = values[start:start + chunk_size, None] #column of parameters against the row of payoffs
+        utils = kernel(batch.payoffs[None, :], **{param_name: block}) #utility of every payoff under every parameter
+        eus[start:start + chunk_size] = np.add.reduceat(utils * batch.probs, batch.offsets[:-1], axis=1)
+    return eus.reshape(values.size, len(pairs), options)
+
+
+def holt_laury_choice_matrix(pairs, kernel, param_name, values, chunk_size=100_000):
+    """Choices (0 = first lottery, 1 = second, ...) of every parameter value in every row.
+
+        Same choices as holt_laury_choices(pairs, u) for each value (ties go to the first lottery).
+
+        returns:
+            choices, int ndarray of shape (len(values), rows)
+
+        Test case:
+            holt_laury_choice_matrix(build_holt_laury(), crra_vec, 'gamma', [0.5])
+            should return array([[0, 0, 0, 0, 0, 1, 1, 1, 1, 1]])
+    """
+    eus = holt_laury_eu_matrix(pairs, kernel, param_name, values, chunk_size)
+    eus = np.where(np.isnan(eus), -np.inf, eus)
+    return np.argmax(eus, axis=2)
+
+
+def holt_laury_switch_points(choices):
+    """Switching row of every subject.
+
+        args:
+            choices, 2-D array (subjects, rows) of 0 (safe) / 1 (risky) choices, or one list of choices
+        returns:
+            switch, int ndarray, index of the first row with the risky choice (= number of safe choices before it;
+                    rows if the subject never switches)
+            consistent, bool ndarray, True if the subject chose safe before the switch and risky from it on
+    """
+    choices = np.atleast_2d(np.asarray(choices))
+    rows = choices.shape[1]
+    risky = choices == 1
+    switch = np.where(risky.any(axis=1), np.argmax(risky, axis=1), rows)
+    consistent = (risky == (np.arange(rows) >= switch[:, None])).all(axis=1)
+    return switch, consistent
+
+
+def holt_laury_thresholds(pairs, kernel, param_name, bounds=(1e-6, 20.0), tol=1e-10, maxiter=200):
+    """Parameter value at which a subject is indifferent in each row of a two-lottery menu.
+
+        A subject with parameter r chooses the first (safer) lottery in row j exactly when r >= thresholds[j].
+        All rows are solved together by bisection inside bounds. A row where the first lottery is chosen
+        everywhere in bounds gets -inf, a row where the second is chosen everywhere gets +inf.
+
+        args:
+            pairs, two-lottery menu (build_holt_laury)
+            kernel, param_name, as in holt_laury_choice_matrix
+            bounds, (low, high) range of parameter values to search
+        returns:
+            thresholds, 1-D ndarray, one per row
+    """
+    batch, options = _pack_menu(pairs)
+    if options != 2:
+        raise ValueError("holt_laury_thresholds needs exactly two lotteries per row.")
+    rows = len(pairs)
+    lottery = batch.lottery_ids()
+    leaf_row = lottery // 2 #row of every leaf
+    leaf_sign = np.where(lottery % 2 == 0, 1.0, -1.0) #+ for the first lottery, - for the second
+
+    def safe_minus_risky(params): #EU(first) - EU(second) in every row, params holds one value per row
+        utils = kernel(batch.payoffs, **{param_name: params[leaf_row]})
+        return np.bincount(leaf_row, weights=leaf_sign * batch.probs * utils, minlength=rows)
+
+    low, high = np.full(rows, float(bounds[0])), np.full(rows, float(bounds[1]))
+    safe_at_low = safe_minus_risky(low) >= 0
+    safe_at_high = safe_minus_risky(high) >= 0
+    search = ~safe_at_low & safe_at_high #risky at the low end, safe at the high end: the switch is inside
+    for _ in range(maxiter):
+        if not search.any() or np.max(high[search] - low[search]) < tol:
+            break
+        mid = 0.5 * (low + high)
+        safe = safe_minus_risky(mid) >= 0
+        high = np.where(search & safe, mid, high)
+        low = np.where(search & ~safe, mid, low)
+    thresholds = np.where(search, high, np.nan)
+    thresholds[safe_at_low] = -np.inf
+    thresholds[~safe_at_low & ~safe_at_high] = np.inf
+    return thresholds
+
+
+def holt_laury_intervals(choices, thresholds):
+    """Implied risk-parameter interval [lower, upper) of every subject from their choices.
+
+        A subject switching at row S chose safe in rows 0..S-1 (so r >= every threshold there) and
+        risky from row S on (so r < every threshold there). Inconsistent subjects get nan bounds.
+
+        args:
+            choices, 2-D array (subjects, rows) of 0/1 choices
+            thresholds, from holt_laury_thresholds for the same menu
+        returns:
+            lower, upper, switch, consistent, 1-D ndarrays (one value per subject)
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    switch, consistent = holt_laury_switch_points(choices)
+    prefix_max = np.concatenate(([-np.inf], np.maximum.accumulate(thresholds))) #prefix_max[S] = max(thresholds[:S])
+    suffix_min = np.concatenate((np.minimum.accumulate(thresholds[::-1])[::-1], [np.inf])) #suffix_min[S] = min(thresholds[S:])
+    lower = np.where(consistent, prefix_max[switch], np.nan)
+    upper = np.where(consistent, suffix_min[switch], np.nan)
+    return lower, upper, switch, consistent
@@ -0,0 +1,65 @@
+"""Command line entry point: python -m risk_preferences <command>."""
+import argparse
+import sys
+import warnings
+
+
+def _demo(args):
+    from .demo import DEMOS, run_demos
+    if args.list:
+        print("\n".join(DEMOS))
+        return 0
+    run_demos(args.names)
+    return 0
+
+
+def _score(args):
+    from .scoring import parse_param_grid, score_file
+    grid = parse_param_grid(args.family, args.param)
+    with warnings.catch_warnings(record=True) as caught: #lotteries with errors, grid points that do not fit the data
+        warnings.simplefilter('always')
+        score_file(args.input, args.output, args.family, grid, args.format, args.output_format, args.workers,
+                   args.chunk_size, args.tol, args.strict, args.range_check)
+    for warning in caught:
+        print(f"python -m risk_preferences score: warning: {warning.message}", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m risk_preferences", description="Risk preferences and elicitation.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    demo = commands.add_parser("demo", help="run the interactive demos of the project")
+    demo.add_argument("names", nargs="*", help="demos to run (default: all of them, in order)")
+    demo.add_argument("--list", action="store_true", help="list the demos and exit")
+    demo.set_defaults(run=_demo)
+
+    score = commands.add_parser("score", help="score every lottery of a JSON Lines or CSV file (EV, EU, CE, risk premium)")
+    score.add_argument("input", help="lottery file, '-' for stdin")
+    score.add_argument("--format", choices=("jsonl", "csv"), help="input format (default: from the file name)")
+    score.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    score.add_argument("--output-format", choices=("jsonl", "csv"), help="output format (default: from the file name, CSV on stdout)")
+    score.add_argument("--family", default="crra", choices=("linear", "cara", "crra", "quadratic"), help="utility family (default: crra)")
+    score.add_argument("--param", action="append", default=[], metavar="NAME=VALUES",
+                       help="parameter values, NAME=v1,v2,... or NAME=start:stop:num; repeat for a grid (default: the family's defaults)")
+    score.add_argument("--workers", type=int, default=1, help="number of processes (0: all cores, default: 1)")
+    score.add_argument("--chunk-size", type=int, default=10_000, help="lotteries per chunk (default: 10000)")
+    score.add_argument("--tol", type=float, default=1e-9, help="certainty equivalent tolerance (default: 1e-9)")
+    score.add_argument("--strict", action="store_true",
+                       help="stop at the first lottery that cannot be scored instead of writing it with an error")
+    score.add_argument("--range-check", action="store_true",
+                       help="check the parameter grid against the file's payoff range first (one more pass over the file)")
+    score.set_defaults(run=_score)
+    return parser
+
+
+def main(argv=None):
+    """Parses argv (sys.argv[1:] if None), runs the command and returns its exit status."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.run(args)
+    except KeyError as e: #unknown demo name
+        parser.error(e.args[0])
+    except (ValueError, OSError) as e: #bad --param, malformed or missing lottery file
+        parser.exit(1, f"{parser.prog} {args.command}: error: {e}\n")
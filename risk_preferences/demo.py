@@ -0,0 +1,163 @@
+"""The interactive demos and test prints of the project, one function per step.
+
+    Run them with `python -m risk_preferences demo` (all of them, in order) or
+    `python -m risk_preferences demo holt_laury elicitation` (only some).
+"""
+from pprint import pprint #import pprint for pretty-printing complex structures
+
+from .lotteries import certainty_equivalent, expected_utility, expected_value, input_lottery, make_random_lotteries, reduce_lottery
+from .utilities import cara, crra, linear_utility, quadratic
+
+
+def utility_demo():
+    # test functions
+
+    m1 = 0
+    m2 = 10
+    p1 = .5
+    p2 = .5
+
+    # test linear_utility function
+    print(linear_utility(m2))
+    print(f"expected value = {p1*m1 + p2*m2}, expected utility = {p1*linear_utility(m1) + p2*linear_utility(m2)}")
+
+    while True:
+        try:
+            m_val = float(input("Enter m (Money/Payoff): "))
+            a_val = float(input("Enter a (> 0, risk-aversion parameter): "))
+            u = cara(m_val, a=a_val)
+            print(f"u(m) = {u}")
+            break
+        except ValueError as e:
+            print(f"Input error: {e}. Please try again.\n")
+
+    while True:
+        try:
+            m_val = float(input("Enter m (> 0, money/wealth): ")) #input for money/wealth converts to float
+            gamma_val = float(input("Enter gamma (> 0, relative risk aversion): ")) #input for gamma converts to float
+            utility = crra(m_val, gamma=gamma_val) #calls crra function with user inputs
+            print(f"u(m) = {utility}") #prints the utility value
+            break #exits the loop if successful
+        except ValueError as e: #catches ValueError exceptions and inputs the error message from above
+            print(f"Input error: {e} Please try again.\n")
+
+    while True:
+        try:
+            m_val = float(input("Enter m (money/payoff): "))
+            a_val = float(input("Enter a (baseline slope): "))
+            b_val = float(input("Enter b (> 0, curvature): "))
+
+            utility = quadratic(m_val, a=a_val, b=b_val)
+            print(f"u(m) = {utility}")
+            break
+        except ValueError as e:
+            print(f"Input error: {e}. Please try again. \n")
+
+
+def lottery_demo():
+    print("Your lottery:", input_lottery())
+
+    pprint(make_random_lotteries())
+    print() #print a blank line for readability
+    pprint(make_random_lotteries(number=3, max_pay=50, compound=True, negative=True))
+
+
+def expected_utility_demo():
+    # Text expected value function
+    lottery = [{'out':0, 'prob':0.5}, {'out':10, 'prob':0.5}]
+    print(f"expected value = {expected_value(lottery)}")
+    compound_lottery = [{'out':lottery, 'prob':0.5}, {'out':10, 'prob':0.5}]
+    print(f"expected value = {expected_value(compound_lottery)}")
+
+    # You can always assign a variable to a function and pass a function to a function.  Here is an example.
+
+    def u(m, f):
+        return f(m)
+
+    m = 10
+    util = linear_utility
+    print(type(util), util)
+
+    print(f"utility of {m} = {u(m, util)}")
+    print('or')
+    print(f"utility of {m} = {u(m, linear_utility)}")
+
+    #Test for the expected utility function
+    lottery = [{'out': 0, 'prob': 0.5}, {'out': 10, 'prob': 0.5}]
+    print(f"expected utility = {expected_utility(lottery, linear_utility)}")
+
+    compound_lottery = [{'out': lottery, 'prob': 0.5}, {'out': 10, 'prob': 0.5}]
+    print(f"expected utility = {expected_utility(compound_lottery, linear_utility)}")
+
+
+def reduction_demo():
+    #example for reduced lottery
+    inside_lottery = [{'out': 0, 'prob': 0.5}, {'out': 10, 'prob': 0.5}]
+
+    outside_lottery = [{'out': inside_lottery, 'prob': 0.6}, {'out': 10, 'prob': 0.4}]
+
+    print(reduce_lottery(outside_lottery))
+
+    #What is happening in the output?
+    #since the walk starts with a weight of 1, it is multiplied by the first probability of 0.6 for the outside lottery, giving 0.6*0.5 = 0.3 for the outcome of 0, and 0.6*0.5 = 0.3 for the outcome of 10 from the inside lottery.
+    #Then, the second outcome of the outside lottery is just a direct outcome of 10 with probability 0.4.
+    #For the final simple lottery, the outcome of 0 has probability 0.3, and the outcome of 10 has total probability 0.3 + 0.4 = 0.7.
+
+
+def certainty_equivalent_demo():
+    #example for certainty equivalent
+    def linear_utility(m, a=5, b=0.75):
+        return a + b*m
+    lottery = [{'out': 0, 'prob': 0.5}, {'out': 10, 'prob': 0.5}]
+
+    print(certainty_equivalent(lottery, linear_utility))
+
+
+def holt_laury_demo():
+    from .choice import build_holt_laury, holt_laury_choices
+    lottery_list = build_holt_laury()
+    def linear_utility(m):
+        return m #simple linear utility function for testing
+    choices = holt_laury_choices(lottery_list, u=linear_utility)
+    print(choices)
+
+
+def elicitation_demo():
+    #Test code for stepwise elicitation and piecewise utility
+    from .elicitation import build_piecewise_utility, stepwise_elicitation
+    points = stepwise_elicitation(min_pay=0.0, max_pay=100.0, num_questions=10, get_ce=None) #runs stepwise elicitation with user input for 10 questions between payoffs 0 and 100
+    print("\nElicited (payoff, U):") #prints header for the elicited points
+    for payoff, utility in points: #loops through each (payoff, utility) tuple in points
+        print(f"({payoff:.6g}, {utility:.6g})") #prints each elicited point with 6 significant digits
+
+    U_hat = build_piecewise_utility(points)
+
+    # Example call to show it works:
+    print("\nExample: U_hat(50) =", U_hat(50.0))
+    print("U_hat(35) =", U_hat(35.0)) #prints the utility at payoff 35 using the piecewise utility function
+
+
+DEMOS = { #name -> demo, in the order of the project steps
+    'utilities': utility_demo,
+    'lotteries': lottery_demo,
+    'expected_utility': expected_utility_demo,
+    'reduction': reduction_demo,
+    'certainty_equivalent': certainty_equivalent_demo,
+    'holt_laury': holt_laury_demo,
+    'elicitation': elicitation_demo,
+}
+
+
+def run_demos(names=None):
+    """Runs the named demos (all of them if names is empty or None) in the order of DEMOS.
+
+        raises:
+            KeyError: for a name that is not in DEMOS
+    """
+    names = list(names or DEMOS)
+    unknown = [name for name in names if name not in DEMOS]
+    if unknown:
+        raise KeyError(f"Unknown demo(s) {unknown}; choose from {list(DEMOS)}.")
+    for name in DEMOS:
+        if name in names:
+            DEMOS[name]()
@@ -0,0 +1,211 @@
+"""Stochastic dominance pruning of lottery menus, for repeated lottery_choice queries.
+
+    A lottery that is first-order stochastically dominated (FSD) by another one is never the best choice of an
+    increasing utility; one that is second-order dominated (SSD) is never the best choice of an increasing concave
+    utility. DominanceIndex reduces every lottery of a menu once, drops the dominated ones and then scores only
+    the surviving frontier for each utility it is asked about.
+
+        index = DominanceIndex(menu)
+        index.choose(CRRAUtility(gamma=0.5))           #same as lottery_choice(menu, u), on the FSD frontier
+        index.choose(cara, order='second')              #u concave too, on the smaller SSD frontier
+        index.choice_matrix(crra_vec, 'gamma', grid)    #one choice per parameter value
+
+    Dominance is tested on the cumulative distribution functions of the reduced lotteries:
+        A FSD B  when F_A(x) <= F_B(x) for every x
+        A SSD B  when the integrals of F_A up to x are <= those of F_B for every x
+    Both differences are step or piecewise linear functions that only change at payoffs of A or B, so testing at
+    those payoffs is exact. All payoffs are ranked on one common grid, so the CDF of any lottery at any payoff is a
+    single searchsorted over the whole index.
+"""
+import numpy as np
+
+from .arrays import LotteryBatch
+from .choice import _best_index
+from .utilities import as_utility
+
+ORDERS = ('first', 'second')
+
+
+class DominanceIndex:
+    """The FSD (and, on first use, SSD) frontier of a menu of lotteries.
+
+        args:
+            lotteries, LotteryBatch or list of lotteries (list of dictionaries or Lottery), the menu
+            tol, float, probability differences below tol count as equal (rounding in the reductions)
+        raises:
+            ValueError: if a lottery has no outcomes
+
+        choose(u) returns the same (index, eu) as lottery_choice(lotteries, u) for every strictly increasing u
+        (order='second': increasing and concave), up to rounding in the expected utilities. Lotteries with the same
+        distribution keep only the first one, so ties still go to the lowest index.
+
+        Test case:
+            index = DominanceIndex([[{'out': 1, 'prob': 1.0}], [{'out': 2, 'prob': 1.0}], [{'out': 0, 'prob': 0.5}, {'out': 4, 'prob': 0.5}]])
+            index.frontier() should return array([1, 2]) and index.frontier('second') array([1])
+    """
+
+    def __init__(self, lotteries, tol=1e-9):
+        batch = lotteries if isinstance(lotteries, LotteryBatch) else LotteryBatch.from_lotteries(lotteries)
+        if np.any(np.diff(batch.offsets) == 0):
+            raise ValueError("Every lottery needs at least one outcome.")
+        self.tol = tol
+        self.size = len(batch)
+
+        #reduce every lottery at once: sort leaves by (lottery, payoff), then merge runs of equal payoffs
+        ids = batch.lottery_ids()
+        order = np.lexsort((batch.payoffs, ids))
+        ids, payoffs, probs = ids[order], batch.payoffs[order], batch.probs[order]
+        first = np.ones(ids.size, dtype=bool)
+        first[1:] = (ids[1:] != ids[:-1]) | (payoffs[1:] != payoffs[:-1])
+        group = np.cumsum(first) - 1
+        self.payoffs = payoffs[first] #reduced lotteries, payoffs sorted inside each lottery
+        self.probs = np.bincount(group, weights=probs)
+        self.ids = ids[first]
+        self.offsets = np.searchsorted(self.ids, np.arange(self.size + 1)) #lottery j owns reduced leaves offsets[j]:offsets[j+1]
+
+        #CDF F and partial mean S = sum of prob * payoff up to each payoff, inside each lottery
+        starts = self.offsets[:-1]
+        self.cdf = self._running_sum(self.probs, starts)
+        self.partial_mean = self._running_sum(self.probs * self.payoffs, starts)
+        self.evs = self.partial_mean[self.offsets[1:] - 1]
+        second_moments = np.add.reduceat(self.probs * self.payoffs ** 2, starts)
+        variances = second_moments - self.evs ** 2
+
+        #common grid: rank of every payoff among all payoffs of the index, and one sorted key per (lottery, rank)
+        grid, self.ranks = np.unique(self.payoffs, return_inverse=True)
+        self.grid_size = grid.size
+        self.keys = self.ids * self.grid_size + self.ranks
+        self._scale = max(1.0, float(np.max(np.abs(grid)))) #SSD differences are in money units, tol is scaled by them
+
+        #candidates in an order in which a dominating lottery comes first: higher mean, then lower variance
+        self._sequence = np.lexsort((np.arange(self.size), variances, -self.evs))
+        self._frontiers = {}
+        self._batches = {}
+        self._frontiers['first'] = self._prune(self._sequence, second=False)
+
+    @staticmethod
+    def _running_sum(values, starts):
+        """Cumulative sum of values restarting at every start."""
+        total = np.cumsum(values)
+        before = np.concatenate(([0.0], total))[starts] #running total before each segment
+        return total - np.repeat(before, np.diff(np.append(starts, values.size)))
+
+    def _leaves(self, lotteries):
+        """Reduced leaf positions of the given lotteries, one range after the other, and the size of each range."""
+        starts, sizes = self.offsets[lotteries], self.offsets[lotteries + 1] - self.offsets[lotteries]
+        ends = np.cumsum(sizes)
+        return np.arange(ends[-1] if ends.size else 0) + np.repeat(starts - (ends - sizes), sizes), sizes
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return f"DominanceIndex(lotteries={self.size}, frontier={self._frontiers['first'].size})"
+
+    def frontier(self, order='first'):
+        """Indices (ascending) of the lotteries not dominated to the given order ('first' or 'second')."""
+        if order not in ORDERS:
+            raise ValueError(f"order must be one of {ORDERS}, not {order!r}.")
+        if order not in self._frontiers: #every SSD-dominated lottery is FSD-dominated or SSD-dominated by the FSD frontier
+            first = self._frontiers['first']
+            sequence = self._sequence[np.isin(self._sequence, first)]
+            self._frontiers[order] = self._prune(sequence, second=True)
+        return self._frontiers[order]
+
+    def frontier_batch(self, order='first'):
+        """LotteryBatch of the reduced frontier lotteries, in the order of frontier(order)."""
+        batch = self._batches.get(order)
+        if batch is None:
+            leaves, sizes = self._leaves(self.frontier(order))
+            batch = self._batches[order] = LotteryBatch(self.payoffs[leaves], self.probs[leaves],
+                                                        np.concatenate(([0], np.cumsum(sizes))))
+        return batch
+
+    def choose(self, u, order='first'):
+        """lottery_choice over the frontier.
+
+            args:
+                u, utility function or utility object; strictly increasing (and concave for order='second')
+                order, 'first' or 'second', the frontier to choose from
+            returns:
+                lottery_index, eu, the index in the original menu of the best lottery and its expected utility
+        """
+        eus = self.frontier_batch(order).expected_utilities(as_utility(u))
+        best, eu = _best_index(eus)
+        return (None if best is None else int(self.frontier(order)[best])), eu
+
+    def choice_matrix(self, kernel, param_name, values, order='first', chunk_size=10_000):
+        """choose for every value of one parameter of an array utility function, in array operations.
+
+            args:
+                kernel, array utility function such as crra_vec or cara_vec
+                param_name, str, 'gamma' for crra_vec, 'a' for cara_vec, ...
+                values, 1-D array of parameter values
+                order, 'first' or 'second', the frontier to choose from
+                chunk_size, int, parameter values per array operation (bounds memory)
+            returns:
+                choices, int ndarray, index in the original menu of the best lottery for each value (ties go to the first)
+        """
+        batch, members = self.frontier_batch(order), self.frontier(order)
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        choices = np.empty(values.size, dtype=int)
+        for start in range(0, values.size, chunk_size):
+            block = values[start:start + chunk_size, None]
+            utils = kernel(batch.payoffs[None, :], **{param_name: block})
+            eus = np.add.reduceat(utils * batch.probs, batch.offsets[:-1], axis=1)
+            choices[start:start + chunk_size] = members[np.argmax(np.where(np.isnan(eus), -np.inf, eus), axis=1)]
+        return choices
+
+    def _at(self, lotteries, ranks):
+        """(F, S) of each lottery in lotteries at the grid payoff of the same position in ranks."""
+        pos = np.searchsorted(self.keys, lotteries * self.grid_size + ranks, side='right') - 1
+        inside = pos >= self.offsets[lotteries] #no payoff of that lottery at or below the point: F = S = 0
+        pos = np.maximum(pos, 0)
+        return np.where(inside, self.cdf[pos], 0.0), np.where(inside, self.partial_mean[pos], 0.0)
+
+    def _prune(self, sequence, second):
+        """Keeps the lotteries of sequence that no other one dominates, testing each against the frontier so far.
+
+            A candidate dominated by a member is dropped; otherwise it joins and drops the members it dominates.
+            Lotteries with equal distributions dominate each other, and the lower index is kept.
+        """
+        tol, tol_ssd = self.tol, self.tol * self._scale
+        offsets, payoffs, ranks, evs = self.offsets, self.payoffs, self.ranks, self.evs
+        members = np.empty(0, dtype=int)
+        for c in sequence:
+            if members.size == 0:
+                members = np.array([c])
+                continue
+            own = np.arange(offsets[c], offsets[c + 1]) #the candidate's reduced leaves, payoffs sorted
+            #quick necessary tests: a member dominating c has (almost) no mass, or no integrated CDF, below c's lowest
+            #payoff; c can only dominate a member with (almost) the same expected value, as members come first in sequence
+            below_f, below_s = self._at(members, np.full(members.size, ranks[own[0]] - 1))
+            below = payoffs[own[0]] * below_f - below_s if second else below_f
+            may_win = below <= (tol_ssd if second else tol)
+            may_lose = evs[c] >= evs[members] - tol_ssd
+            tested = members[may_win | may_lose]
+            if tested.size == 0:
+                members = np.append(members, c)
+                continue
+
+            #exact test at the payoffs of both lotteries of every (member, c) pair
+            leaves, sizes = self._leaves(tested)
+            owner = np.concatenate((np.repeat(np.arange(tested.size), sizes), np.repeat(np.arange(tested.size), own.size)))
+            own_tiled = np.tile(own, tested.size)
+            pos = np.searchsorted(ranks[own], ranks[leaves], side='right') - 1 #the candidate at the members' payoffs
+            c_f = np.where(pos >= 0, self.cdf[own][pos], 0.0)
+            c_s = np.where(pos >= 0, self.partial_mean[own][pos], 0.0)
+            m_f, m_s = self._at(np.repeat(tested, own.size), ranks[own_tiled]) #the members at the candidate's payoffs
+            diff = np.concatenate((self.cdf[leaves] - c_f, m_f - self.cdf[own_tiled])) #F_member - F_c
+            if second: #integrated CDFs instead, x F(x) - S(x)
+                x = np.concatenate((payoffs[leaves], payoffs[own_tiled]))
+                diff = x * diff - np.concatenate((self.partial_mean[leaves] - c_s, m_s - self.partial_mean[own_tiled]))
+            limit = tol_ssd if second else tol
+            member_wins = np.bincount(owner, weights=diff > limit, minlength=tested.size) == 0
+            candidate_wins = np.bincount(owner, weights=diff < -limit, minlength=tested.size) == 0
+            lower = tested < c
+            if np.any(member_wins & (~candidate_wins | lower)):
+                continue #dominated (or equal to a member with a lower index)
+            drop = tested[candidate_wins & (~member_wins | ~lower)]
+            members = np.append(members[~np.isin(members, drop)], c)
+        return np.sort(members)
@@ -0,0 +1,334 @@
+"""Stepwise utility elicitation, simulated subjects and the piecewise linear utility built from the answers."""
+import heapq
+import math
+import time
+from bisect import bisect_right, insort
+from itertools import count
+from typing import Callable, List, NamedTuple, Tuple, Optional #Type hints to improve code readability
+
+import numpy as np
+
+from .arrays import lottery_rng
+
+
+# Step Seven:  Stepwise elicitation algorithm
+
+
+# Segment priorities for the stepwise elicitation: the segment with the largest priority is asked about next.
+# Each one gets (left payoff, right payoff, U(left), U(right)).
+
+def width_priority(left: float, right: float, u_left: float, u_right: float) -> float:
+    """Widest segment first (the original rule)."""
+    return right - left
+
+
+def utility_gap_priority(left: float, right: float, u_left: float, u_right: float) -> float:
+    """Segment with the largest utility difference first."""
+    return u_right - u_left
+
+
+def width_curvature_priority(min_pay: float, max_pay: float, u_min: float = 0.0, u_max: float = 100.0):
+    """Returns a priority: width times how much the segment's slope differs from the straight line U(min_pay) to U(max_pay).
+
+        Segments where the elicited utility bends away from a straight line get split first;
+        for a straight (risk neutral) utility this is the same as width_priority, and so it is when the end
+        points give no slope to compare with (min_pay == max_pay or u_min == u_max).
+    """
+    if max_pay == min_pay or u_max == u_min:
+        return width_priority
+    chord = (u_max - u_min) / (max_pay - min_pay) #slope of the straight line through the end points
+
+    def priority(left: float, right: float, u_left: float, u_right: float) -> float:
+        slope = (u_right - u_left) / (right - left)
+        return (right - left) * (1.0 + abs(slope - chord) / abs(chord))
+    return priority
+
+
+class SegmentScheduler:
+    """Max-heap of payoff segments, so picking the next segment to ask about is O(log n).
+
+        Segments with equal priority come out in the order they were added, like the stable sort
+        the elicitation used before.
+    """
+    def __init__(self, priority: Callable[[float, float, float, float], float] = width_priority):
+        self.priority = priority
+        self._heap = [] #(-priority, order added, left, right); heapq is a min-heap, so priorities are negated
+        self._order = count()
+
+    def push(self, left: float, right: float, u_left: float, u_right: float):
+        heapq.heappush(self._heap, (-self.priority(left, right, u_left, u_right), next(self._order), left, right))
+
+    def pop(self) -> Tuple[float, float]:
+        """Remove and return the (left, right) segment with the largest priority."""
+        _neg_priority, _order, left, right = heapq.heappop(self._heap)
+        return left, right
+
+    def __len__(self):
+        return len(self._heap)
+
+
+def stepwise_elicitation(min_pay: float, max_pay: float, num_questions: int = 10, get_ce: Optional[Callable[[float, float], float]] = None, priority: Optional[Callable[[float, float, float, float], float]] = None):  #Optional... means either none or a function that takes two floats and returns a float. 
+    """
+    Run the stepwise elicitation procedure.
+
+    Args: 
+        min_pay (float): Minimum payoff value (x_min). 
+        max_pay (float): Maximum payoff value. (x_max).
+        num_questions (int): how many CE questions to ask. 
+        get_ce: Function to get certainty equivalent for a given low and high payoff (x, y).
+                If None, prompts user for input.
+        priority: Function priority(x, y, U(x), U(y)) picking which segment to ask about next
+                (largest first). If None, the widest segment (width_priority).
+    
+    Returns:
+        points: a sorted list of (x, U(x)) including min and max and all elicited points.
+        U(min_pay) = 0.0, U(max_pay) = 100.0
+        U(ce) = 0.5*U(x) + 0.5*U(y)
+
+    """
+
+    points = [(min_pay, 0.0), (max_pay, 100.0)] #starts with the min and max payoffs and their utilities 
+    utility_of = {min_pay: 0.0, max_pay: 100.0} #payoff -> utility index of points, for O(1) lookups
+
+    segments = SegmentScheduler(priority or width_priority) #max-heap of segments
+    segments.push(min_pay, max_pay, 0.0, 100.0) #starts with one segment from min to max payoff
+
+    def ask_ce(low_payoff: float, high_payoff: float):
+        """ Ask for certainty equivalent between low_payoff and high_payoff.
+        
+            If get_ce function is provided, use it to get the CE.
+            Otherwise, prompt user for input.
+        """
+        if get_ce is not None: #if a function is provided to get certainty equivalent
+            return float(get_ce(low_payoff, high_payoff)) #calls the provided function to get the certainty equivalent
+        while True:
+            try:
+                resp = float(input(f"Certainty equivalent for lottery [{low_payoff}, 0.5; {high_payoff}, 0.5]? Enter a number between {low_payoff} and {high_payoff}: ")) #asks user for certainty equivalent between low and high payoff
+                if low_payoff <= resp <= high_payoff: #if low payoff is less than or equal to response and response is less than or equal to high payoff
+                    return resp #returns the response
+            except ValueError: 
+                pass #if input is invalid, just passes to the next line
+            print(f"Please enter a number between {low_payoff} and {high_payoff}.") #prompts user to re-enter if input invalid
+
+    def utility_at_exact(payoff_value: float):
+        """
+        Return U(payoff_value) for an already-known payoff in 'points'.
+        Raises ValueError if payoff_val not in points.
+        """
+        try:
+            return utility_of[payoff_value] #dictionary lookup instead of scanning the points
+        except KeyError:
+            raise ValueError(f"utility_at_exact requested for a point not yet in 'points'.") from None #raises error if payoff value not found in points
+    
+    for _ in range(num_questions):
+
+        left_payoff, right_payoff = segments.pop() #gets the segment with the largest priority (the widest by default)
+
+        ce_payoff = ask_ce(left_payoff, right_payoff) #asks for the certainty equivalent between the left and right payoffs
+
+        left_utility, right_utility = utility_at_exact(left_payoff), utility_at_exact(right_payoff)
+        ce_utility = 0.5 * left_utility + 0.5 * right_utility #calculates the utility at the certainty equivalent using the utilities of the left and right payoffs
+
+        insort(points, (ce_payoff, ce_utility), key=lambda p: p[0]) #inserts the new point in payoff order (after any equal payoff, like a stable sort)
+        utility_of.setdefault(ce_payoff, ce_utility) #an earlier point with the same payoff keeps its utility
+
+        if ce_payoff - left_payoff > 1e-9: #if the new certainty equivalent is significantly greater than the left payoff
+            segments.push(left_payoff, ce_payoff, left_utility, ce_utility) #adds a new segment from left payoff to certainty equivalent
+        if right_payoff - ce_payoff > 1e-9: #if the new certainty equivalent is significantly less than the right payoff
+            segments.push(ce_payoff, right_payoff, ce_utility, right_utility) #adds a new segment from certainty equivalent to right payoff
+    return points
+
+
+# Simulated subjects: many stepwise elicitations run together on arrays, one lane per subject.
+
+def fifty_fifty_ce(family: str, low, high, param):
+    """Certainty equivalent of the lottery [low, 0.5; high, 0.5] for a CARA, CRRA or linear subject.
+
+        cara:   ce = low - ln(0.5 + 0.5*exp(-a*(high - low))) / a
+        crra:   ce = (0.5*low^(1-gamma) + 0.5*high^(1-gamma))^(1/(1-gamma)),  sqrt(low*high) if gamma == 1
+        linear: ce = (low + high) / 2
+
+        Works on floats or on arrays (one value per subject).
+    """
+    low = np.asarray(low, dtype=float)
+    high = np.asarray(high, dtype=float)
+    param = np.asarray(param, dtype=float)
+    if family == 'cara':
+        return low - np.log(0.5 + 0.5 * np.exp(-param * (high - low))) / param #written around low so exp never overflows
+    if family == 'crra':
+        one_minus_gamma = 1 - param
+        is_log = one_minus_gamma == 0
+        safe = np.where(is_log, 1.0, one_minus_gamma)
+        with np.errstate(divide='ignore'):
+            power_mean = (0.5 * low ** safe + 0.5 * high ** safe) ** (1 / safe)
+        return np.where(is_log, np.sqrt(low * high), power_mean)
+    if family == 'linear':
+        return 0.5 * (low + high) + 0 * param #+ 0 * param only broadcasts to one value per subject
+    raise ValueError(f"Unknown family {family!r}; use 'cara', 'crra' or 'linear'.")
+
+
+class ElicitationBatchResult(NamedTuple):
+    points: np.ndarray #shape (subjects, num_questions + 2, 2), each subject's (payoff, U) points sorted by payoff
+    params: np.ndarray #risk parameter of every subject
+    seconds: float #time spent in the elicitation loop
+    subjects_per_second: float
+    questions_per_second: float
+
+
+def simulate_elicitation_batch(n_subjects: int, family: str = 'cara', params=None, param_median: Optional[float] = None, param_sigma: float = 0.5,
+                               noise_sd: float = 0.0, min_pay: float = 0.0, max_pay: float = 100.0, num_questions: int = 10,
+                               seed=None, stream: int = 0) -> ElicitationBatchResult:
+    """Runs stepwise_elicitation for a whole population of simulated subjects at once.
+
+        Every subject answers with the certainty equivalent of its own utility (fifty_fifty_ce) plus
+        optional noise; all subjects' next answers are computed in one vectorized call per question.
+        Segments are picked widest first, ties in the order they were made, exactly like
+        stepwise_elicitation, so a subject without noise gets the same points as
+        stepwise_elicitation(min_pay, max_pay, num_questions, get_ce=...) with its true ce.
+
+        args:
+            n_subjects (int): number of simulated subjects.
+            family (str): 'cara', 'crra' or 'linear'.
+            params: optional array of each subject's parameter (a or gamma); otherwise drawn
+                    lognormal with median param_median and log standard deviation param_sigma.
+            noise_sd (float): standard deviation of the answer noise, as a fraction of the segment width
+                    (answers are clipped to the segment).
+            min_pay, max_pay, num_questions: as in stepwise_elicitation (CRRA needs min_pay > 0).
+            seed, stream: random stream (see lottery_rng).
+        returns:
+            ElicitationBatchResult with the 3-D points array, the parameters and throughput numbers.
+            A subject that runs out of segments wider than 1e-9 gets nan points for the remaining questions.
+    """
+    rng = lottery_rng(seed, stream)
+    if params is None:
+        default_median = {'cara': 0.03, 'crra': 0.5, 'linear': 1.0}[family]
+        params = (param_median or default_median) * np.exp(param_sigma * rng.standard_normal(n_subjects))
+    params = np.broadcast_to(np.asarray(params, dtype=float), (n_subjects,)).copy()
+    if family == 'crra' and min_pay <= 0:
+        raise ValueError("CRRA subjects need min_pay > 0.")
+
+    start_time = time.perf_counter()
+    subjects = np.arange(n_subjects)
+    slots = 2 * num_questions + 1 #every question closes one segment and opens at most two
+    left = np.full((n_subjects, slots), np.nan)
+    right = np.full((n_subjects, slots), np.nan)
+    u_left = np.zeros((n_subjects, slots))
+    u_right = np.zeros((n_subjects, slots))
+    open_ = np.zeros((n_subjects, slots), dtype=bool) #which segments are still waiting to be asked about
+    left[:, 0], right[:, 0], u_right[:, 0], open_[:, 0] = min_pay, max_pay, 100.0, True
+
+    points = np.full((n_subjects, num_questions + 2, 2), np.nan)
+    points[:, 0] = (min_pay, 0.0)
+    points[:, 1] = (max_pay, 100.0)
+
+    for q in range(num_questions):
+        width = np.where(open_, right - left, -np.inf)
+        pick = np.argmax(width, axis=1) #widest open segment; argmax takes the first (oldest) one on ties
+        has_segment = open_[subjects, pick]
+        seg_left, seg_right = left[subjects, pick], right[subjects, pick]
+        seg_u_left, seg_u_right = u_left[subjects, pick], u_right[subjects, pick]
+        open_[subjects, pick] = False
+
+        ce = fifty_fifty_ce(family, seg_left, seg_right, params) #every subject's answer in one call
+        if noise_sd > 0:
+            ce = np.clip(ce + noise_sd * (seg_right - seg_left) * rng.standard_normal(n_subjects), seg_left, seg_right)
+        ce_utility = 0.5 * seg_u_left + 0.5 * seg_u_right
+        points[:, q + 2, 0] = np.where(has_segment, ce, np.nan)
+        points[:, q + 2, 1] = np.where(has_segment, ce_utility, np.nan)
+
+        new_left, new_right = 2 * q + 1, 2 * q + 2 #new segments go at the end, so slot order is the order they were made
+        left[:, new_left], right[:, new_left] = seg_left, ce
+        u_left[:, new_left], u_right[:, new_left] = seg_u_left, ce_utility
+        open_[:, new_left] = has_segment & (ce - seg_left > 1e-9)
+        left[:, new_right], right[:, new_right] = ce, seg_right
+        u_left[:, new_right], u_right[:, new_right] = ce_utility, seg_u_right
+        open_[:, new_right] = has_segment & (seg_right - ce > 1e-9)
+
+    order = np.argsort(points[:, :, 0], axis=1, kind='stable') #sort every subject's points by payoff (nan last)
+    points = np.take_along_axis(points, order[:, :, None], axis=1)
+    seconds = time.perf_counter() - start_time
+    per_second = 1.0 / seconds if seconds > 0 else math.inf
+    return ElicitationBatchResult(points, params, seconds, n_subjects * per_second, n_subjects * num_questions * per_second)
+
+
+class PiecewiseUtility:
+    """Piecewise linear utility through elicited (payoff, utility) points, clamped outside the points.
+
+        The breakpoints and the slope of every segment are computed once, so a call is one binary
+        search (bisect) for a single payoff, or one numpy.interp for an array of payoffs.
+        It also has inverse and derivative, so certainty_equivalent can solve u(ce) = eu directly.
+
+        If the same payoff appears more than once, the first point for it is used.
+    """
+    __slots__ = ('payoffs', 'utilities', 'slopes', '_xs', '_us', '_slopes', '_inverse_us', '_inverse_xs')
+
+    def __init__(self, points: List[Tuple[float, float]]):
+        sorted_points = sorted(points, key=lambda p: p[0]) #sorts the points by payoff value
+        if not sorted_points:
+            raise ValueError("build_piecewise_utility needs at least one point.")
+        xs, us = [], []
+        for payoff, utility_value in sorted_points:
+            if xs and payoff == xs[-1]: #repeated payoff, keep the first one
+                continue
+            xs.append(float(payoff))
+            us.append(float(utility_value))
+        self._xs, self._us = xs, us #lists for the single-payoff path (bisect on a list is faster than numpy for one value)
+        self._slopes = [(u_right - u_left) / (x_right - x_left) for x_left, x_right, u_left, u_right in zip(xs, xs[1:], us, us[1:])]
+        self.payoffs = np.array(xs)
+        self.utilities = np.array(us)
+        self.slopes = np.array(self._slopes)
+
+        inverse_us, inverse_xs = [], [] #points where utility goes up, used to invert
+        for payoff, utility_value in zip(xs, us):
+            if not inverse_us or utility_value > inverse_us[-1]:
+                inverse_us.append(utility_value)
+                inverse_xs.append(payoff)
+        self._inverse_us, self._inverse_xs = inverse_us, inverse_xs
+
+    def __call__(self, payoff):
+        if np.ndim(payoff) > 0: #array of payoffs, one interpolation for all of them
+            return np.interp(payoff, self.payoffs, self.utilities)
+        xs = self._xs
+        if payoff <= xs[0]: #if the payoff is less than or equal to the minimum payoff in the points
+            return self._us[0]
+        if payoff >= xs[-1]: #if the payoff is greater than or equal to the maximum payoff in the points
+            return self._us[-1]
+        i = bisect_right(xs, payoff) - 1 #segment xs[i] <= payoff < xs[i+1]
+        return self._us[i] + self._slopes[i] * (payoff - xs[i])
+
+    def inverse(self, util):
+        """Smallest payoff with U_hat(payoff) == util (clamped to the elicited range).
+
+            Points where the utility does not go up are skipped, so this is exact for increasing utilities.
+        """
+        if np.ndim(util) > 0:
+            return np.interp(util, self._inverse_us, self._inverse_xs)
+        us, xs = self._inverse_us, self._inverse_xs
+        if util <= us[0]:
+            return xs[0]
+        if util >= us[-1]:
+            return xs[-1]
+        i = bisect_right(us, util) - 1
+        return xs[i] + (util - us[i]) * (xs[i + 1] - xs[i]) / (us[i + 1] - us[i])
+
+    def derivative(self, payoff):
+        """Slope of the segment containing payoff (0 outside the elicited range)."""
+        if np.ndim(payoff) > 0:
+            payoff = np.asarray(payoff, dtype=float)
+            i = np.searchsorted(self.payoffs, payoff, side='right') - 1
+            padded = np.append(self.slopes, 0.0) #slope 0 right of the last point
+            return np.where(i >= 0, padded[np.clip(i, 0, padded.size - 1)], 0.0)
+        i = bisect_right(self._xs, payoff) - 1
+        return self._slopes[i] if 0 <= i < len(self._slopes) else 0.0
+
+    def __repr__(self):
+        return f"PiecewiseUtility(points={len(self._xs)})"
+
+
+def build_piecewise_utility(points: List[Tuple[float, float]]):
+    """ 
+    Given a sorted list of (payoff, utility_value) points, return a function U_hat(payoff) that linearly interpolates between the points and clamps outside the range.
+
+    U_hat is a PiecewiseUtility: it also accepts arrays of payoffs and has U_hat.inverse and U_hat.derivative.
+    """
+    return PiecewiseUtility(points)
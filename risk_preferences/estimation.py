@@ -0,0 +1,197 @@
+"""Maximum-likelihood estimation of CRRA/CARA risk parameters from binary lottery choices."""
+from typing import NamedTuple
+
+import numpy as np
+
+from .arrays import lottery_rng
+from .choice import _pack_menu
+
+
+# Step Eight: Estimating risk parameters from choice data
+# Every subject chooses between the two lotteries of each row of a menu (for example build_holt_laury()).
+# With a Fechner (logit) error a subject with risk parameter r and noise mu picks the second lottery with
+# probability 1 / (1 + exp(-(EU_B - EU_A) / mu)). estimate_risk_parameters fits (r, mu) for all subjects at once:
+# the log likelihood and its analytic gradient are array expressions over (subjects, rows), and a damped Newton
+# (Fisher scoring) step moves every subject at once, only re-evaluating the subjects that have not converged yet.
+# r and mu are searched on a log scale and clipped to their bounds, so they stay positive.
+
+def _utility_and_param_derivative(family: str, m, param):
+    """Utility of payoffs m and its derivative with respect to the risk parameter (arrays broadcast together).
+
+        family 'cara': u = 1 - exp(-a*m), du/da = m*exp(-a*m)
+        family 'crra': u = (m^(1-gamma) - 1) / (1 - gamma), du/dgamma = -du/dc with c = 1 - gamma
+    """
+    if family == 'cara':
+        return -np.expm1(-param * m), m * np.exp(-param * m)
+    if family == 'crra':
+        log_m = np.log(m)
+        c_log_m = (1.0 - param) * log_m
+        small = np.abs(c_log_m) < 1e-4 #near gamma == 1 the closed forms lose precision, use their series instead
+        safe_c = np.where(small, 1.0, 1.0 - param)
+        util = np.where(small, log_m * (1 + c_log_m / 2 + c_log_m**2 / 6), np.expm1(c_log_m) / safe_c)
+        d_c = np.where(small, log_m**2 * (0.5 + c_log_m / 3 + c_log_m**2 / 8),
+                       (c_log_m * np.exp(c_log_m) - np.expm1(c_log_m)) / safe_c**2)
+        return util, -d_c
+    raise ValueError(f"Unknown family {family!r}; use 'cara' or 'crra'.")
+
+
+def _menu_design(pairs, family: str):
+    """Packs a two-lottery menu once. Returns (payoffs of all leaves, weights) with (utilities @ weights) = EU_B - EU_A per row."""
+    batch, options = _pack_menu(pairs)
+    if options != 2:
+        raise ValueError("Choice data needs exactly two lotteries per row.")
+    if family == 'crra' and np.any(batch.payoffs <= 0):
+        raise ValueError("CRRA estimation needs every payoff > 0.")
+    lottery = batch.lottery_ids()
+    weights = np.zeros((len(batch.payoffs), len(pairs)))
+    weights[np.arange(len(lottery)), lottery // 2] = np.where(lottery % 2 == 1, batch.probs, -batch.probs)
+    return batch.payoffs, weights
+
+
+def _choice_log_likelihood(payoffs, weights, family, choices, observed, log_param, log_noise):
+    """Log likelihood of every choice with what the Newton step needs, for (log r, log mu) of every subject.
+
+        returns:
+            ll, (subjects, rows) array, 0 where the choice is missing
+            slope, (subjects, rows) array, d ll / dz where z = (EU_B - EU_A) / mu
+            grad_z, (subjects, rows, 2) array, dz/d(log r) and dz/d(log mu)
+            info, (subjects, rows) array, P(A) * P(B), the Fisher information of z in each choice
+    """
+    param = np.exp(log_param)[:, None]
+    noise = np.exp(log_noise)[:, None]
+    util, d_util = _utility_and_param_derivative(family, payoffs[None, :], param)
+    z = (util @ weights) / noise #EU difference in noise units
+    d_z = (d_util @ weights) * param / noise #chain rule through r = exp(log r)
+    sign = np.where(choices == 1, 1.0, -1.0)
+    q = sign * z
+    ll = np.where(observed, -np.logaddexp(0.0, -q), 0.0) #log of the logistic probability of the observed choice
+    slope = np.where(observed, sign * np.exp(-np.logaddexp(0.0, q)), 0.0) #sign * (1 - P(observed choice))
+    info = np.where(observed, np.exp(-np.logaddexp(0.0, q) - np.logaddexp(0.0, -q)), 0.0)
+    grad_z = np.broadcast_to(np.stack((d_z, -z), axis=-1), q.shape + (2,)) #dz/d(log mu) = -z
+    return ll, slope, grad_z, info
+
+
+def choice_probabilities(pairs, family: str, params, noise):
+    """Probability that each subject picks the second lottery of every row under the Fechner (logit) model.
+
+        args:
+            pairs, two-lottery menu
+            family, 'cara' or 'crra'
+            params, noise, 1-D arrays (or floats), one risk parameter and one noise level per subject
+        returns:
+            probs, (subjects, rows) array
+    """
+    payoffs, weights = _menu_design(pairs, family)
+    params, noise = np.broadcast_arrays(np.atleast_1d(np.asarray(params, dtype=float)), np.atleast_1d(np.asarray(noise, dtype=float)))
+    util, _ = _utility_and_param_derivative(family, payoffs[None, :], params[:, None])
+    return np.exp(-np.logaddexp(0.0, -(util @ weights) / noise[:, None]))
+
+
+def simulate_choices(pairs, family: str, params, noise, seed=None, stream: int = 0):
+    """Draws the 0 (first lottery) / 1 (second lottery) choices of simulated subjects from choice_probabilities."""
+    probs = choice_probabilities(pairs, family, params, noise)
+    return (lottery_rng(seed, stream).random(probs.shape) < probs).astype(int)
+
+
+class RiskFit(NamedTuple):
+    params: np.ndarray #estimated risk parameter (a for cara, gamma for crra), one per subject (one in total if pooled)
+    noise: np.ndarray #estimated Fechner noise mu
+    log_likelihood: np.ndarray #maximized log likelihood
+    std_errors: np.ndarray #(subjects, 2) standard errors of (params, noise) from the inverse Fisher information
+    converged: np.ndarray #False where the iteration limit was hit
+    iterations: int
+
+
+def estimate_risk_parameters(pairs, choices, family: str = 'crra', start=None, noise_start=None, fixed_noise=None,
+                             param_bounds=None, noise_bounds=(1e-6, 1e3), pooled: bool = False, tol: float = 1e-10,
+                             maxiter: int = 200) -> RiskFit:
+    """Maximum-likelihood fit of every subject's risk parameter and noise from binary choices, all subjects at once.
+
+        args:
+            pairs, two-lottery menu every subject answered (build_holt_laury() or any list of [A, B] rows)
+            choices, (subjects, rows) array of 0 (chose A) / 1 (chose B); any other value (-1, nan) counts as missing
+            family, 'crra' (estimates gamma) or 'cara' (estimates a)
+            start, noise_start, optional starting values (default: middle of the usual range, and the spread of
+                    the EU differences at the starting parameter)
+            fixed_noise, optional float: keep mu at this value and only fit the risk parameter
+            param_bounds, noise_bounds, (low, high) clipping ranges
+            pooled, bool, fit one (r, mu) to all subjects together
+            tol, stop when the Newton decrement g' I^-1 g of a subject drops below tol (I = Fisher information)
+        returns:
+            RiskFit (NamedTuple) with one entry per subject (or one entry if pooled)
+
+        raises:
+            ValueError: for an unknown family, a menu without exactly two lotteries per row, or CRRA with payoffs <= 0
+
+        Test case:
+            pairs = build_holt_laury()
+            choices = simulate_choices(pairs, 'crra', np.full(2000, 0.6), 0.05, seed=1)
+            estimate_risk_parameters(pairs, choices, 'crra', pooled=True).params should be close to array([0.6])
+    """
+    payoffs, weights = _menu_design(pairs, family)
+    choices = np.atleast_2d(np.asarray(choices, dtype=float))
+    if choices.shape[1] != len(pairs):
+        raise ValueError("choices needs one column per row of the menu.")
+    observed = (choices == 0) | (choices == 1)
+    if param_bounds is None:
+        param_bounds = {'crra': (0.01, 10.0), 'cara': (1e-4, 5.0)}.get(family, (1e-4, 10.0))
+    if start is None:
+        start = {'crra': 0.5, 'cara': 0.1}.get(family, 0.5)
+    groups = 1 if pooled else choices.shape[0]
+
+    if fixed_noise is not None:
+        noise_start = fixed_noise
+    elif noise_start is None: #spread of the EU differences at the starting parameter sets the scale of the noise
+        util, _ = _utility_and_param_derivative(family, payoffs, start)
+        noise_start = max(float(np.std(util @ weights)), 1e-3)
+    theta = np.empty((groups, 2))
+    theta[:, 0] = np.log(np.clip(start, *param_bounds))
+    theta[:, 1] = np.log(np.clip(noise_start, *noise_bounds))
+    low = np.log([param_bounds[0], noise_bounds[0]])
+    high = np.log([param_bounds[1], noise_bounds[1]])
+    free = 1 if fixed_noise is not None else 2 #number of parameters being fitted
+
+    def evaluate(theta, subjects): #total log likelihood, gradient and Fisher information of the given groups
+        rows = slice(None) if pooled else subjects
+        ll, slope, grad_z, info = _choice_log_likelihood(payoffs, weights, family, choices[rows], observed[rows], theta[:, 0], theta[:, 1])
+        grad_z = grad_z[..., :free]
+        if pooled:
+            return (np.array([ll.sum()]), np.einsum('nr,nri->i', slope, grad_z)[None],
+                    np.einsum('nr,nri,nrj->ij', info, grad_z, grad_z)[None])
+        return ll.sum(axis=1), np.einsum('nr,nri->ni', slope, grad_z), np.einsum('nr,nri,nrj->nij', info, grad_z, grad_z)
+
+    eye = np.eye(free)
+    def newton_step(grad, fisher): #ridge keeps the matrix invertible when a subject's choices say nothing about a parameter
+        ridge = 1e-10 * np.trace(fisher, axis1=1, axis2=2)[:, None, None] + 1e-300
+        return np.linalg.solve(fisher + ridge * eye, grad[..., None])[..., 0]
+
+    ll, grad, fisher = evaluate(theta, np.arange(groups))
+    converged = np.zeros(groups, dtype=bool)
+    iterations = 0
+    for iterations in range(1, maxiter + 1):
+        step = newton_step(grad, fisher)
+        converged |= (grad * step).sum(axis=1) < tol
+        active = np.flatnonzero(~converged) #only these groups are evaluated from here on
+        if active.size == 0:
+            break
+        step, scale = step[active], np.ones(active.size)
+        for _ in range(40): #step halving, separately for every group, until the likelihood does not fall
+            trial = theta[active].copy()
+            trial[:, :free] = np.clip(trial[:, :free] + scale[:, None] * step, low[:free], high[:free])
+            trial_ll, trial_grad, trial_fisher = evaluate(trial, active)
+            accept = trial_ll >= ll[active]
+            stuck = np.all(np.abs(trial - theta[active]) < 1e-14, axis=1) #clipped at a bound, nothing left to gain
+            done = active[accept]
+            theta[done], ll[done], grad[done], fisher[done] = trial[accept], trial_ll[accept], trial_grad[accept], trial_fisher[accept]
+            converged[active[stuck]] = True
+            keep = ~accept & ~stuck
+            active, step, scale = active[keep], step[keep], 0.5 * scale[keep]
+            if active.size == 0:
+                break
+        converged[active] = True #no step raised the likelihood: at the maximum up to rounding
+
+    ridge = 1e-10 * np.trace(fisher, axis1=1, axis2=2)[:, None, None] + 1e-300
+    covariance = np.linalg.inv(fisher + ridge * eye) #covariance of (log r, log mu)
+    std_errors = np.zeros((groups, 2))
+    std_errors[:, :free] = np.sqrt(np.maximum(np.diagonal(covariance, axis1=1, axis2=2), 0.0)) * np.exp(theta[:, :free]) #delta method back to (r, mu)
+    return RiskFit(np.exp(theta[:, 0]), np.exp(theta[:, 1]), ll, std_errors, converged, iterations)
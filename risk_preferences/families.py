@@ -0,0 +1,390 @@
+"""Array versions of the utility functions and the utility objects (UtilityFamily and its subclasses).
+
+    Needs NumPy; the package imports this module the first time one of its names is used.
+"""
+import math
+from types import MappingProxyType
+
+import numpy as np
+
+from .utilities import (_UTILITY_FAMILIES, _UTILITY_INVERSES, cara, cara_derivative, cara_inverse, crra, crra_derivative,
+                        crra_inverse, linear_utility, linear_utility_derivative, linear_utility_inverse, quadratic,
+                        quadratic_derivative, quadratic_inverse)
+
+
+# Vectorized versions of the utility functions
+# These take a NumPy array of payoffs (and optionally arrays of parameters) and broadcast across them,
+# so a whole batch of payoffs is evaluated in one call instead of one Python call per outcome.
+
+def linear_utility_vec(m, a=5, b=.75):
+    """Vectorized linear utility of money: u(m) = a + b*m
+
+        args:
+            m (array_like): amounts of money.
+            a (array_like): intercept(s), broadcast against m.
+            b (array_like): slope(s), broadcast against m.
+
+        returns:
+            util (ndarray): utility of every payoff in m.
+
+        Test case:
+            linear_utility_vec([0, 10]) should return array([5.0, 12.5])
+    """
+    m = np.asarray(m, dtype=float) #turns lists, floats, or arrays into a float array
+    return a + np.multiply(b, m) #numpy broadcasting handles array valued a and b
+
+
+def cara_vec(m, a=0.5):
+    """Vectorized CARA utility: u(m) = 1 - exp(-a*m)
+
+        args:
+            m (array_like): amounts of money (payoffs)
+            a (array_like): > 0, absolute risk aversion parameter(s), broadcast against m
+
+        returns:
+            util (ndarray): utility of every payoff in m
+
+        raises:
+            ValueError: if any a <= 0
+
+        Test case:
+            cara_vec([10, 5], a=[0.5, 1.0]) should return approximately array([0.99326205, 0.99326205])
+    """
+    m = np.asarray(m, dtype=float)
+    a = np.asarray(a, dtype=float)
+    if np.any(a <= 0): #one vectorized check instead of one check per payoff
+        raise ValueError("Parameter 'a' must be > 0.")
+    return -np.expm1(-a * m) #expm1 gives 1 - exp(-a*m) without losing precision when a*m is small
+
+
+def crra_vec(m, gamma=2.0):
+    """Vectorized CRRA utility.
+
+        u(m) = (m^(1-gamma)-1) / (1 - gamma)        if gamma != 1
+             = ln(m)                                if gamma == 1
+        args:
+            m (array_like): > 0, money/wealth
+            gamma (array_like): > 0, coefficient(s) of relative risk aversion, broadcast against m
+
+        returns:
+            util (ndarray): utility of every payoff in m
+
+        raises:
+            ValueError: if any m <= 0 or any gamma <= 0
+
+        Test cases:
+            crra_vec([10, 10], gamma=[2, 1]) should return approximately array([0.9, 2.30258509])
+    """
+    m = np.asarray(m, dtype=float)
+    gamma = np.asarray(gamma, dtype=float)
+    if np.any(m <= 0):
+        raise ValueError("Parameter 'm' must be > 0 for CRRA utility.")
+    if np.any(gamma <= 0):
+        raise ValueError("Parameter 'gamma must be > 0.")
+    log_m = np.log(m)
+    one_minus_gamma = 1 - gamma
+    is_log = one_minus_gamma == 0 #lanes where gamma == 1 use ln(m)
+    safe = np.where(is_log, 1.0, one_minus_gamma) #avoids dividing by zero in the gamma == 1 lanes
+    power = np.expm1(one_minus_gamma * log_m) / safe #same as (m^(1-gamma) - 1) / (1 - gamma)
+    return np.where(is_log, log_m, power)
+
+
+def quadratic_vec(m, a=1.0, b=0.1):
+    """Vectorized quadratic utility: u(m) = a*m - 0.5*b*m^2
+
+        args:
+            m (array_like): money/payoff
+            a (array_like): slope at zero wealth, broadcast against m
+            b (array_like): > 0, curvature parameter, broadcast against m
+
+        returns:
+            util (ndarray): utility of every payoff in m
+
+        raises:
+            ValueError: if any b <= 0 (would break concavity)
+            ValueError: if any a - b*m <= 0 (would make marginal utility non-positive)
+
+        Test cases:
+            quadratic_vec([5, 5], a=[1.0, 2.0], b=[0.1, 0.2]) should return array([3.75, 7.5])
+    """
+    m = np.asarray(m, dtype=float)
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    if np.any(b <= 0):
+        raise ValueError("Parameter 'b' must be > 0 to keep utility concave.")
+    if np.any(a - b*m <= 0):
+        raise ValueError("Inputs result in non-positive marginal utility (a - b*m <= 0). Choose smaller m or larger a, or smaller b.")
+    return a*m - 0.5*b*(m**2)
+
+
+# Array versions of the inverses and derivatives (go with the _vec utility functions).
+# Utilities outside an inverse's range come back as nan or inf instead of raising, so callers can mask them.
+
+def linear_utility_inverse_vec(util, a=5, b=.75):
+    return (np.asarray(util, dtype=float) - a) / b
+
+def linear_utility_derivative_vec(m, a=5, b=.75):
+    return np.zeros(np.shape(m)) + b #b at every payoff
+
+
+def cara_inverse_vec(util, a=0.5):
+    with np.errstate(divide='ignore', invalid='ignore'): #util >= 1 gives inf or nan
+        return -np.log1p(-np.asarray(util, dtype=float)) / a
+
+def cara_derivative_vec(m, a=0.5):
+    return a * np.exp(-np.multiply(a, m))
+
+
+def crra_inverse_vec(util, gamma=2.0):
+    util = np.asarray(util, dtype=float)
+    gamma = np.asarray(gamma, dtype=float)
+    one_minus_gamma = 1 - gamma
+    is_log = one_minus_gamma == 0
+    safe = np.where(is_log, 1.0, one_minus_gamma)
+    with np.errstate(divide='ignore', invalid='ignore'): #1 + (1-gamma)*util <= 0 gives nan
+        power = np.exp(np.log1p(one_minus_gamma * util) / safe) #same as (1 + (1-gamma)*util)^(1/(1-gamma))
+    return np.where(is_log, np.exp(util), power)
+
+def crra_derivative_vec(m, gamma=2.0):
+    return np.exp(-np.multiply(gamma, np.log(m))) #m^(-gamma)
+
+
+def quadratic_inverse_vec(util, a=1.0, b=0.1):
+    with np.errstate(invalid='ignore'): #util above the peak gives nan
+        return (a - np.sqrt(np.multiply(a, a) - 2 * np.multiply(b, util))) / b
+
+def quadratic_derivative_vec(m, a=1.0, b=0.1):
+    return a - np.multiply(b, m)
+
+
+# Utility objects
+# A UtilityFamily is a utility function that carries its parameters as float arrays. u(m) takes a float or an array
+# of payoffs, u.derivative and u.inverse follow the same protocol as invertible_utility (so certainty_equivalent
+# and the batch functions take their closed-form paths), and u.evaluate(payoffs, params) scores a whole grid of
+# parameter values in one array call instead of one lambda per parameter value.
+
+class UtilityFamily:
+    """Base class of the utility objects. Subclasses set the array kernels and the parameter names.
+
+        args:
+            **params, parameter values (floats or arrays), missing ones take the family's defaults
+        raises:
+            TypeError: for a parameter the family does not have
+            ValueError: for parameters outside the family's range (same messages as the functions in utilities.py)
+    """
+    param_names = () #names of the parameters, in the order evaluate expects them in a 2-D params array
+    defaults = {}
+    positive = () #parameters that must be > 0
+    kernel = derivative_kernel = inverse_kernel = None #array functions kernel(m, **params), set by the subclasses
+    scalar_kernel = scalar_derivative = scalar_inverse = None #float versions, used when a single payoff comes in
+
+    def __init__(self, **params):
+        unknown = set(params) - set(self.param_names)
+        if unknown:
+            raise TypeError(f"{type(self).__name__} has no parameter(s) {sorted(unknown)}.")
+        values = {}
+        for name in self.param_names:
+            value = np.array(params.get(name, self.defaults[name]), dtype=float) #a copy, so the caller's array can change freely
+            value.setflags(write=False)
+            values[name] = value
+        for name in self.positive:
+            if np.any(values[name] <= 0):
+                raise ValueError(f"Parameter '{name}' must be > 0.")
+        self._params = values
+        #with float parameters a float payoff goes through the math functions, numpy is slower for one number
+        scalar = all(v.ndim == 0 for v in values.values())
+        self._scalars = {name: float(v) for name, v in values.items()} if scalar else None
+        self._scalar_args = tuple(self._scalars.values()) if scalar else None #the same values positionally, in param_names order
+        self._hash_key = (type(self),) + tuple((name, value.shape, value.tobytes()) for name, value in values.items())
+
+    @property
+    def params(self):
+        """Read-only view of the parameter arrays. A utility object never changes; use with_params for other values."""
+        return MappingProxyType(self._params)
+
+    def _require_scalar_params(self):
+        """Raises ValueError unless every parameter is one number, i.e. the object is one utility function.
+
+            Array parameters broadcast against the payoffs in u(m), which is what a grid of utilities needs,
+            but a function that scores a lottery with one utility would mix the parameter values up.
+        """
+        if self._scalars is None:
+            raise ValueError(f"{self!r} has array parameters, but one utility function is needed here; use float "
+                             f"parameters, or u.evaluate / choice_matrix / parallel_sweep for many parameter values.")
+
+    @staticmethod
+    def _out(values): #floats in, float out; arrays in, array out
+        return float(values) if np.ndim(values) == 0 else values
+
+    def __call__(self, m):
+        if self._scalars is not None and isinstance(m, (int, float)):
+            return float(self.scalar_kernel(m, *self._scalar_args))
+        return self._out(self.kernel(m, **self._params))
+
+    def derivative(self, m):
+        """u'(m)"""
+        if self._scalars is not None and isinstance(m, (int, float)):
+            return float(self.scalar_derivative(m, *self._scalar_args))
+        return self._out(self.derivative_kernel(m, **self._params))
+
+    def inverse(self, util):
+        """Payoff with utility util (nan where util is outside the utility's range)."""
+        if self._scalars is not None and isinstance(util, (int, float)):
+            try:
+                return float(self.scalar_inverse(util, *self._scalar_args))
+            except (ValueError, OverflowError, ZeroDivisionError, TypeError): #TypeError: a negative base gave a complex power
+                return math.nan
+        with np.errstate(all='ignore'):
+            return self._out(self.inverse_kernel(util, **self._params))
+
+    def expected_utility(self, payoffs, probs):
+        """sum of probs * u(payoffs). A few payoffs go through the float functions, many through one array call.
+
+            raises:
+                ValueError: if the parameters are arrays (see _require_scalar_params)
+        """
+        self._require_scalar_params()
+        if len(payoffs) <= 32: #plain loop, no arrays for a handful of payoffs
+            kernel, args = self.scalar_kernel, self._scalar_args
+            eu = 0.0
+            for x, p in zip(payoffs, probs):
+                eu += p * kernel(float(x), *args)
+            return eu
+        return float(np.dot(probs, self.kernel(np.asarray(payoffs, dtype=float), **self._params)))
+
+    def absolute_risk_aversion(self, m):
+        """Arrow-Pratt coefficient of absolute risk aversion, -u''(m) / u'(m)."""
+        return self._out(self._absolute_risk_aversion(np.asarray(m, dtype=float), **self._params))
+
+    def relative_risk_aversion(self, m):
+        """Arrow-Pratt coefficient of relative risk aversion, -m * u''(m) / u'(m)."""
+        m = np.asarray(m, dtype=float)
+        return self._out(m * self._absolute_risk_aversion(m, **self._params))
+
+    def evaluate(self, payoffs, params=None):
+        """Utility of every payoff under every parameter vector, in one array call.
+
+            args:
+                payoffs, 1-D array_like of payoffs
+                params, None (this object's parameters), a dict of parameter arrays (missing names keep this object's
+                        values), a 1-D array for a one-parameter family, or a 2-D array with one column per param_names
+            returns:
+                utils, ndarray of shape (number of parameter vectors, number of payoffs)
+
+            Test case:
+                CRRAUtility().evaluate([1.0, 10.0], [1.0, 2.0]) should return approximately
+                array([[0.0, 2.30258509], [0.0, 0.9]])
+        """
+        payoffs = np.asarray(payoffs, dtype=float).reshape(-1)
+        if params is None:
+            columns = self._params
+        elif isinstance(params, dict):
+            columns = {**self._params, **params}
+        else:
+            params = np.asarray(params, dtype=float)
+            if params.ndim == 1 and len(self.param_names) == 1:
+                params = params[:, None]
+            if params.ndim != 2 or params.shape[1] != len(self.param_names):
+                raise ValueError(f"params needs one column per parameter {self.param_names}.")
+            columns = dict(zip(self.param_names, params.T))
+        columns = dict(zip(columns, np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float)) for v in columns.values()))))
+        return self.kernel(payoffs[None, :], **{name: value[:, None] for name, value in columns.items()})
+
+    def with_params(self, **params):
+        """Same family with some parameters replaced."""
+        return type(self)(**{**self._params, **params})
+
+    def _key(self): #hashable description, so utility objects can be dictionary or lru_cache keys (fixed, as the parameters are)
+        return self._hash_key
+
+    def __eq__(self, other):
+        return isinstance(other, UtilityFamily) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        params = ", ".join(f"{name}={value.tolist()}" for name, value in self._params.items())
+        return f"{type(self).__name__}({params})"
+
+
+class LinearUtility(UtilityFamily):
+    """u(m) = a + b*m, risk neutral."""
+    param_names = ('a', 'b')
+    defaults = {'a': 5.0, 'b': 0.75}
+    positive = ('b',)
+    kernel = staticmethod(linear_utility_vec)
+    derivative_kernel = staticmethod(linear_utility_derivative_vec)
+    inverse_kernel = staticmethod(linear_utility_inverse_vec)
+    scalar_kernel = staticmethod(linear_utility)
+    scalar_derivative = staticmethod(linear_utility_derivative)
+    scalar_inverse = staticmethod(linear_utility_inverse)
+
+    @staticmethod
+    def _absolute_risk_aversion(m, a, b):
+        return np.zeros(np.broadcast(m, a, b).shape)
+
+
+class CARAUtility(UtilityFamily):
+    """u(m) = 1 - exp(-a*m), absolute risk aversion a at every payoff."""
+    param_names = ('a',)
+    defaults = {'a': 0.5}
+    positive = ('a',)
+    kernel = staticmethod(cara_vec)
+    derivative_kernel = staticmethod(cara_derivative_vec)
+    inverse_kernel = staticmethod(cara_inverse_vec)
+    scalar_kernel = staticmethod(cara)
+    scalar_derivative = staticmethod(cara_derivative)
+    scalar_inverse = staticmethod(cara_inverse)
+
+    @staticmethod
+    def _absolute_risk_aversion(m, a):
+        return np.broadcast_to(a, np.broadcast(m, a).shape).astype(float)
+
+
+class CRRAUtility(UtilityFamily):
+    """u(m) = (m^(1-gamma) - 1) / (1 - gamma) (ln(m) for gamma == 1), relative risk aversion gamma at every payoff."""
+    param_names = ('gamma',)
+    defaults = {'gamma': 2.0}
+    positive = ('gamma',)
+    kernel = staticmethod(crra_vec)
+    derivative_kernel = staticmethod(crra_derivative_vec)
+    inverse_kernel = staticmethod(crra_inverse_vec)
+    scalar_kernel = staticmethod(crra)
+    scalar_derivative = staticmethod(crra_derivative)
+    scalar_inverse = staticmethod(crra_inverse)
+
+    @staticmethod
+    def _absolute_risk_aversion(m, gamma):
+        return gamma / m
+
+
+class QuadraticUtility(UtilityFamily):
+    """u(m) = a*m - 0.5*b*m^2, increasing risk aversion b / (a - b*m) while a - b*m > 0."""
+    param_names = ('a', 'b')
+    defaults = {'a': 1.0, 'b': 0.1}
+    positive = ('b',)
+    kernel = staticmethod(quadratic_vec)
+    derivative_kernel = staticmethod(quadratic_derivative_vec)
+    inverse_kernel = staticmethod(quadratic_inverse_vec)
+    scalar_kernel = staticmethod(quadratic)
+    scalar_derivative = staticmethod(quadratic_derivative)
+    scalar_inverse = staticmethod(quadratic_inverse)
+
+    @staticmethod
+    def _absolute_risk_aversion(m, a, b):
+        return b / (a - b * m)
+
+
+_UTILITY_INVERSES.update({ #lets invertible_utility attach inverses and derivatives to the _vec functions too
+    linear_utility_vec: (linear_utility_inverse_vec, linear_utility_derivative_vec),
+    cara_vec: (cara_inverse_vec, cara_derivative_vec),
+    crra_vec: (crra_inverse_vec, crra_derivative_vec),
+    quadratic_vec: (quadratic_inverse_vec, quadratic_derivative_vec),
+})
+_UTILITY_FAMILIES.update({ #as_utility turns the _vec functions into utility objects too
+    linear_utility_vec: 'LinearUtility',
+    cara_vec: 'CARAUtility',
+    crra_vec: 'CRRAUtility',
+    quadratic_vec: 'QuadraticUtility',
+})
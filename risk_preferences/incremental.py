@@ -0,0 +1,300 @@
+"""Mutable lottery handle for interactive editing: cached subtree results, O(depth) updates.
+
+    LotteryHandle keeps the tree of a compound lottery with the expected value, expected utility and payoff
+    range of every sub-lottery. Changing one outcome recomputes only the sub-lotteries on the path from it to
+    the root, each from its own entries, so an edit costs O(entries per node * depth) instead of a new pass
+    over the whole tree, and the cached numbers never drift from repeated add/subtract updates.
+
+        handle = LotteryHandle(lottery, CRRAUtility(gamma=0.5))
+        handle.set_prob((1, 0), 0.3)               #entry 0 of the sub-lottery at entry 1 of the root
+        handle.set_outcome((1, 1), 42.0, prob=0.7)
+        handle.certainty_equivalent()              #only the utility of the new payoff was computed
+
+    The expected utilities are kept for one utility at a time. They are thrown away and rebuilt in one full
+    pass when a different utility is asked for (a UtilityFamily is compared by its parameter values, any other
+    callable by identity). The parameters of a UtilityFamily are fixed, so changing them means a new object:
+    handle.set_params(gamma=2.0) swaps the handle's utility for u.with_params(gamma=2.0).
+"""
+from . import instrumentation
+from .lotteries import _is_instance, _solve_certainty_equivalent
+from .utilities import as_utility
+
+
+class _Node:
+    """One (sub-)lottery: its entries and the cached results of its subtree."""
+    __slots__ = ('probs', 'outs', 'utils', 'ev', 'eu', 'low', 'high')
+
+    def __init__(self, probs, outs):
+        self.probs = probs #probability of each entry
+        self.outs = outs #float payoff or _Node of each entry
+        self.utils = None #u(payoff) of each payoff entry (None for sub-lotteries), while the utilities are valid
+        self.ev = self.eu = 0.0
+        self.low = self.high = None #payoff range of the subtree, None if it has no payoffs
+
+
+def _build(lottery):
+    """Turns a list-of-dictionaries lottery into _Node objects with an explicit stack; returns the root and all nodes, parents first."""
+    root = _Node([], [])
+    nodes = []
+    stack = [(lottery, root)]
+    while stack:
+        lot, node = stack.pop()
+        nodes.append(node)
+        for outcome in lot:
+            out = outcome['out']
+            if isinstance(out, list):
+                child = _Node([], [])
+                stack.append((out, child))
+                out = child
+            else:
+                out = float(out)
+            node.probs.append(float(outcome['prob']))
+            node.outs.append(out)
+    return root, nodes
+
+
+def _subtree(root):
+    """All nodes under root (root included), parents before their children."""
+    nodes, stack = [], [root]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(out for out in node.outs if isinstance(out, _Node))
+    return nodes
+
+
+def _refresh(node, with_eu):
+    """Recomputes the cached ev, payoff range (and eu) of node from its entries; its sub-lotteries must be up to date."""
+    ev = eu = 0.0
+    low = high = None
+    utils = node.utils
+    for i, (prob, out) in enumerate(zip(node.probs, node.outs)):
+        if isinstance(out, _Node):
+            ev += prob * out.ev
+            if with_eu:
+                eu += prob * out.eu
+            lo, hi = out.low, out.high
+            if lo is None: #empty sub-lottery
+                continue
+        else:
+            ev += prob * out
+            if with_eu:
+                eu += prob * utils[i]
+            lo = hi = out
+        if low is None or lo < low:
+            low = lo
+        if high is None or hi > high:
+            high = hi
+    node.ev, node.low, node.high = ev, low, high
+    if with_eu:
+        node.eu = eu
+
+
+class LotteryHandle:
+    """A compound lottery that can be edited in place, with cached EV, EU, CE and risk premium.
+
+        args:
+            lottery, list of dictionaries (any depth)
+            u, optional utility function or utility object, the default for the utility methods
+
+        Outcomes are addressed by paths: tuples of entry positions from the root, so (2,) is the third entry of
+        the lottery and (2, 0) the first entry of the sub-lottery in that entry.
+
+        Test case:
+            handle = LotteryHandle([{'out': [{'out': 0, 'prob': 0.5}, {'out': 10, 'prob': 0.5}], 'prob': 0.6}, {'out': 10, 'prob': 0.4}])
+            handle.set_outcome((0, 0), 20.0); handle.expected_value() should return 13.0
+    """
+
+    def __init__(self, lottery, u=None):
+        self._root, nodes = _build(lottery)
+        for node in reversed(nodes): #children before their parents
+            _refresh(node, with_eu=False)
+        self._u = None if u is None else as_utility(u)
+        self._u_eu = None #utility the cached eus belong to, None when there are none
+
+    def __repr__(self):
+        return f"LotteryHandle(ev={self._root.ev!r}, u={self._u!r})"
+
+    # reading
+
+    def expected_value(self):
+        """Expected value of the lottery, read from the cache."""
+        return self._root.ev
+
+    def payoff_range(self):
+        """(lowest, highest) payoff of the lottery, from the cache."""
+        return self._root.low, self._root.high
+
+    def expected_utility(self, u=None):
+        """Expected utility under u (default: the handle's utility); a full pass only when the utility changed."""
+        return self._ensure_utility(u).eu
+
+    def certainty_equivalent(self, u=None, tol=1e-9):
+        """Certainty equivalent under u, solved from the cached expected utility like certainty_equivalent."""
+        u = self._utility(u)
+        root = self._ensure_utility(u)
+        if root.low is None:
+            raise ValueError("The lottery has no payoffs.")
+        return _solve_certainty_equivalent(u, root.eu, root.low, root.high, tol, instrumentation._active)
+
+    def risk_premium(self, u=None, tol=1e-9):
+        """expected_value() - certainty_equivalent(u), set to exactly 0.0 within tol like risk_premium."""
+        rp = self._root.ev - self.certainty_equivalent(u, tol)
+        return 0.0 if abs(rp) < tol else float(rp)
+
+    def outcome(self, path):
+        """(prob, out) of the entry at path; out is a payoff or, for a sub-lottery, its list of dictionaries."""
+        node, i = self._entry(path)[-1]
+        out = node.outs[i]
+        return node.probs[i], _to_dicts(out) if isinstance(out, _Node) else out
+
+    def to_dicts(self):
+        """The current lottery as a list of dictionaries."""
+        return _to_dicts(self._root)
+
+    # editing
+
+    def set_utility(self, u):
+        """Makes u the default utility of the handle (the cached eus are rebuilt when they are next needed)."""
+        self._u = as_utility(u)
+
+    def set_params(self, **params):
+        """Replaces parameters of the handle's utility (a UtilityFamily) by u.with_params(**params).
+
+            raises:
+                ValueError: if the handle has no default utility
+                TypeError: if its utility is not a UtilityFamily
+        """
+        u = self._utility(None)
+        if not _is_instance(u, 'families', 'UtilityFamily'):
+            raise TypeError(f"set_params needs a UtilityFamily utility, the handle has {u!r}.")
+        self._u = u.with_params(**params)
+
+    def invalidate(self):
+        """Drops the cached eus, e.g. after a utility function changed in a way its identity does not show."""
+        self._u_eu = None
+
+    def set_prob(self, path, prob):
+        """Sets the probability of the entry at path."""
+        entries = self._entry(path)
+        node, i = entries[-1]
+        node.probs[i] = float(prob)
+        self._update(entries)
+
+    def set_outcome(self, path, out, prob=None):
+        """Replaces the outcome at path by a payoff or a sub-lottery (list of dictionaries), and its probability if given.
+
+            Only the utility of a new payoff (or the expected utilities of a new sub-lottery) is computed,
+            then the sub-lotteries on the path are recomputed.
+        """
+        entries = self._entry(path)
+        node, i = entries[-1]
+        if isinstance(out, list):
+            child, nodes = _build(out)
+            with_eu = self._u_eu is not None
+            if with_eu:
+                self._fill_utils(nodes, self._u_eu)
+            for sub in reversed(nodes):
+                _refresh(sub, with_eu)
+            node.outs[i] = child
+            if with_eu:
+                node.utils[i] = None
+        else:
+            out = float(out)
+            node.outs[i] = out
+            if self._u_eu is not None: #keep the utilities valid, one call of u
+                stats = instrumentation._active
+                if stats is not None:
+                    stats.count('utility.calls')
+                    stats.count('utility.evaluations')
+                node.utils[i] = float(self._u_eu(out))
+        if prob is not None:
+            node.probs[i] = float(prob)
+        self._update(entries)
+
+    # internals
+
+    def _utility(self, u):
+        if u is None:
+            if self._u is None:
+                raise ValueError("No utility given and the handle has no default utility.")
+            return self._u
+        return as_utility(u)
+
+    def _entry(self, path):
+        """(node, position) of every entry on path, from the root down.
+
+            raises:
+                IndexError: if path is empty or a position does not exist
+                ValueError: if path goes through a payoff
+        """
+        if not path:
+            raise IndexError("path needs at least one position.")
+        entries = []
+        node = self._root
+        for depth, i in enumerate(path):
+            if not isinstance(node, _Node):
+                raise ValueError(f"path {tuple(path)!r} continues below the payoff at {tuple(path[:depth])!r}.")
+            if not -len(node.outs) <= i < len(node.outs):
+                raise IndexError(f"position {i} out of range at depth {depth} of path {tuple(path)!r}.")
+            i %= len(node.outs)
+            entries.append((node, i))
+            node = node.outs[i]
+        return entries
+
+    def _update(self, entries):
+        """Recomputes the nodes that hold the entries, deepest first: the path from an edited entry to the root."""
+        with_eu = self._u_eu is not None
+        for node, _ in reversed(entries):
+            _refresh(node, with_eu)
+        stats = instrumentation._active
+        if stats is not None:
+            stats.count('handle.updates')
+            stats.count('handle.nodes_recomputed', len(entries))
+
+    def _ensure_utility(self, u=None):
+        """Makes the cached eus those of u, rebuilding them in one pass if needed; returns the root."""
+        u = self._utility(u)
+        if self._u_eu is None or u != self._u_eu: #equal parameters of a UtilityFamily keep the cached eus
+            nodes = _subtree(self._root)
+            self._fill_utils(nodes, u)
+            for node in reversed(nodes):
+                _refresh(node, with_eu=True)
+            self._u_eu = u
+            stats = instrumentation._active
+            if stats is not None:
+                stats.count('handle.rebuilds')
+        return self._root
+
+    @staticmethod
+    def _fill_utils(nodes, u):
+        """Sets node.utils of every node: u of each payoff, one array call for a UtilityFamily."""
+        stats = instrumentation._active
+        payoffs = [out for node in nodes for out in node.outs if not isinstance(out, _Node)]
+        if stats is not None:
+            stats.count('utility.evaluations', len(payoffs))
+        if _is_instance(u, 'families', 'UtilityFamily') and len(payoffs) > 1:
+            if stats is not None:
+                stats.count('utility.calls')
+            utils = iter(u(payoffs).tolist())
+        else:
+            if stats is not None:
+                stats.count('utility.calls', len(payoffs))
+            utils = map(float, map(u, payoffs))
+        for node in nodes:
+            node.utils = [None if isinstance(out, _Node) else next(utils) for out in node.outs]
+
+
+def _to_dicts(root):
+    """list-of-dictionaries form of a node, built with an explicit stack."""
+    result = []
+    stack = [(root, result)]
+    while stack:
+        node, lot = stack.pop()
+        for prob, out in zip(node.probs, node.outs):
+            if isinstance(out, _Node):
+                sub = []
+                stack.append((out, sub))
+                out = sub
+            lot.append({'out': out, 'prob': prob})
+    return result
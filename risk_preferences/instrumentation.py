@@ -0,0 +1,106 @@
+"""Opt-in instrumentation of the evaluation functions: counters, maxima and stage timings.
+
+    Nothing is recorded unless a block runs under instrumented():
+
+        with instrumented() as stats:
+            [certainty_equivalent(lot, cara) for lot in lotteries]
+        print(stats.to_json(indent=1))
+
+    The instrumented functions read the module attribute _active once per call and skip all bookkeeping
+    when it is None, so with instrumentation off the cost is one attribute lookup and one comparison.
+
+    Names recorded by the package:
+        counters  expected_utility.calls, utility.calls, utility.evaluations (payoffs evaluated; an array call
+                  counts once in utility.calls and once per payoff in utility.evaluations; the batch functions
+                  count their calls of u.inverse and u.derivative here too),
+                  reduction_cache.hits, reduction_cache.misses, certainty_equivalent.closed_form /
+                  .newton / .brent (which path solved it), solver.newton.iterations, solver.brent.iterations,
+                  batch.lotteries, batch.lockstep.iterations, handle.updates, handle.nodes_recomputed (sub-lotteries
+                  recomputed by LotteryHandle edits), handle.rebuilds (full passes for a new utility)
+        maxima    flatten.depth (deepest nesting level walked, 1 for a simple lottery)
+        stages    reduce (lottery_key and the reduction of a missed key), certainty_equivalent.expected_utility,
+                  certainty_equivalent.solve, batch.expected_utilities, batch.solve
+"""
+import json
+import time
+from contextlib import contextmanager
+
+_active = None #the Instrumentation recording right now, None when instrumentation is off
+
+
+class Instrumentation:
+    """Collects counters, maxima and stage timings.
+
+        Stage timings are inclusive: a stage that runs inside another stage is counted in both.
+    """
+
+    def __init__(self):
+        self.counters = {} #name -> count
+        self.maxima = {} #name -> largest value seen
+        self.stages = {} #name -> [calls, total seconds, longest call in seconds]
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_max(self, name, value):
+        if value > self.maxima.get(name, value - 1):
+            self.maxima[name] = value
+
+    def add_time(self, name, seconds):
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [1, seconds, seconds]
+        else:
+            stage[0] += 1
+            stage[1] += seconds
+            stage[2] = max(stage[2], seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """Times the block as one call of stage name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def reset(self):
+        self.counters.clear()
+        self.maxima.clear()
+        self.stages.clear()
+
+    def summary(self):
+        """Returns everything recorded as a dictionary of plain numbers (JSON-ready)."""
+        stages = {name: {'calls': calls, 'total_seconds': total, 'mean_seconds': total / calls, 'max_seconds': longest}
+                  for name, (calls, total, longest) in sorted(self.stages.items(), key=lambda item: -item[1][1])} #slowest first
+        return {'counters': dict(sorted(self.counters.items())), 'maxima': dict(sorted(self.maxima.items())), 'stages': stages}
+
+    def to_json(self, indent=None):
+        return json.dumps(self.summary(), indent=indent)
+
+    def __repr__(self):
+        return f"Instrumentation(counters={len(self.counters)}, stages={len(self.stages)})"
+
+
+@contextmanager
+def instrumented(stats=None):
+    """Turns instrumentation on for the block and yields the Instrumentation that records it.
+
+        args:
+            stats, optional Instrumentation to keep adding to (a new one by default)
+
+        Blocks can be nested; the inner block records into its own Instrumentation only. Recording is
+        per process and not thread-safe: worker processes of the parallel engine are not instrumented.
+    """
+    global _active
+    stats = Instrumentation() if stats is None else stats
+    previous, _active = _active, stats
+    try:
+        yield stats
+    finally:
+        _active = previous
+
+
+def active():
+    """Returns the Instrumentation recording right now, or None when instrumentation is off."""
+    return _active
@@ -0,0 +1,595 @@
+"""Lotteries as lists of dictionaries: input, random generation, expected value and utility, reduction,
+certainty equivalent and risk premium.
+
+    Plain Python only. The functions also accept the array-backed Lottery from arrays.py.
+"""
+import math
+import random #import random module for generating random numbers
+import sys
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+from . import instrumentation
+from .utilities import _SCALAR_UTILITIES, as_utility, invertible_utility
+
+
+def _is_instance(obj, module, name):
+    """isinstance(obj, module.name) without importing module: if the module was never imported, obj cannot be one."""
+    loaded = sys.modules.get(f"{__package__}.{module}")
+    return loaded is not None and isinstance(obj, getattr(loaded, name))
+
+
+# Step Two: Design and code lottery data structure  
+
+def input_lottery():
+    """Builds a lottery from user input
+    
+        returns:  lottery, a list of dictionaries
+            each dictionary has keys 'out' (outcome) and 'prob' (probability)
+        
+        Test case:
+            If user inputs a 2-outcome lottery with outcomes 10 (prob 0.4) and 20 (prob 0.6), the function should return:
+            [{'out': 10.0, 'prob': 0.4}, {'out': 20.0, 'prob': 0.6}]
+    """
+    tol = 1e-9 #small tolerance I got from class to deal with rounding error
+
+    def ask_num_outcomes():
+        while True:
+            try:
+                num_outcomes = int(input("How many outcomes in this lottery? (integer >= 1): "))
+                if num_outcomes >= 1:
+                    return num_outcomes
+                else:
+                    print("Please enter an integer >= 1.\n")
+            except ValueError as e:
+                print(f"Input error: {e}. Please try again.\n") #keeps asking until valid input
+
+    def ask_probability(outcome_number, num_outcomes, remaining_prob):
+        """Returns (probability of the outcome, probability left for the next outcomes)."""
+        if outcome_number < num_outcomes: #for all but last outcome, ask for probability
+             while True: #asks user to specify probability until valid input
+                try:
+                    prob_val = float(input(f"Enter probability for outcome {outcome_number} (remaining {remaining_prob:.6f}): ")) #asks user for probability and tells user remaining probability with 6 decimal places
+                    if prob_val < 0:
+                        print("Probability must be >= 0.\n") 
+                    elif prob_val > remaining_prob + tol: #checks if probability exceeds remaining probability plus tolerance
+                        print(f"Probability cannot exceed the remaining {remaining_prob:.6f}.\n") #prompts user to re-enter if probability too large
+                    else:
+                        return prob_val, remaining_prob - prob_val #updates remaining probability
+                except ValueError as e:
+                    print(f"Input error: {e}. Please try again.\n") 
+        prob_val = remaining_prob #for last outcome, set probability to remaining
+        if prob_val < -tol or prob_val > 1 + tol: #checks if final probability is valid within tolerance
+            raise ValueError("Probabilities do not sum to 1. Please restart the lottery input.") #raises error if probabilities dont sum to 1
+        prob_val = max(0.0, min(1.0, prob_val)) #clamps prob_val between 0 and 1
+        print(f"Setting probability for outcome {outcome_number} to the remaining {prob_val:.6f} so total sums to 1.") #prints auto-set message
+        return prob_val, 0.0
+
+    #the lottery being typed in; a nested lottery pushes it on the stack and it is picked up again when the nested one is done
+    lottery, num_outcomes, remaining_prob, outcome_number = [], ask_num_outcomes(), 1.0, 1
+    stack = [] #(lottery, num_outcomes, remaining_prob, outcome_number) of every lottery waiting for its nested lottery
+    while True:
+        if outcome_number > num_outcomes: #this lottery is complete
+            if not stack:
+                return lottery
+            out_val = lottery #it is the outcome of the lottery it is nested in
+            lottery, num_outcomes, remaining_prob, outcome_number = stack.pop()
+        else:
+            while True: #asks user to specify outcome type until valid input
+                type = input(f"Outcome {outcome_number}: type 'n' for numeric payoff, 'l' for nested lottery: ").strip() #gets user input for outcome type and removes whitespace
+                if type in ("n", "l"): #checks if input is valid
+                    break
+                print("Please type 'n' or 'l'.\n") #prompts user to re-enter if input invalid
+            if type == "l":
+                print(f"Building nested (compound) lottery for outcome {outcome_number}...") 
+                stack.append((lottery, num_outcomes, remaining_prob, outcome_number)) #come back to this outcome when the nested lottery is done
+                lottery, num_outcomes, remaining_prob, outcome_number = [], ask_num_outcomes(), 1.0, 1 #the outcome itself is another lottery
+                continue
+            while True:
+                try:
+                    out_val = float(input(f"Enter payoff for outcome {outcome_number}: ")) #asks user for numeric payoff
+                    break
+                except ValueError as e:
+                    print(f"Input error: {e}. Please try again.\n") #prompts user to re-enter if input invalid. payoff must be a number >= 1
+        prob_val, remaining_prob = ask_probability(outcome_number, num_outcomes, remaining_prob)
+        lottery.append({'out': out_val, 'prob': prob_val}) #adds outcome and probability to lottery list
+        outcome_number += 1
+
+
+def make_random_lotteries(number=2, max_pay = 100, compound=False, negative=False):
+    """Builds a random list of lotteries
+    
+        Lottery payoffs are random draws beteen min_pay and max_pay,
+        Lottery probabilities are random uniform draws that sum to one.
+    
+        args:
+            number = int > 0, number of lotteries in list.
+            compound = bool, if True allows compound lotteries one deep,
+            negative = bool, if False min_pay = 0, if True min_pay = -max_pay. 
+            max_pay = float > 0, maximum payoff in lottery.
+        returns:
+            lotteries, list of lotteries (each lottery is a list of dictionaries with keys 'out' and 'prob')
+        
+        Test case:
+            make_random_lotteries(number=2, max_pay=100, compound=False, negative=False) might return:
+            [[{'out': 23.5, 'prob': 0.3}, {'out': 75.2, 'prob': 0.7}], [{'out': 10.1, 'prob': 0.5}, {'out': 90.4, 'prob': 0.5}]]
+    """
+    min_pay = -float(max_pay) if negative else 0.0 #min_pay will be the negative of max_pay if it's negative
+    max_pay = float(max_pay)
+    def _simple_lottery():
+        num_outcomes = random.randint(2, 10) #2-10 possible outcomes
+        payoffs = [random.uniform(min_pay, max_pay) for _ in range(num_outcomes)] #random payoffs between min_pay and max_pay. Makes (num_outcomes) payoffs. Not using the loop number, so I wrote _
+        weights = [random.random() for _ in range(num_outcomes)] #generates random weights for each outcome. Makes (num_outcomes) weights. Not using the loop number, so I wrote _
+        total = sum(weights)
+        probs = [w / total for w in weights] #normalizes weights to sum to 1
+        return [{'out': payoffs[num_outcomes], 'prob': probs[num_outcomes]} for num_outcomes in range (num_outcomes)] #returns list of dictionaries for the simple lottery
+    lotteries = [] #list to hold all lotteries
+    for _ in range(number): #loops to create 'number' lotteries
+        lot = _simple_lottery() #creates a simple lottery
+        if compound: #if compound is True, makes one outcome a nested lottery
+            outcome_idx = random.randrange(len(lot)) #selects random index in lottery
+            lot[outcome_idx]['out'] = _simple_lottery() #replaces outcome at that index with another simple lottery
+        lotteries.append(lot) #adds the lottery to the list of lotteries
+    
+    return lotteries
+
+def _flatten(lottery, merge=True):
+    """The single pass over a lottery tree that flatten_lottery and the array packers reuse.
+
+        Walks a list-of-dictionaries lottery with an explicit stack instead of recursion, so any depth works, multiplies the probabilities down the tree, merges equal payoffs
+        in a dictionary and adds up the expected value on the way.
+
+        args:
+            lottery, list of dictionaries
+            merge, bool, False to only add up the expected value (payoff_prob comes back None)
+        returns:
+            payoff_prob, dict float payoff -> total probability of reaching it (the reduced lottery, unsorted)
+            ev, float, expected value
+    """
+    stats = instrumentation._active
+    payoff_prob = {} if merge else None
+    ev = 0.0
+    stack = [(lottery, 1.0, 1)] #(lottery still to visit, probability of reaching it, nesting level)
+    while stack:
+        lot, weight, depth = stack.pop()
+        if stats is not None:
+            stats.record_max('flatten.depth', depth)
+        for outcome in lot:
+            prob, out = outcome['prob'] * weight, outcome['out'] #multipy the probability on each sub branch by the probability that we got already (weight)
+            if isinstance(out, list): #another lottery, visit it later with the multiplied probability
+                stack.append((out, prob, depth + 1))
+            else:
+                out = float(out)
+                ev += prob * out
+                if merge:
+                    payoff_prob[out] = payoff_prob.get(out, 0.0) + prob #add the probability to the total for that payoff
+    return payoff_prob, ev
+
+
+def _flatten_key(key):
+    """_flatten for a lottery_key: one scan over its flat items, keeping the probability of every open sub-lottery."""
+    stats = instrumentation._active
+    if stats is not None:
+        stats.record_max('flatten.depth', 1)
+    payoff_prob = {}
+    ev = 0.0
+    weights = [1.0] #probability of reaching each open (sub-)lottery
+    for item in key:
+        if item is None: #end of a sub-lottery
+            weights.pop()
+            continue
+        prob, out = item
+        prob = prob * weights[-1]
+        if out is None: #start of a sub-lottery
+            weights.append(prob)
+            if stats is not None:
+                stats.record_max('flatten.depth', len(weights))
+        else:
+            payoff_prob[out] = payoff_prob.get(out, 0.0) + prob
+            ev += prob * out
+    return payoff_prob, ev
+
+
+
+# Step Three: Code an expected value function and expected utility function
+
+def expected_value(lottery):
+    """Calculate expected value of a lottery
+    
+        arg:
+            lottery, list of dictioaries
+        
+        returns:
+            ev, float, expected value of the lottery
+    """
+    if _is_instance(lottery, 'arrays', 'Lottery'): #array-backed lottery, use its arrays instead of the loop below
+        return lottery.expected_value()
+    return lottery_summary(lottery).ev #from the reduction cache, so the same lottery is walked once
+
+
+def expected_utility(lottery, u):
+    """Calculate expected utility of a lottery
+    
+        arg:
+            lottery, list of dictioaries containing 
+                     keys, values {'prob': pr, 'outcome': out}
+                         pr, float between 0.0 and 1.0 inclusive
+                         out, either another lottery or a float payoff
+                     
+            u, utility function, returns utility of a payoff outcome (or a utility object such as CRRAUtility(gamma=2.0))
+        
+        returns:
+            eu, float, expected utility of the lottery
+    """
+    stats = instrumentation._active #None unless instrumentation is on
+    if stats is not None:
+        stats.count('expected_utility.calls')
+    if _is_instance(lottery, 'arrays', 'Lottery'): #array-backed lottery, use its arrays instead of the loop below
+        return lottery.expected_utility(as_utility(u))
+    if not _is_builtin(u): #built-in functions like cara are called directly, anything else becomes a utility object
+        u = as_utility(u)
+    summary = lottery_summary(lottery) #reduced lottery from the cache: u is evaluated once per distinct payoff
+    return _expected_utility_of(summary.payoffs, summary.probs, u, stats)
+
+
+def _is_builtin(u):
+    """True for the plain utility functions of utilities.py (cara, crra, ...) with their default parameters."""
+    try:
+        return u in _SCALAR_UTILITIES
+    except TypeError: #unhashable callable
+        return False
+
+
+@lru_cache(maxsize=None)
+def _invertible_builtin(u):
+    """A built-in utility function with its closed-form inverse and derivative attached, built once per function."""
+    return invertible_utility(u)
+
+
+def _expected_utility_of(payoffs, probs, u, stats=None):
+    """sum of prob * u(payoff) over a reduced lottery, with one array call when u is a UtilityFamily."""
+    if stats is not None:
+        stats.count('utility.evaluations', len(payoffs))
+    if _is_instance(u, 'families', 'UtilityFamily'):
+        if stats is not None:
+            stats.count('utility.calls')
+        return u.expected_utility(list(payoffs), list(probs)) #one array call instead of one call per payoff
+    if stats is not None:
+        stats.count('utility.calls', len(payoffs))
+    eu = 0.0 #starting expected utility at 0.0 to add to through the code
+    for payoff, prob in zip(payoffs, probs):
+        eu += prob * u(payoff) #calculates utility of outcome and weights by probability to add to expected utility
+    return eu
+
+
+# Step Four: complementary functions
+
+
+# Cached reductions
+# The same compound lottery is often reduced again and again (for example, one certainty_equivalent call
+# per utility function). lottery_key turns a lottery into a hashable tuple, and the reduction, expected
+# value and lowest/highest payoff of each distinct lottery are kept in a bounded LRU cache.
+
+class LotterySummary(NamedTuple):
+    """Everything the cache stores about one lottery (tuples and floats, so it is safe to share)."""
+    payoffs: tuple #distinct payoffs, sorted
+    probs: tuple #total probability of each payoff
+    ev: float #expected value
+    low: float #lowest payoff (nan if the lottery is empty)
+    high: float #highest payoff (nan if the lottery is empty)
+
+
+def flatten_lottery(lottery):
+    """Reduces a lottery in one iterative pass and returns its LotterySummary, without the cache.
+
+        args:
+            lottery, list of dictionaries (any depth)
+        returns:
+            LotterySummary(payoffs, probs, ev, low, high)
+
+        Test case:
+            flatten_lottery([{'out': [{'out': 0, 'prob': 0.5}, {'out': 10, 'prob': 0.5}], 'prob': 0.6}, {'out': 10, 'prob': 0.4}])
+            should return LotterySummary(payoffs=(0.0, 10.0), probs=(0.3, 0.7), ev=7.0, low=0.0, high=10.0)
+    """
+    return _summary_of(*_flatten(lottery))
+
+
+def _summary_of(payoff_prob, ev):
+    payoffs = sorted(payoff_prob)
+    probs = tuple(map(payoff_prob.__getitem__, payoffs))
+    if not payoffs:
+        return LotterySummary((), (), ev, math.nan, math.nan)
+    return LotterySummary(tuple(payoffs), probs, ev, payoffs[0], payoffs[-1])
+
+
+def lottery_key(lottery):
+    """Returns a hashable, canonical form of a lottery.
+
+        A list-of-dictionaries lottery becomes a flat tuple with one (prob, payoff) pair per payoff, in
+        order. A sub-lottery is written in place as (prob, None), its own items, then None. The key is
+        flat so that hashing and comparing it never recurses, whatever the depth. Two lotteries with the
+        same outcomes, probabilities and nesting get equal keys. A Lottery becomes the raw bytes of its arrays.
+
+        Test case:
+            lottery_key([{'out': 0, 'prob': 0.5}, {'out': 10, 'prob': 0.5}]) should return ((0.5, 0.0), (0.5, 10.0))
+    """
+    if _is_instance(lottery, 'arrays', 'Lottery'):
+        return ('Lottery', lottery.payoffs.tobytes(), lottery.probs.tobytes(), lottery.children.tobytes(), lottery.offsets.tobytes())
+    items = []
+    stack = [iter(lottery)] #outcomes still to visit of every open (sub-)lottery
+    while stack:
+        for outcome in stack[-1]:
+            out = outcome['out']
+            if isinstance(out, list): #write the sub-lottery's items first, then carry on with this one
+                items.append((float(outcome['prob']), None))
+                stack.append(iter(out))
+                break
+            items.append((float(outcome['prob']), float(out)))
+        else: #every outcome of this (sub-)lottery done
+            stack.pop()
+            if stack:
+                items.append(None)
+    return tuple(items)
+
+
+def _summarize_key(key):
+    """Reduces the lottery described by key (see lottery_key) and returns its LotterySummary."""
+    stats = instrumentation._active
+    if stats is not None: #only reached on a cache miss
+        stats.count('reduction_cache.misses')
+    if key and key[0] == 'Lottery': #an array-backed lottery, rebuild the arrays from their bytes
+        import numpy as np
+        from .arrays import Lottery
+        lot = Lottery(np.frombuffer(key[1]), np.frombuffer(key[2]),
+                      np.frombuffer(key[3], dtype=np.intp), np.frombuffer(key[4], dtype=np.intp))
+        reduced = lot.reduce()
+        payoffs, probs = tuple(reduced.payoffs.tolist()), tuple(reduced.probs.tolist())
+        ev = float(sum(x * p for x, p in zip(payoffs, probs)))
+        return _summary_of(dict(zip(payoffs, probs)), ev) #nan low/high for an empty Lottery, like an empty list
+    return _summary_of(*_flatten_key(key))
+
+
+_summary_cache = lru_cache(maxsize=4096)(_summarize_key) #bounded LRU cache keyed by lottery_key
+
+
+def lottery_summary(lottery):
+    """Returns the (cached) LotterySummary of a lottery: reduced payoffs/probs, expected value, lowest and highest payoff."""
+    stats = instrumentation._active
+    if stats is None:
+        return _summary_cache(lottery_key(lottery))
+    misses = stats.counters.get('reduction_cache.misses', 0)
+    with stats.stage('reduce'):
+        summary = _summary_cache(lottery_key(lottery))
+    if stats.counters.get('reduction_cache.misses', 0) == misses: #_summarize_key did not run, so the cache had it
+        stats.count('reduction_cache.hits')
+    return summary
+
+
+def reduction_cache_info():
+    """Returns hits, misses, maxsize and currsize of the reduction cache."""
+    return _summary_cache.cache_info()
+
+
+def clear_reduction_cache():
+    _summary_cache.cache_clear()
+
+
+def set_reduction_cache_size(maxsize):
+    """Replaces the reduction cache with an empty one holding at most maxsize lotteries (None for no limit)."""
+    global _summary_cache
+    _summary_cache = lru_cache(maxsize=maxsize)(_summarize_key)
+
+
+def reduce_lottery(lottery):
+    """ Reduces compound lottery to a simple lottery.
+    
+        A compound lottery has sub-lotteries as outcomes.
+        A simple lottery only has payoffs as outcomes.
+        Reductions are cached, so reducing the same lottery again is a cache lookup.
+        
+        args:
+            lottery, list of dictionaries. Each dictionary has keys:
+                'out': either a float payoff or another lottery (list of dictionaries)
+                'prob': float probability of this outcome.
+        returns:
+            simple_lottery, list of dictionaries with no sub-lottery.
+                (a simple Lottery if a Lottery was passed in)
+    """
+    summary = lottery_summary(lottery)
+    if _is_instance(lottery, 'arrays', 'Lottery'):
+        from .arrays import Lottery
+        return Lottery(summary.payoffs, summary.probs)
+    simple_lottery = [{'out': x, 'prob': p} for x, p in zip(summary.payoffs, summary.probs)] #builds a fresh simple lottery list of dictionaries from the cached payoffs
+    return simple_lottery
+
+
+def _payoff_range(lottery):
+    """Returns (lowest payoff, highest payoff) of a lottery from the reduction cache."""
+    summary = lottery_summary(lottery)
+    if not summary.payoffs:
+        raise ValueError("Lottery has no outcomes.")
+    return summary.low, summary.high
+
+
+def _newton_root(f, df, low, high, tol=1e-9, maxiter=100):
+    """Finds x in [low, high] with f(x) = 0 for an increasing f, using Newton steps with derivative df.
+
+        Any Newton step that leaves the current bracket (or has df <= 0) is replaced by a bisection
+        step, so this never does worse than bisection.
+    """
+    stats = instrumentation._active
+    if f(low) >= 0: #already at or past the root at the low end
+        return low
+    if f(high) <= 0:
+        return high
+    x = 0.5 * (low + high)
+    for _ in range(maxiter):
+        if stats is not None:
+            stats.count('solver.newton.iterations')
+        fx = f(x)
+        if fx == 0:
+            return x
+        if fx < 0: #root is to the right of x
+            low = x
+        else:
+            high = x
+        slope = df(x)
+        step_ok = slope > 0
+        x_new = x - fx / slope if step_ok else 0.5 * (low + high) #Newton step when the slope allows it
+        if not (low < x_new < high): #the Newton step left the bracket, bisect instead
+            x_new = 0.5 * (low + high)
+        if abs(x_new - x) < tol or (high - low) < tol:
+            return x_new
+        x = x_new
+    return x
+
+
+def _brent_root(f, low, high, tol=1e-9, maxiter=100):
+    """Finds x in [low, high] with f(x) = 0 using Brent's method (bisection, secant and inverse quadratic steps).
+
+        Used when the utility has neither an inverse nor a derivative. If f does not change sign
+        on [low, high], returns the end point where |f| is smallest.
+    """
+    eps = 2.220446049250313e-16 #machine epsilon for floats
+    a, b = low, high
+    fa, fb = f(a), f(b)
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    if (fa > 0) == (fb > 0): #no sign change, so no root inside the bracket
+        return a if abs(fa) < abs(fb) else b
+    c, fc = b, fb
+    d = e = b - a
+    stats = instrumentation._active
+    for _ in range(maxiter):
+        if stats is not None:
+            stats.count('solver.brent.iterations')
+        if (fb > 0) == (fc > 0): #keep the root between b and c
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb): #b is always the best guess so far
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol1 = 2 * eps * abs(b) + 0.5 * tol
+        xm = 0.5 * (c - b)
+        if abs(xm) <= tol1 or fb == 0:
+            return b
+        if abs(e) >= tol1 and abs(fa) > abs(fb): #try interpolation
+            s = fb / fa
+            if a == c: #secant step
+                p = 2 * xm * s
+                q = 1 - s
+            else: #inverse quadratic interpolation
+                q = fa / fc
+                r = fb / fc
+                p = s * (2 * xm * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * xm * q - abs(tol1 * q), abs(e * q)): #interpolation is good enough
+                e = d
+                d = p / q
+            else: #fall back to bisection
+                d = xm
+                e = d
+        else:
+            d = xm
+            e = d
+        a, fa = b, fb
+        b += d if abs(d) > tol1 else math.copysign(tol1, xm)
+        fb = f(b)
+    return b
+
+
+def certainty_equivalent(lottery, u, tol=1e-9):
+    """ Returns the certainty equivalent (ce) of a lottery.
+    
+        u(ce) = expected_utility(lottery, u)
+
+        If u has an inverse (u.inverse, see invertible_utility) ce = u.inverse(eu) in closed form.
+        Otherwise ce is found between the lowest and highest payoff with Newton steps when
+        u.derivative exists, or Brent's method for any other increasing utility function.
+        
+        args:
+            lottery, list of dictionaries.
+            u, utility function defined over payoffs, or a utility object (UtilityFamily).
+            tol, float, accuracy of ce when it has to be searched for.
+        returns:
+            ce, float, certainty equivalent
+    """
+    return _certainty_equivalent_of(lottery_summary(lottery), u, tol)
+
+
+def _certainty_equivalent_of(summary, u, tol=1e-9):
+    """certainty_equivalent of the lottery whose (cached) LotterySummary is summary."""
+    #built-in functions like cara are called as they are and get their closed-form inverse, no utility object needed
+    plain = u if _is_builtin(u) else None
+    u = _invertible_builtin(u) if plain is not None else as_utility(u)
+    stats = instrumentation._active
+    if stats is not None:
+        start = time.perf_counter()
+    eu = _expected_utility_of(summary.payoffs, summary.probs, plain or u, stats) #the reduced lottery gives both the eu and the payoff range
+    if stats is not None:
+        stats.add_time('certainty_equivalent.expected_utility', time.perf_counter() - start)
+        start = time.perf_counter()
+
+    try:
+        if not summary.payoffs:
+            raise ValueError("Lottery has no outcomes.")
+        return _solve_certainty_equivalent(u, eu, summary.low, summary.high, tol, stats) #the ce has to be between the lowest and highest payoff
+    finally:
+        if stats is not None:
+            stats.add_time('certainty_equivalent.solve', time.perf_counter() - start)
+
+
+def _solve_certainty_equivalent(u, eu, low, high, tol=1e-9, stats=None):
+    """Returns ce in [low, high] with u(ce) = eu: u.inverse in closed form, else Newton steps or Brent's method."""
+    if abs(high-low) < 1e-12: #if the max and min found above are the same (within tolerance), the certainty equivalent will just be that payoff
+        return float(low) #returns the payoff as a float
+
+    inverse = getattr(u, 'inverse', None)
+    if inverse is not None:
+        try:
+            ce = float(inverse(eu)) #closed form, no search needed
+        except (ValueError, OverflowError, ZeroDivisionError): #eu outside the range the inverse handles, search instead
+            ce = math.nan
+        if not math.isnan(ce):
+            if stats is not None:
+                stats.count('certainty_equivalent.closed_form')
+            return min(max(ce, float(low)), float(high)) #rounding can push ce a hair outside the payoffs
+
+    def gap(m): #zero at the certainty equivalent
+        return u(m) - eu
+    derivative = getattr(u, 'derivative', None)
+    if derivative is not None:
+        if stats is not None:
+            stats.count('certainty_equivalent.newton')
+        return float(_newton_root(gap, derivative, float(low), float(high), tol))
+    if stats is not None:
+        stats.count('certainty_equivalent.brent')
+    return float(_brent_root(gap, float(low), float(high), tol))
+
+
+def risk_premium(lottery, u):
+    """ Returns the risk premium (rp) of a lottery.
+    
+        rp = expected_value(lottery) - certainty_equivalent(lottery, u)
+        
+        args:
+            lottery, list of dictionaries.
+            u, utility function defined over payoffs, or a utility object (UtilityFamily).
+        returns:
+            rp, float, risk premium
+    """
+    summary = lottery_summary(lottery) #keyed and reduced once, for both the expected value and the ce
+    ev = summary.ev
+    tol = 1e-9 #tolerance to deal with rounding error
+    ce = _certainty_equivalent_of(summary, u)
+
+    rp = ev - ce #risk premium is expected value minus certainty equivalent
+    if abs(rp) < tol: #if risk premium is very close to 0 within tolerance
+        rp = 0.0 #sets risk premium to exactly 0.0
+    return float (rp)
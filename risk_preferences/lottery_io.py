@@ -0,0 +1,185 @@
+"""Reading and writing lotteries as JSON Lines and CSV files, one lottery at a time.
+
+    JSON Lines: one lottery per line, either the list of dictionaries itself
+        [{"out": 0, "prob": 0.5}, {"out": [{"out": 5, "prob": 0.5}, {"out": 9, "prob": 0.5}], "prob": 0.5}]
+    or an object with an id
+        {"id": "a1", "lottery": [...]}
+    (lotteries without an id get their 0-based line number).
+
+    CSV: header id,path,prob,out and one row per outcome. path is the position of the outcome in its lottery,
+    with the positions of the sub-lotteries above it in front, separated by dots ("1.0" is the first outcome of
+    the sub-lottery at position 1). A sub-lottery has its own row with an empty out, before its outcomes.
+    The rows of one lottery are next to each other, so lotteries can be read one at a time.
+
+        id,path,prob,out
+        a1,0,0.5,0
+        a1,1,0.5,
+        a1,1.0,0.5,5
+        a1,1.1,0.5,9
+"""
+import csv
+import json
+import sys
+from contextlib import contextmanager
+from itertools import groupby
+
+CSV_HEADER = ('id', 'path', 'prob', 'out')
+
+
+def lottery_from_json(line, line_number=0):
+    """Parses one JSON Lines record. Returns (id, lottery).
+
+        raises:
+            ValueError: if the line is not valid JSON or not a lottery
+    """
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"line {line_number + 1}: {e}") from None
+    if isinstance(record, dict):
+        lottery_id, lottery = record.get('id', line_number), record.get('lottery')
+    else:
+        lottery_id, lottery = line_number, record
+    if not isinstance(lottery, list):
+        raise ValueError(f"line {line_number + 1}: expected a list of outcomes or an object with a 'lottery' list.")
+    return lottery_id, lottery
+
+
+def lottery_to_json(lottery_id, lottery):
+    return json.dumps({'id': lottery_id, 'lottery': lottery}, separators=(',', ':'))
+
+
+def lottery_from_csv_rows(rows):
+    """Builds one lottery from its CSV rows (path, prob, out), in file order.
+
+        raises:
+            ValueError: if a path skips a position or an outcome comes before its sub-lottery row
+    """
+    lottery = []
+    nodes = {(): lottery} #path of every (sub-)lottery seen so far -> its list of outcomes
+    for path, prob, out in rows:
+        try:
+            position = tuple(int(part) for part in path.split('.'))
+        except ValueError:
+            raise ValueError(f"bad path {path!r}.") from None
+        parent = nodes.get(position[:-1])
+        if parent is None:
+            raise ValueError(f"path {path!r} comes before the row of its sub-lottery.")
+        if position[-1] != len(parent):
+            raise ValueError(f"path {path!r} is out of order (expected position {len(parent)}).")
+        if out.strip() == '': #a sub-lottery, its outcomes follow
+            nodes[position] = []
+            parent.append({'out': nodes[position], 'prob': float(prob)})
+        else:
+            parent.append({'out': float(out), 'prob': float(prob)})
+    return lottery
+
+
+def lottery_to_csv_rows(lottery_id, lottery):
+    """Yields the CSV rows (id, path, prob, out) of one lottery, every sub-lottery row right before its outcomes."""
+    stack = [('', iter(enumerate(lottery)))] #(path prefix, outcomes still to write) of every open (sub-)lottery
+    while stack:
+        prefix, outcomes = stack[-1]
+        for position, outcome in outcomes:
+            path = f"{prefix}{position}"
+            if isinstance(outcome['out'], list):
+                yield (lottery_id, path, outcome['prob'], '')
+                stack.append((path + '.', iter(enumerate(outcome['out']))))
+                break #write the sub-lottery's outcomes first, then come back to this one
+            yield (lottery_id, path, outcome['prob'], outcome['out'])
+        else: #every outcome written
+            stack.pop()
+
+
+def detect_format(path, fmt=None):
+    """'jsonl' or 'csv' from fmt or from the file name (.csv is CSV, anything else JSON Lines)."""
+    if fmt:
+        return fmt
+    return 'csv' if str(path).lower().endswith('.csv') else 'jsonl'
+
+
+@contextmanager
+def open_text(path, mode='r'):
+    """open() for text files, with '-' meaning stdin/stdout."""
+    if path == '-':
+        yield sys.stdin if 'r' in mode else sys.stdout
+    else:
+        with open(path, mode, newline='' if 'w' in mode else None, encoding='utf-8') as f:
+            yield f
+
+
+def iter_jsonl_records(lines, chunk_size):
+    """Groups raw JSON Lines into lists of (line number, line), skipping blank lines. The lines are parsed later."""
+    chunk = []
+    for line_number, line in enumerate(lines):
+        if line.strip():
+            chunk.append((line_number, line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_csv_records(lines, chunk_size):
+    """Groups CSV rows into lists of (id, [(path, prob, out), ...]), one entry per lottery.
+
+        raises:
+            ValueError: if the header is not id,path,prob,out
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    if tuple(name.strip() for name in header) != CSV_HEADER:
+        raise ValueError(f"CSV header must be {','.join(CSV_HEADER)}, got {','.join(header)}.")
+    reader = (row for row in reader if any(cell.strip() for cell in row)) #blank lines are no rows
+    chunk = []
+    for lottery_id, rows in groupby(reader, key=lambda row: row[0]): #consecutive rows with the same id
+        chunk.append((lottery_id, [tuple(row[1:4]) for row in rows]))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_records(records, fmt):
+    """Turns one chunk from iter_jsonl_records / iter_csv_records into lists (ids, lotteries)."""
+    ids, lotteries = [], []
+    for record in records:
+        if fmt == 'csv':
+            lottery_id, rows = record
+            try:
+                lottery = lottery_from_csv_rows(rows)
+            except ValueError as e:
+                raise ValueError(f"lottery {lottery_id!r}: {e}") from None
+        else:
+            lottery_id, lottery = lottery_from_json(record[1], record[0])
+        ids.append(lottery_id)
+        lotteries.append(lottery)
+    return ids, lotteries
+
+
+def iter_lottery_file(path, fmt=None, chunk_size=10_000):
+    """Yields (ids, lotteries) chunks of a JSON Lines or CSV lottery file ('-' for stdin)."""
+    fmt = detect_format(path, fmt)
+    with open_text(path) as f:
+        chunks = iter_csv_records(f, chunk_size) if fmt == 'csv' else iter_jsonl_records(f, chunk_size)
+        for records in chunks:
+            yield parse_records(records, fmt)
+
+
+def write_lottery_file(path, lotteries, fmt=None, ids=None):
+    """Writes lotteries to a JSON Lines or CSV file ('-' for stdout); ids default to 0, 1, 2, ..."""
+    fmt = detect_format(path, fmt)
+    with open_text(path, 'w') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(CSV_HEADER)
+        for number, lottery in enumerate(lotteries):
+            lottery_id = number if ids is None else ids[number]
+            if fmt == 'csv':
+                writer.writerows(lottery_to_csv_rows(lottery_id, lottery))
+            else:
+                f.write(lottery_to_json(lottery_id, lottery) + '\n')
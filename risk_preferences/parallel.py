@@ -0,0 +1,192 @@
+"""Process-pool engine for large sweeps over lotteries and utility parameters."""
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .arrays import LotteryBatch, batch_certainty_equivalents, batch_risk_premiums
+from .choice import _best_index
+from .utilities import invertible_utility
+
+
+# Parallel engine
+# Large sweeps (many lotteries times a grid of utility parameters) are split into shards of lotteries and run
+# on a process pool. The packed payoff/probability arrays are put in shared memory once; workers attach to
+# them by name instead of receiving pickled lotteries, and results come back in shard order, so the output
+# is the same for any number of workers.
+
+class SharedLotteryBatch:
+    """Copies a LotteryBatch into shared memory blocks that other processes can attach to.
+
+        Use it as a context manager (or call close()) so the shared memory is released afterwards.
+    """
+    def __init__(self, batch):
+        self._blocks = []
+        self.spec = [] #(shared memory name, dtype, length) of payoffs, probs and offsets, small enough to pickle
+        for array in (batch.payoffs, batch.probs, batch.offsets):
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self._blocks.append(block)
+            self.spec.append((block.name, array.dtype.str, array.size))
+        self.spec = tuple(self.spec)
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach_batch(spec):
+    """Opens the LotteryBatch described by SharedLotteryBatch.spec. Returns (batch, blocks to close later)."""
+    blocks, arrays = [], []
+    try:
+        for name, dtype, size in spec:
+            #pool workers report to the parent's resource tracker whatever the start method (fork, spawn, forkserver),
+            #so attaching registers the name a second time and only the parent's unlink() frees the block
+            block = shared_memory.SharedMemory(name=name)
+            blocks.append(block)
+            arrays.append(np.ndarray((size,), dtype=dtype, buffer=block.buf))
+        return LotteryBatch(*arrays), blocks
+    except BaseException:
+        arrays.clear() #no views may outlive a closed block
+        for block in blocks:
+            block.close()
+        raise
+
+
+def _shard_of(batch, start, stop):
+    """Lotteries start..stop-1 of a batch as a LotteryBatch of views (no copying)."""
+    lo, hi = batch.offsets[start], batch.offsets[stop]
+    return LotteryBatch(batch.payoffs[lo:hi], batch.probs[lo:hi], batch.offsets[start:stop + 1] - lo)
+
+
+def _utilities_from_spec(u_spec):
+    """Builds the list of utility functions a worker evaluates.
+
+        u_spec is ('callable', u) for one picklable utility, or ('family', kernel, param_name, values)
+        for kernel(m, **{param_name: v}) at every v (built with invertible_utility, so ce uses the inverse).
+    """
+    if u_spec[0] == 'callable':
+        return [u_spec[1]]
+    _tag, kernel, param_name, values = u_spec
+    return [invertible_utility(kernel, **{param_name: v}) for v in values]
+
+
+def _measure(batch, u, measure, tol):
+    if measure == 'ev':
+        return batch.expected_values()
+    if measure == 'eu':
+        return batch.expected_utilities(u)
+    if measure == 'ce':
+        return batch_certainty_equivalents(batch, u, tol)
+    if measure == 'rp':
+        return batch_risk_premiums(batch, u, tol)
+    raise ValueError(f"Unknown measure {measure!r}; use 'ev', 'eu', 'ce' or 'rp'.")
+
+
+def _run_shard(spec, start, stop, measure, u_spec, tol):
+    """Worker task: attach to the shared batch and score lotteries start..stop-1 under every utility."""
+    batch = shard = None
+    blocks = []
+    try:
+        batch, blocks = _attach_batch(spec)
+        shard = _shard_of(batch, start, stop)
+        return np.array([_measure(shard, u, measure, tol) for u in _utilities_from_spec(u_spec)])
+    finally:
+        batch = shard = None #views into the shared memory have to go before the blocks are closed
+        for block in blocks:
+            block.close()
+
+
+def _check_picklable(u_spec):
+    """Raises TypeError, before any process is started, if the utility cannot be sent to the workers."""
+    try:
+        pickle.dumps(u_spec)
+    except (pickle.PicklingError, AttributeError, TypeError) as e: #lambdas and closures fail with one or the other
+        raise TypeError(f"The utility {u_spec[1]!r} cannot be pickled, so it cannot be sent to worker processes: use a "
+                        f"module level function, functools.partial or a utility object, or workers=1. ({e})") from None
+
+
+def _run_sharded(lotteries, measure, u_spec, workers=None, shard_size=None, tol=1e-9):
+    """Scores lotteries under every utility of u_spec, sharded across a process pool.
+
+        returns:
+            2-D ndarray, row i holds the scores of every lottery under utility i
+    """
+    if not isinstance(lotteries, LotteryBatch):
+        lotteries = LotteryBatch.from_lotteries(lotteries)
+    n = len(lotteries)
+    workers = workers or os.cpu_count() or 1
+    if shard_size is None:
+        shard_size = max(1, -(-n // (4 * workers))) #about four shards per worker to even out the load
+    if workers == 1 or n <= shard_size: #not worth starting processes
+        return np.array([_measure(lotteries, u, measure, tol) for u in _utilities_from_spec(u_spec)]).reshape(-1, n)
+    _check_picklable(u_spec)
+    bounds = [(start, min(start + shard_size, n)) for start in range(0, n, shard_size)]
+    with SharedLotteryBatch(lotteries) as shared, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_shard, shared.spec, start, stop, measure, u_spec, tol) for start, stop in bounds]
+        parts = [future.result() for future in futures] #collected in shard order, so the merge is deterministic
+    return np.concatenate(parts, axis=1)
+
+
+def parallel_sweep(lotteries, kernel, param_name, values, measure='ce', workers=None, shard_size=None, tol=1e-9):
+    """Scores every lottery under every parameter value of a utility family, on all cores.
+
+        args:
+            lotteries, LotteryBatch or iterable of lotteries
+            kernel, array utility function such as crra_vec or cara_vec
+            param_name, str, name of the swept parameter ('gamma', 'a', ...)
+            values, 1-D sequence of parameter values
+            measure, 'ev', 'eu', 'ce' or 'rp'
+            workers, int, number of processes (default: all cores)
+            shard_size, int, lotteries per task (default: about four tasks per worker)
+        returns:
+            2-D ndarray of shape (len(values), number of lotteries)
+
+        Test case:
+            parallel_sweep(make_random_lottery_batch(100_000, seed=1), cara_vec, 'a', [0.01, 0.05, 0.1], measure='ce').shape
+            should return (3, 100000)
+    """
+    return _run_sharded(lotteries, measure, ('family', kernel, param_name, list(values)), workers, shard_size, tol)
+
+
+def parallel_expected_utilities(lotteries, u, workers=None, shard_size=None):
+    """expected_utility of every lottery, on all cores.
+
+        u has to be picklable (a module level function, functools.partial or a utility object such as CARAUtility);
+        a lambda or a function defined inside another one raises TypeError unless workers=1.
+    """
+    return _run_sharded(lotteries, 'eu', ('callable', u), workers, shard_size)[0]
+
+
+def parallel_certainty_equivalents(lotteries, u, workers=None, shard_size=None, tol=1e-9):
+    """certainty_equivalent of every lottery, on all cores. u has to be picklable, as in parallel_expected_utilities."""
+    return _run_sharded(lotteries, 'ce', ('callable', u), workers, shard_size, tol)[0]
+
+
+def parallel_lottery_choice(menus, u, workers=None, shard_size=None):
+    """lottery_choice for many menus at once, on all cores.
+
+        args:
+            menus, list of lottery lists (each one is a lottery_list for lottery_choice)
+            u, picklable utility function over payoffs (see parallel_expected_utilities)
+        returns:
+            list of (lottery_index, eu), one per menu, the same as lottery_choice(menu, u)
+    """
+    sizes = [len(menu) for menu in menus]
+    eus = parallel_expected_utilities([lot for menu in menus for lot in menu], u, workers, shard_size)
+    choices = []
+    start = 0
+    for size in sizes: #argmax inside each menu
+        choices.append(_best_index(eus[start:start + size]))
+        start += size
+    return choices
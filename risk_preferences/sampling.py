@@ -0,0 +1,279 @@
+"""Monte Carlo evaluation of lotteries too large to enumerate: EV, EU, CE and risk premium with standard errors.
+
+    The exact functions visit every leaf, and a compound lottery that reuses the same sub-lottery object
+    in several places has a number of leaves that grows multiplicatively with its depth. AliasTree compiles
+    every distinct (sub-)lottery object once, so its size is the number of distinct nodes, and gives each
+    node a Vose alias table: drawing an outcome of a node costs O(1) whatever its number of outcomes. A
+    sample walks from the top lottery down to a payoff, one vectorized step per level for a whole block
+    of samples at once.
+"""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from .arrays import Lottery, _utility_of_array
+from .lotteries import _solve_certainty_equivalent
+from .utilities import as_utility
+
+SAMPLE_STREAM_KEY = 2**32 - 1 #spawn_key word of sample_payoffs; Monte Carlo workers use 0, 1, ..., lottery_rng none
+
+
+def _alias_table(probs):
+    """Vose's alias method for one node: returns (threshold, alias) lists for O(1) sampling.
+
+        Draw column i uniformly, then keep i if a uniform number is below threshold[i], otherwise take alias[i].
+    """
+    n = len(probs)
+    total = sum(probs)
+    scaled = [p * n / total for p in probs] #average 1, so every column holds exactly one unit
+    threshold, alias = [1.0] * n, list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        threshold[s], alias[s] = scaled[s], l #column s: its own mass, topped up by l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    for i in small + large: #what is left is 1 up to rounding
+        threshold[i] = 1.0
+    return threshold, alias
+
+
+class AliasTree:
+    """A lottery compiled for sampling: one alias table per distinct (sub-)lottery object.
+
+        Node 0 is the lottery itself. The entries of node k are starts[k]:starts[k] + sizes[k], and for
+        every entry i: payoffs[i] (nan for a sub-lottery), children[i] (node of the sub-lottery or -1),
+        threshold[i] and alias[i] (the alias table, alias as a position inside the node).
+
+        args:
+            lottery, list-of-dictionaries or Lottery
+        raises:
+            ValueError: for an empty (sub-)lottery or a lottery that contains itself
+
+        Test case:
+            inner = [{'out': 0, 'prob': 0.5}, {'out': 10, 'prob': 0.5}]
+            for _ in range(60): inner = [{'out': inner, 'prob': 0.5}, {'out': inner, 'prob': 0.5}]
+            AliasTree(inner).num_nodes should return 61 (the lottery has 2**61 leaves)
+    """
+    __slots__ = ('payoffs', 'children', 'threshold', 'alias', 'starts', 'sizes', 'low', 'high')
+
+    def __init__(self, lottery):
+        if isinstance(lottery, Lottery):
+            lottery = lottery.to_dicts()
+        node_of = {id(lottery): 0} #id of every (sub-)lottery list seen -> node number
+        nodes = [lottery] #kept alive, so the ids stay unique while compiling
+        payoffs, children, threshold, alias, starts, sizes = [], [], [], [], [], []
+        k = 0
+        while k < len(nodes): #breadth first over distinct nodes, no recursion
+            node = nodes[k]
+            if not node:
+                raise ValueError("Every (sub-)lottery needs at least one outcome.")
+            starts.append(len(payoffs))
+            sizes.append(len(node))
+            for outcome in node:
+                out = outcome['out']
+                if isinstance(out, list):
+                    child = node_of.get(id(out))
+                    if child is None: #first time this sub-lottery object is seen
+                        child = node_of[id(out)] = len(nodes)
+                        nodes.append(out)
+                    payoffs.append(math.nan)
+                    children.append(child)
+                else:
+                    payoffs.append(float(out))
+                    children.append(-1)
+            node_threshold, node_alias = _alias_table([float(outcome['prob']) for outcome in node])
+            threshold.extend(node_threshold)
+            alias.extend(node_alias)
+            k += 1
+        self.payoffs = np.array(payoffs)
+        self.children = np.array(children, dtype=np.intp)
+        self.threshold = np.array(threshold)
+        self.alias = np.array(alias, dtype=np.intp)
+        self.starts = np.array(starts, dtype=np.intp)
+        self.sizes = np.array(sizes, dtype=np.intp)
+        leaf_payoffs = self.payoffs[self.children < 0]
+        if leaf_payoffs.size == 0:
+            raise ValueError("The lottery has no payoffs.")
+        self.low, self.high = float(leaf_payoffs.min()), float(leaf_payoffs.max()) #bounds of the certainty equivalent
+
+    @property
+    def num_nodes(self):
+        return self.starts.size
+
+    def __repr__(self):
+        return f"AliasTree(nodes={self.num_nodes}, entries={self.payoffs.size})"
+
+    def sample(self, n, rng):
+        """Draws n payoffs of the lottery (each leaf with the probability of reaching it).
+
+            args:
+                n, int, number of draws
+                rng, numpy.random.Generator
+            returns:
+                1-D ndarray of n payoffs
+        """
+        node = np.zeros(n, dtype=np.intp) #every draw starts at the top lottery
+        out = np.empty(n)
+        active = np.arange(n) #draws still inside a sub-lottery
+        for _ in range(self.num_nodes): #a path visits every node at most once, unless the lottery contains itself
+            starts, sizes = self.starts[node], self.sizes[node]
+            column = np.minimum((rng.random(active.size) * sizes).astype(np.intp), sizes - 1)
+            entry = starts + column
+            keep = rng.random(active.size) < self.threshold[entry]
+            entry = np.where(keep, entry, starts + self.alias[entry])
+            child = self.children[entry]
+            is_leaf = child < 0
+            out[active[is_leaf]] = self.payoffs[entry[is_leaf]]
+            active, node = active[~is_leaf], child[~is_leaf]
+            if active.size == 0:
+                return out
+        raise ValueError("The lottery contains itself, so a draw never reaches a payoff.")
+
+
+class MonteCarloResult(NamedTuple):
+    """Estimates and their standard errors from monte_carlo_evaluate."""
+    ev: float
+    ev_se: float
+    eu: float
+    eu_se: float
+    ce: float
+    ce_se: float #delta method: eu_se / u'(ce)
+    rp: float
+    rp_se: float #delta method on ev - ce, with the covariance of payoffs and utilities
+    samples: int
+    seconds: float
+
+
+class _Moments:
+    """Count, means and co-moment matrix of (payoff, utility) pairs, merged block by block (Chan et al.)."""
+    __slots__ = ('n', 'mean', 'comoment')
+
+    def __init__(self, n=0, mean=None, comoment=None):
+        self.n = n
+        self.mean = np.zeros(2) if mean is None else mean
+        self.comoment = np.zeros((2, 2)) if comoment is None else comoment
+
+    def merge(self, n, mean, comoment):
+        if n == 0:
+            return self
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.comoment = self.comoment + comoment + np.outer(delta, delta) * self.n * n / total
+        self.n = total
+        return self
+
+    def update(self, payoffs, utils):
+        block = np.stack((payoffs, utils))
+        mean = block.mean(axis=1)
+        centered = block - mean[:, None]
+        return self.merge(payoffs.size, mean, centered @ centered.T)
+
+
+def _slope(u, m, low, high):
+    """u'(m), from u.derivative or a central difference that stays inside [low, high]."""
+    derivative = getattr(u, 'derivative', None)
+    if derivative is not None:
+        return float(derivative(m))
+    h = 1e-6 * max(1.0, abs(m))
+    left, right = max(m - h, low), min(m + h, high)
+    return (u(right) - u(left)) / (right - left) if right > left else math.nan
+
+
+def _estimates(moments, u, low, high, tol):
+    """Turns accumulated moments into a MonteCarloResult (samples and seconds are filled in by the caller)."""
+    n = moments.n
+    cov = moments.comoment / (n - 1) if n > 1 else np.zeros((2, 2))
+    ev, eu = float(moments.mean[0]), float(moments.mean[1])
+    ce = _solve_certainty_equivalent(u, eu, low, high, tol)
+    slope = _slope(u, ce, low, high)
+    ev_se, eu_se = math.sqrt(cov[0, 0] / n), math.sqrt(cov[1, 1] / n)
+    with np.errstate(all='ignore'):
+        ce_se = eu_se / slope if slope > 0 else math.nan
+        rp_var = cov[0, 0] + cov[1, 1] / slope ** 2 - 2 * cov[0, 1] / slope if slope > 0 else math.nan #var of x - u(x)/u'(ce)
+    rp_se = math.sqrt(max(rp_var, 0.0) / n) if not math.isnan(rp_var) else math.nan
+    return MonteCarloResult(ev, ev_se, eu, eu_se, ce, ce_se, ev - ce, rp_se, n, 0.0)
+
+
+def _sample_moments(tree, u, seed, stream, worker, block_size, target_se, time_budget, max_samples, tol):
+    """Draws blocks of samples from stream (seed, stream, worker) until the ce standard error is at most
+    target_se, time_budget seconds have passed or max_samples are drawn. Runs in the worker processes.
+
+        returns:
+            (n, mean, comoment) of the (payoff, utility) pairs
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream, worker)))
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    moments = _Moments()
+    while moments.n < max_samples:
+        payoffs = tree.sample(min(block_size, max_samples - moments.n), rng)
+        moments.update(payoffs, _utility_of_array(u, payoffs))
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        if target_se is not None and moments.n > 1 and _estimates(moments, u, tree.low, tree.high, tol).ce_se <= target_se:
+            break
+    return moments.n, moments.mean, moments.comoment
+
+
+def monte_carlo_evaluate(lottery, u, target_se=None, time_budget=None, max_samples=10_000_000, block_size=100_000,
+                         seed=None, stream=0, workers=1, tol=1e-9):
+    """Estimates EV, EU, CE and risk premium of a lottery by sampling payoffs through its alias tables.
+
+        Without target_se and time_budget exactly max_samples payoffs are drawn. With them, blocks of
+        block_size draws are added until the standard error of the ce is at most target_se or the time
+        budget is used up (whichever comes first; max_samples is still the limit).
+
+        args:
+            lottery, list-of-dictionaries, Lottery or AliasTree (compile once with AliasTree(lottery) to reuse it)
+            u, increasing utility function over payoffs, or a utility object (UtilityFamily)
+            target_se, float, wanted standard error of the certainty equivalent, in payoff units
+            time_budget, float, seconds (per worker)
+            max_samples, int, most draws in total
+            block_size, int, draws per vectorized block
+            seed, int or None, with stream: which random streams to use. Worker w draws from
+                SeedSequence(seed, spawn_key=(stream, w)), so the result is reproducible for a given
+                seed, stream and number of workers, and different streams never overlap
+            workers, int, number of processes (0 or None: all cores); u has to be picklable when > 1
+            tol, float, accuracy of the ce when it has to be searched for
+        returns:
+            MonteCarloResult(ev, ev_se, eu, eu_se, ce, ce_se, rp, rp_se, samples, seconds)
+
+        Test case:
+            monte_carlo_evaluate([{'out': 0, 'prob': 0.5}, {'out': 10, 'prob': 0.5}], linear_utility, max_samples=10**6, seed=1).ev
+            should return about 5.0 (within a few times ev_se = 0.005)
+    """
+    start = time.perf_counter()
+    tree = lottery if isinstance(lottery, AliasTree) else AliasTree(lottery)
+    u = as_utility(u)
+    workers = workers or os.cpu_count() or 1
+    if seed is None: #fresh entropy, drawn once so every worker shares the same seed
+        seed = np.random.SeedSequence().entropy
+    if workers == 1:
+        parts = [_sample_moments(tree, u, seed, stream, 0, block_size, target_se, time_budget, max_samples, tol)]
+    else:
+        shares = [max_samples // workers + (w < max_samples % workers) for w in range(workers)]
+        worker_se = None if target_se is None else target_se * math.sqrt(workers) #w equal parts merge to se / sqrt(w)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_sample_moments, tree, u, seed, stream, w, block_size, worker_se, time_budget, share, tol)
+                       for w, share in enumerate(shares) if share > 0]
+            parts = [future.result() for future in futures] #in worker order, so the merge is deterministic
+    moments = _Moments()
+    for n, mean, comoment in parts:
+        moments.merge(n, mean, comoment)
+    return _estimates(moments, u, tree.low, tree.high, tol)._replace(seconds=time.perf_counter() - start)
+
+
+def sample_payoffs(lottery, n, seed=None, stream=0):
+    """Draws n payoffs of a lottery (list-of-dictionaries, Lottery or AliasTree) from stream (seed, stream).
+
+        The draws come from SeedSequence(seed, spawn_key=(stream, SAMPLE_STREAM_KEY)), apart from the numbers
+        lottery_rng(seed, stream) and the Monte Carlo workers of the same seed and stream use.
+    """
+    tree = lottery if isinstance(lottery, AliasTree) else AliasTree(lottery)
+    return tree.sample(n, np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream, SAMPLE_STREAM_KEY))))
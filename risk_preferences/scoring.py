@@ -0,0 +1,307 @@
+"""Batch scoring of lottery files: EV, EU, CE and risk premium of every lottery for a grid of utility parameters.
+
+    Used by `python -m risk_preferences score`. The input file is read one chunk of lotteries at a time,
+    chunks are scored on a process pool (or inline with one worker) and written out in input order, so
+    memory stays bounded by a few chunks and the output is the same for any number of workers.
+
+    A lottery that does not parse, or that a grid point's utility is not defined for, does not stop the run:
+    its rows get nan scores and the reason in the error column. Before any output is written, every grid
+    point is built, and on request (check_range, not for stdin, which can only be read once) checked against
+    the lowest and highest payoff of the file, so a grid that does not fit the data is reported up front.
+"""
+import csv
+import io
+import json
+import math
+import os
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+
+from .arrays import LotteryBatch, batch_certainty_equivalents
+from .families import CARAUtility, CRRAUtility, LinearUtility, QuadraticUtility
+from .lottery_io import detect_format, iter_csv_records, iter_jsonl_records, open_text, parse_records
+from .parallel import _shard_of
+
+FAMILIES = { #--family name -> UtilityFamily class
+    'linear': LinearUtility,
+    'cara': CARAUtility,
+    'crra': CRRAUtility,
+    'quadratic': QuadraticUtility,
+}
+MEASURES = ('ev', 'eu', 'ce', 'rp')
+ERRORS = (ValueError, TypeError, LookupError, ArithmeticError) #what a malformed lottery or an undefined utility raises
+
+
+def parse_param_grid(family, specs):
+    """Turns --param specs into the list of parameter dicts to score, the cartesian product of all specs.
+
+        args:
+            family, str, key of FAMILIES
+            specs, list of str, each NAME=v1,v2,... or NAME=start:stop:num (num evenly spaced values)
+        returns:
+            list of dicts {name: float}, one per grid point; parameters without a spec take the family's default
+        raises:
+            ValueError: for an unknown family or parameter, or a spec that does not parse
+
+        Test case:
+            parse_param_grid('crra', ['gamma=0.5,1,2'])
+            should return [{'gamma': 0.5}, {'gamma': 1.0}, {'gamma': 2.0}]
+    """
+    if family not in FAMILIES:
+        raise ValueError(f"Unknown family {family!r}; choose from {list(FAMILIES)}.")
+    cls = FAMILIES[family]
+    values = {name: [float(cls.defaults[name])] for name in cls.param_names}
+    for spec in specs or ():
+        name, sep, text = spec.partition('=')
+        name = name.strip()
+        if not sep or name not in values:
+            raise ValueError(f"Bad --param {spec!r}; expected NAME=VALUES with NAME one of {list(cls.param_names)}.")
+        try:
+            if ':' in text:
+                start, stop, num = text.split(':')
+                values[name] = [float(v) for v in np.linspace(float(start), float(stop), int(num))]
+            else:
+                values[name] = [float(v) for v in text.split(',')]
+        except ValueError:
+            raise ValueError(f"Bad --param {spec!r}; use NAME=v1,v2,... or NAME=start:stop:num.") from None
+        if not values[name]:
+            raise ValueError(f"--param {spec!r} has no values.")
+    return [dict(zip(cls.param_names, point)) for point in product(*values.values())]
+
+
+def output_header(family):
+    """Column names of the CSV score output: id, the family's parameters, the measures, then error."""
+    return ('id',) + FAMILIES[family].param_names + MEASURES + ('error',)
+
+
+def _error_text(error):
+    return f"{type(error).__name__}: {error}"
+
+
+def _parse_chunk(records, input_format):
+    """Parses and packs one chunk; only a chunk that fails as a whole is gone through one record at a time.
+
+        returns:
+            ids, list with one id per record (the line number, or the CSV id, for a record that does not parse)
+            errors, list with None or the error text of every record
+            valid, list of positions of the packed lotteries
+            batch, LotteryBatch of the lotteries at valid
+    """
+    try:
+        ids, lotteries = parse_records(records, input_format)
+        errors = [None] * len(ids)
+    except ERRORS: #find the records that do not parse one by one
+        ids, lotteries, errors = [], [], []
+        for record in records:
+            try:
+                (lottery_id,), (lottery,) = parse_records([record], input_format)
+                error = None
+            except ERRORS as e:
+                lottery_id, lottery, error = record[0], None, _error_text(e)
+            ids.append(lottery_id)
+            lotteries.append(lottery)
+            errors.append(error)
+    valid = [i for i, lottery in enumerate(lotteries) if lottery is not None]
+    try:
+        batch = LotteryBatch.from_lotteries([lotteries[i] for i in valid])
+    except ERRORS: #find the lotteries that do not pack (missing keys, payoffs that are not numbers) one by one
+        for i in valid:
+            try:
+                LotteryBatch.from_lotteries([lotteries[i]])
+            except ERRORS as e:
+                errors[i] = _error_text(e)
+        valid = [i for i in valid if errors[i] is None]
+        batch = LotteryBatch.from_lotteries([lotteries[i] for i in valid])
+    return ids, errors, valid, batch
+
+
+def _score_batch(batch, u, tol):
+    """(eus, ces, errors) of every lottery of batch under u, nan and {position: error text} for those that fail.
+
+        The whole batch is scored in one go; a range that raises is split in halves until the lotteries that
+        fail on their own are found, so one bad lottery costs O(log n) extra batch calls.
+    """
+    n = len(batch)
+    eus, ces = np.full(n, np.nan), np.full(n, np.nan)
+    errors = {}
+    stack = [(0, n)] if n else []
+    while stack:
+        start, stop = stack.pop()
+        part = _shard_of(batch, start, stop)
+        try:
+            part_eus = part.expected_utilities(u)
+            part_ces = batch_certainty_equivalents(part, u, tol, eus=part_eus)
+        except ERRORS as e:
+            if stop - start == 1:
+                errors[start] = _error_text(e)
+            else:
+                middle = (start + stop) // 2
+                stack += [(middle, stop), (start, middle)]
+            continue
+        eus[start:stop], ces[start:stop] = part_eus, part_ces
+    return eus, ces, errors
+
+
+def _score_chunk(payload):
+    """Parses and scores one chunk of records. Runs in the worker processes, so it only takes and returns plain data.
+
+        args:
+            payload, tuple (records, input format, family, grid, tol, output format, strict)
+        returns:
+            (number of lotteries, number of lotteries with an error, str), the output lines of the chunk,
+            lottery by lottery and grid point by grid point
+        raises:
+            ValueError: with strict, for the first lottery that cannot be scored
+    """
+    records, input_format, family, grid, tol, output_format, strict = payload
+    ids, errors, valid, batch = _parse_chunk(records, input_format)
+    if not ids:
+        return 0, 0, ''
+    n = len(ids)
+    evs = np.full(n, np.nan)
+    evs[valid] = batch.expected_values() #the same for every grid point
+    scores = [] #one (eus, ces, rps, errors by position) per grid point
+    for params in grid:
+        u = FAMILIES[family](**params)
+        eus, ces, rps = np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+        eus[valid], ces[valid], batch_errors = _score_batch(batch, u, tol)
+        rps[valid] = evs[valid] - ces[valid]
+        rps[np.abs(rps) < tol] = 0.0
+        scores.append((eus.tolist(), ces.tolist(), rps.tolist(), {valid[k]: text for k, text in batch_errors.items()}))
+    evs = evs.tolist()
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n') if output_format == 'csv' else None
+    names = FAMILIES[family].param_names
+    failed = 0
+    for i, lottery_id in enumerate(ids):
+        any_error = False
+        for params, (eus, ces, rps, grid_errors) in zip(grid, scores):
+            error = errors[i] or grid_errors.get(i)
+            if error is not None:
+                if strict:
+                    raise ValueError(f"lottery {lottery_id!r}: {error}")
+                any_error = True
+            row = [evs[i], eus[i], ces[i], rps[i]]
+            if writer is not None:
+                writer.writerow([lottery_id] + [params[name] for name in names] + row + [error or ''])
+            else:
+                record = {'id': lottery_id, **params, **dict(zip(MEASURES, row))}
+                if error is not None:
+                    record['error'] = error
+                out.write(json.dumps(record, separators=(',', ':')) + '\n')
+        failed += any_error
+    return n, failed, out.getvalue()
+
+
+def _chunk_payoff_range(payload):
+    """(lowest, highest) payoff of the lotteries of one chunk that parse, None if there are none. Runs in the workers."""
+    _ids, _errors, _valid, batch = _parse_chunk(*payload) #the errors are reported when the chunk is scored
+    if batch.payoffs.size == 0:
+        return None
+    return float(batch.payoffs.min()), float(batch.payoffs.max())
+
+
+def _check_grid(family, grid, payoff_range, strict):
+    """Builds every grid point's utility and tries it at the lowest and highest payoff of the file.
+
+        Grid points the family rejects always raise; grid points the utility is undefined for at some payoffs
+        raise with strict, or are reported with a warning (their lotteries then get an error in the output).
+    """
+    utilities = [FAMILIES[family](**params) for params in grid]
+    if payoff_range is None:
+        return
+    undefined = []
+    for params, u in zip(grid, utilities):
+        try:
+            u(np.array(payoff_range))
+        except ERRORS as e:
+            undefined.append(f"{params}: {e}")
+    if undefined:
+        message = (f"{len(undefined)} of {len(grid)} grid points are undefined for some payoffs of the input, "
+                   f"which range from {payoff_range[0]} to {payoff_range[1]}: " + "; ".join(undefined))
+        if strict:
+            raise ValueError(message)
+        warnings.warn(message, stacklevel=3)
+
+
+def _ordered_map(function, payloads, workers):
+    """Yields function(payload) in payload order, keeping at most about two chunks per worker in flight."""
+    if workers <= 1:
+        for payload in payloads:
+            yield function(payload)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for payload in payloads:
+            pending.append(pool.submit(function, payload))
+            if len(pending) >= 2 * workers: #bounded read-ahead, the input is never held in memory all at once
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _iter_chunks(source, input_format, chunk_size):
+    return iter_csv_records(source, chunk_size) if input_format == 'csv' else iter_jsonl_records(source, chunk_size)
+
+
+def score_file(input_path, output_path='-', family='crra', grid=None, input_format=None, output_format=None,
+               workers=1, chunk_size=10_000, tol=1e-9, strict=False, check_range=False):
+    """Scores every lottery of a JSON Lines or CSV file and writes one row per lottery and grid point.
+
+        Rows of a lottery that cannot be scored get nan scores and the reason in the error column (CSV), or
+        an 'error' key (JSON Lines). A warning tells how many lotteries that happened to.
+
+        args:
+            input_path, str, lottery file (see lottery_io), '-' for stdin
+            output_path, str, '-' for stdout
+            family, str, key of FAMILIES
+            grid, list of parameter dicts (default: the family's defaults), see parse_param_grid
+            input_format, output_format, 'jsonl' or 'csv' (default: from the file names; stdout is CSV)
+            workers, int, number of processes (0 or None: all cores)
+            chunk_size, int, lotteries per chunk
+            tol, float, tolerance of the certainty equivalent solver
+            strict, bool, stop at the first lottery that cannot be scored, and before writing anything when a
+                    grid point is undefined for some payoffs of the file
+            check_range, bool, True to check the grid against the file's payoff range before scoring (a first
+                         pass over the file, about one more parse of it)
+        returns:
+            int, number of lotteries read
+        raises:
+            ValueError: for a CSV file with a bad header, a family or parameter that does not exist, a parameter
+                        value outside the family's range, or with strict for the first lottery that cannot be scored
+    """
+    grid = grid or parse_param_grid(family, [])
+    input_format = detect_format(input_path, input_format)
+    output_format = output_format or ('csv' if output_path == '-' else detect_format(output_path))
+    workers = workers or os.cpu_count() or 1
+    payoff_range = None
+    if check_range and input_path != '-': #a first pass for the payoff range, before the output is opened
+        lows, highs = [math.inf], [-math.inf]
+        with open_text(input_path) as source:
+            payloads = ((records, input_format) for records in _iter_chunks(source, input_format, chunk_size))
+            for chunk_range in _ordered_map(_chunk_payoff_range, payloads, workers):
+                if chunk_range is not None:
+                    lows.append(chunk_range[0])
+                    highs.append(chunk_range[1])
+        payoff_range = (min(lows), max(highs)) if min(lows) <= max(highs) else None
+    _check_grid(family, grid, payoff_range, strict)
+
+    count = failed = 0
+    with open_text(input_path) as source, open_text(output_path, 'w') as sink:
+        if output_format == 'csv':
+            csv.writer(sink, lineterminator='\n').writerow(output_header(family))
+        payloads = ((records, input_format, family, grid, tol, output_format, strict)
+                    for records in _iter_chunks(source, input_format, chunk_size))
+        for number, chunk_failed, text in _ordered_map(_score_chunk, payloads, workers):
+            sink.write(text)
+            count += number
+            failed += chunk_failed
+    if failed:
+        warnings.warn(f"{failed} of {count} lotteries could not be scored (for every grid point or some of them); "
+                      f"see the error column of the output.", stacklevel=2)
+    return count
@@ -0,0 +1,240 @@
+"""Binary columnar lottery store: lotteries on disk as typed columns, opened with numpy.memmap.
+
+    A store is a directory with one raw little-endian file per column and a meta.json with the counts:
+
+        leaf_payoffs.bin, leaf_probs.bin    float64, the leaves of every lottery, as in LotteryBatch.from_lotteries
+        leaf_offsets.bin                    int64, lottery j owns leaves leaf_offsets[j]:leaf_offsets[j+1]
+        payoffs.bin, probs.bin, children.bin    float64, float64, int64, the entries of every node (as in Lottery)
+        node_offsets.bin                    int64, node k owns entries node_offsets[k]:node_offsets[k+1]
+        lottery_nodes.bin                   int64, lottery j owns nodes lottery_nodes[j]:lottery_nodes[j+1]
+
+    The leaf columns are exactly the arrays of a LotteryBatch, so LotteryStore.batch evaluates straight from the
+    mapped files without copying or parsing anything; the tree columns keep the nesting for a full round trip.
+    children are node numbers inside their own lottery, like in Lottery. meta.json is written last, when the
+    writer is closed, so a store whose writing was interrupted cannot be opened by mistake.
+"""
+import json
+import os
+
+import numpy as np
+
+from .arrays import Lottery, LotteryBatch, _tree_lists
+from .lotteries import _flatten
+
+STORE_FORMAT = 'risk_preferences.lottery_store'
+STORE_VERSION = 1
+COLUMNS = { #column -> dtype of its file
+    'leaf_payoffs': '<f8', 'leaf_probs': '<f8', 'leaf_offsets': '<i8',
+    'payoffs': '<f8', 'probs': '<f8', 'children': '<i8', 'node_offsets': '<i8', 'lottery_nodes': '<i8',
+}
+OFFSET_COLUMNS = ('leaf_offsets', 'node_offsets', 'lottery_nodes') #start with a 0, then one end per lottery/node
+META_FILE = 'meta.json'
+
+
+def _column_file(path, name):
+    return os.path.join(path, f"{name}.bin")
+
+
+class LotteryStoreWriter:
+    """Appends lotteries to a new store, a buffer of chunk_size lotteries at a time.
+
+        args:
+            path, str, directory of the store (created if missing)
+            chunk_size, int, lotteries buffered in memory before they are written out
+            overwrite, bool, replace an existing store at path
+        raises:
+            FileExistsError: if path already holds a store and overwrite is False
+
+        Test case:
+            with LotteryStoreWriter('lotteries.store') as writer:
+                writer.write_many(make_random_lotteries(number=1000, compound=True))
+            len(open_lottery_store('lotteries.store')) should return 1000
+    """
+
+    def __init__(self, path, chunk_size=100_000, overwrite=False):
+        if os.path.exists(os.path.join(path, META_FILE)):
+            if not overwrite:
+                raise FileExistsError(f"{path!r} already holds a lottery store.")
+            os.remove(os.path.join(path, META_FILE)) #the old store is invalid from here on
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.counts = {'lotteries': 0, 'leaves': 0, 'entries': 0, 'nodes': 0} #written so far, buffers included
+        self._files = {name: open(_column_file(path, name), 'wb') for name in COLUMNS}
+        for name in OFFSET_COLUMNS:
+            np.zeros(1, dtype=COLUMNS[name]).tofile(self._files[name])
+        self._buffers = {name: [] for name in COLUMNS}
+        self._buffered = 0 #lotteries in the buffers
+
+    def write(self, lottery):
+        """Appends one lottery (list-of-dictionaries or Lottery)."""
+        if isinstance(lottery, Lottery):
+            leaf_payoffs, leaf_probs = (a.tolist() for a in lottery.leaves())
+            payoffs, probs, children, offsets = (a.tolist() for a in (lottery.payoffs, lottery.probs, lottery.children, lottery.offsets))
+        else:
+            payoff_prob, _ev = _flatten(lottery) #same leaves as LotteryBatch.from_lotteries
+            leaf_payoffs, leaf_probs = list(payoff_prob), list(payoff_prob.values())
+            payoffs, probs, children, offsets = _tree_lists(lottery)
+        counts, buffers = self.counts, self._buffers
+        buffers['leaf_payoffs'].extend(leaf_payoffs)
+        buffers['leaf_probs'].extend(leaf_probs)
+        buffers['payoffs'].extend(payoffs)
+        buffers['probs'].extend(probs)
+        buffers['children'].extend(children)
+        buffers['node_offsets'].extend(counts['entries'] + end for end in offsets[1:]) #local node ends -> store positions
+        counts['lotteries'] += 1
+        counts['leaves'] += len(leaf_payoffs)
+        counts['entries'] += len(payoffs)
+        counts['nodes'] += len(offsets) - 1
+        buffers['leaf_offsets'].append(counts['leaves'])
+        buffers['lottery_nodes'].append(counts['nodes'])
+        self._buffered += 1
+        if self._buffered >= self.chunk_size:
+            self.flush()
+
+    def write_many(self, lotteries):
+        """Appends every lottery of an iterable, e.g. the output of make_random_lotteries."""
+        for lottery in lotteries:
+            self.write(lottery)
+
+    def write_batch(self, batch):
+        """Appends a LotteryBatch with array writes only; each lottery is stored as one node holding its leaves."""
+        self.flush() #keep the file order the same as the call order
+        counts, n = self.counts, len(batch)
+        sizes = np.diff(batch.offsets)
+        columns = {
+            'leaf_payoffs': batch.payoffs, 'leaf_probs': batch.probs, 'leaf_offsets': counts['leaves'] + batch.offsets[1:],
+            'payoffs': batch.payoffs, 'probs': batch.probs, 'children': np.full(batch.payoffs.size, -1),
+            'node_offsets': counts['entries'] + batch.offsets[1:], 'lottery_nodes': counts['nodes'] + np.arange(1, n + 1),
+        }
+        for name, values in columns.items():
+            np.asarray(values, dtype=COLUMNS[name]).tofile(self._files[name])
+        counts['lotteries'] += n
+        counts['leaves'] += int(sizes.sum())
+        counts['entries'] += int(sizes.sum())
+        counts['nodes'] += n
+
+    def flush(self):
+        """Writes the buffered lotteries to the column files."""
+        for name, values in self._buffers.items():
+            if values:
+                np.asarray(values, dtype=COLUMNS[name]).tofile(self._files[name])
+                values.clear()
+        self._buffered = 0
+
+    def close(self):
+        """Flushes, closes the column files and writes meta.json, which makes the store readable."""
+        if self._files is None:
+            return
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = None
+        meta = {'format': STORE_FORMAT, 'version': STORE_VERSION, **self.counts, 'columns': COLUMNS}
+        with open(os.path.join(self.path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._files is not None: #leave the store without meta.json, it is incomplete
+            for f in self._files.values():
+                f.close()
+            self._files = None
+
+
+class LotteryStore:
+    """A lottery store opened for reading. The columns are numpy.memmap arrays, so opening costs no parsing or copying.
+
+        args:
+            path, str, directory of the store
+        raises:
+            FileNotFoundError: if path has no meta.json (not a store, or one whose writer was not closed)
+            ValueError: if the store has another format or version, or a column file has the wrong size
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != STORE_FORMAT or meta.get('version') != STORE_VERSION:
+            raise ValueError(f"{path!r} is not a version {STORE_VERSION} lottery store.")
+        self.path = path
+        self.meta = meta
+        lengths = { #expected number of values of every column
+            'leaf_payoffs': meta['leaves'], 'leaf_probs': meta['leaves'], 'leaf_offsets': meta['lotteries'] + 1,
+            'payoffs': meta['entries'], 'probs': meta['entries'], 'children': meta['entries'],
+            'node_offsets': meta['nodes'] + 1, 'lottery_nodes': meta['lotteries'] + 1,
+        }
+        self.columns = {}
+        for name, dtype in COLUMNS.items():
+            file_name = _column_file(path, name)
+            length = lengths[name]
+            if os.path.getsize(file_name) != length * np.dtype(dtype).itemsize:
+                raise ValueError(f"Column {name!r} of {path!r} does not have {length} values.")
+            self.columns[name] = np.memmap(file_name, dtype=dtype, mode='r', shape=(length,)) if length else np.empty(0, dtype)
+        self._batch = None
+
+    def __len__(self):
+        return self.meta['lotteries']
+
+    def __repr__(self):
+        return f"LotteryStore({self.path!r}, lotteries={len(self)}, leaves={self.meta['leaves']})"
+
+    @property
+    def batch(self):
+        """LotteryBatch of all lotteries, backed by the mapped leaf columns (pages are read when they are used)."""
+        if self._batch is None:
+            c = self.columns
+            self._batch = LotteryBatch(c['leaf_payoffs'], c['leaf_probs'], c['leaf_offsets'])
+        return self._batch
+
+    def iter_batches(self, chunk_size=100_000):
+        """Yields LotteryBatch views of chunk_size lotteries at a time, for the streaming functions."""
+        c = self.columns
+        for start in range(0, len(self), chunk_size):
+            stop = min(start + chunk_size, len(self))
+            offsets = c['leaf_offsets'][start:stop + 1]
+            first, last = int(offsets[0]), int(offsets[-1])
+            yield LotteryBatch(c['leaf_payoffs'][first:last], c['leaf_probs'][first:last], offsets - first)
+
+    def __getitem__(self, j):
+        """Lottery j with its full nesting, as a Lottery (use .to_dicts() for the list-of-dictionaries format)."""
+        if not -len(self) <= j < len(self):
+            raise IndexError(f"lottery {j} out of range for a store of {len(self)}.")
+        j %= len(self)
+        c = self.columns
+        first_node, last_node = int(c['lottery_nodes'][j]), int(c['lottery_nodes'][j + 1])
+        offsets = np.asarray(c['node_offsets'][first_node:last_node + 1])
+        start, stop = int(offsets[0]), int(offsets[-1])
+        return Lottery(c['payoffs'][start:stop], c['probs'][start:stop], c['children'][start:stop], offsets - start)
+
+    def __iter__(self):
+        for j in range(len(self)):
+            yield self[j]
+
+
+def open_lottery_store(path):
+    """Opens a lottery store for reading (see LotteryStore)."""
+    return LotteryStore(path)
+
+
+def write_lottery_store(path, lotteries, chunk_size=100_000, overwrite=False):
+    """Writes lotteries (an iterable of list-of-dictionaries or Lottery, or a LotteryBatch) to a new store and opens it.
+
+        args:
+            path, str, directory of the store
+            lotteries, LotteryBatch or iterable of lotteries, consumed one at a time
+            chunk_size, int, lotteries buffered in memory before they are written out
+            overwrite, bool, replace an existing store at path
+        returns:
+            LotteryStore of the written lotteries
+    """
+    with LotteryStoreWriter(path, chunk_size, overwrite) as writer:
+        if isinstance(lotteries, LotteryBatch):
+            writer.write_batch(lotteries)
+        else:
+            writer.write_many(lotteries)
+    return LotteryStore(path)
@@ -0,0 +1,125 @@
+"""Streaming pipeline: blocks of lotteries in, running statistics out."""
+import math
+from itertools import islice
+
+import numpy as np
+
+from .arrays import LotteryBatch, batch_certainty_equivalents, make_random_lottery_batch
+
+
+# Streaming pipeline: lotteries are made (or read) and scored one fixed-size block at a time, and only running
+# statistics are kept, so memory stays the same no matter how many lotteries go through.
+
+def iter_random_lottery_batches(total, chunk_size=100_000, seed=None, **kwargs):
+    """Yields random lotteries as LotteryBatch blocks of at most chunk_size lotteries.
+
+        Block k is drawn from stream k of seed (see lottery_rng), so a run is reproducible for a
+        given seed and chunk_size.
+
+        args:
+            total, int, number of lotteries over all blocks
+            chunk_size, int, lotteries per block
+            seed, int or None
+            **kwargs, passed to make_random_lottery_batch (max_pay, depth, negative, ...)
+    """
+    for block, start in enumerate(range(0, total, chunk_size)):
+        yield make_random_lottery_batch(number=min(chunk_size, total - start), seed=seed, stream=block, **kwargs)
+
+
+def iter_lottery_chunks(lotteries, chunk_size=100_000):
+    """Packs any iterable of lotteries (for example a generator reading a file) into LotteryBatch blocks."""
+    lotteries = iter(lotteries)
+    while True:
+        chunk = list(islice(lotteries, chunk_size)) #only one block of dictionaries is in memory at a time
+        if not chunk:
+            return
+        yield LotteryBatch.from_lotteries(chunk)
+
+
+def evaluate_batch(batch, u, tol=1e-9):
+    """Scores every lottery of a batch.
+
+        returns:
+            dict with 1-D ndarrays 'ev', 'eu', 'ce' and 'rp' (one value per lottery)
+    """
+    if not isinstance(batch, LotteryBatch):
+        batch = LotteryBatch.from_lotteries(batch)
+    evs = batch.expected_values()
+    eus = batch.expected_utilities(u)
+    ces = batch_certainty_equivalents(batch, u, tol, eus=eus) #reuses the expected utilities
+    rps = evs - ces
+    rps[np.abs(rps) < tol] = 0.0
+    return {'ev': evs, 'eu': eus, 'ce': ces, 'rp': rps}
+
+
+class RunningStats:
+    """Count, mean, standard deviation, min and max of a stream of numbers, updated one array at a time.
+
+        Uses the pairwise update of Chan et al., so blocks (or whole RunningStats from other workers)
+        can be merged in any order without keeping the numbers.
+    """
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 #sum of squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return self
+        block = RunningStats()
+        block.count = values.size
+        block.mean = float(values.mean())
+        block.m2 = float(((values - block.mean) ** 2).sum())
+        block.min = float(values.min())
+        block.max = float(values.max())
+        return self.merge(block)
+
+    def merge(self, other):
+        """Adds the numbers summarized by another RunningStats to this one."""
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def summary(self):
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        return {'count': self.count, 'mean': self.mean, 'std': std, 'min': self.min, 'max': self.max}
+
+
+def stream_lottery_statistics(batches, u, sink=None, tol=1e-9):
+    """Scores a stream of lottery blocks and returns summary statistics of ev, eu, ce and rp.
+
+        Each block is scored with evaluate_batch, folded into running statistics and then dropped,
+        so peak memory is one block no matter how long the stream is.
+
+        args:
+            batches, iterable of LotteryBatch (iter_random_lottery_batches, iter_lottery_chunks, ...)
+            u, utility function over payoffs
+            sink, optional function sink(block_number, results) called with every block's
+                  evaluate_batch results, for example to write them to a file
+        returns:
+            dict {'ev': {...}, 'eu': {...}, 'ce': {...}, 'rp': {...}} of RunningStats summaries
+
+        Test case:
+            stream_lottery_statistics(iter_random_lottery_batches(1_000_000, chunk_size=50_000, seed=1), invertible_utility(cara_vec, a=0.05))['ev']['count']
+            should return 1000000
+    """
+    stats = {name: RunningStats() for name in ('ev', 'eu', 'ce', 'rp')}
+    for block, batch in enumerate(batches):
+        results = evaluate_batch(batch, u, tol)
+        for name, values in results.items():
+            stats[name].update(values)
+        if sink is not None:
+            sink(block, results)
+    return {name: running.summary() for name, running in stats.items()}
@@ -0,0 +1,168 @@
+"""Tabulated utilities: a slow utility sampled once on a payoff grid, then served by interpolation.
+
+    Elicited U_hat functions and user-written utilities may cost a Python call (or much more) per payoff.
+    TabulatedUtility evaluates one once on a grid over the payoff range of the lotteries to be scored and
+    answers u(m), u.inverse and u.derivative by linear interpolation in that table, one numpy.interp for a
+    whole array, so batch functions like batch_certainty_equivalents never call the original again.
+
+        U_tab = tabulate_utility(U_hat, lotteries, tol=1e-10)
+        batch_certainty_equivalents(lotteries, U_tab)
+
+    The grid starts evenly spaced, plus the breakpoints of a PiecewiseUtility (such as an elicited U_hat),
+    which make its table exact. It is refined where the interpolation is poor: the original is evaluated at
+    the midpoint and the two quarter points of every segment, and a segment is split until 4/3 of its largest
+    error at those three points is at most tol. Where u is convex or concave between two grid points the
+    interpolation error in between is concave or convex too, and so at most 4/3 of its largest value at the
+    three points: error_bound then bounds |U_tab(m) - u(m)| on the whole range, as it does for the utility
+    families. A segment holding an inflection point or a kink of u has no such guarantee; there error_bound is
+    an estimate from the samples. Payoffs outside the range go to the original utility.
+"""
+import numpy as np
+
+from .arrays import LotteryBatch, _utility_of_array
+from .elicitation import PiecewiseUtility
+from .lotteries import _payoff_range
+
+
+class TabulatedUtility(PiecewiseUtility):
+    """Linear interpolation of u on an adaptive grid over [low, high], the original u outside it.
+
+        args:
+            u, utility function or utility object, increasing on [low, high]
+            low, high, floats, payoff range of the table
+            points, int number of evenly spaced starting points, or a sequence of payoffs to start from
+            tol, float, largest interpolation error allowed (default: 1e-6 times the utility range u(high) - u(low))
+            max_points, int, the refinement stops here even if tol is not reached (error_bound tells)
+        attributes:
+            original, the tabulated utility
+            error_bound, float, 4/3 * largest sampled error of the final segments (0.0 for a one-point table), a
+                         bound where u is convex or concave between grid points, an estimate elsewhere
+
+        Test case:
+            U_tab = TabulatedUtility(cara, 0.0, 100.0, tol=1e-9)
+            abs(U_tab(37.5) - cara(37.5)) <= U_tab.error_bound <= 1e-9 should return True
+    """
+    __slots__ = ('original', 'low', 'high', 'error_bound')
+
+    def __init__(self, u, low, high, points=65, tol=None, max_points=1_000_000):
+        low, high = float(low), float(high)
+        if not low <= high:
+            raise ValueError(f"TabulatedUtility needs low <= high, got {low} and {high}.")
+        if np.ndim(points) == 0:
+            xs = np.linspace(low, high, max(int(points), 2)) if high > low else np.array([low])
+        else:
+            xs = np.unique(np.clip(np.asarray(points, dtype=float), low, high))
+            xs = np.unique(np.concatenate((xs, [low, high])))
+        if isinstance(u, PiecewiseUtility): #linear between its breakpoints, so with them in the grid the table is exact
+            xs = np.union1d(xs, u.payoffs[(u.payoffs > low) & (u.payoffs < high)])
+        us = _utility_of_array(u, xs)
+        if tol is None:
+            tol = 1e-6 * max(abs(us[-1] - us[0]), np.finfo(float).tiny)
+
+        #per segment: its midpoint, u there and its error bound (nan until the segment has been checked)
+        mids = 0.5 * (xs[:-1] + xs[1:])
+        u_mids = _utility_of_array(u, mids)
+        errors = np.full(mids.size, np.nan)
+        while True:
+            todo = np.flatnonzero(np.isnan(errors))
+            if todo.size == 0:
+                break
+            left, right, mid = xs[todo], xs[todo + 1], mids[todo]
+            u_left, u_right = us[todo], us[todo + 1]
+            quarters = np.concatenate((0.5 * (left + mid), 0.5 * (mid + right)))
+            u_quarters = _utility_of_array(u, quarters)
+            u_q1, u_q3 = u_quarters[:todo.size], u_quarters[todo.size:]
+            errors[todo] = 4.0 / 3.0 * np.maximum.reduce([ #largest error at the quarter points and the midpoint
+                np.abs(u_q1 - (0.75 * u_left + 0.25 * u_right)),
+                np.abs(u_mids[todo] - 0.5 * (u_left + u_right)),
+                np.abs(u_q3 - (0.25 * u_left + 0.75 * u_right))])
+            split = (errors[todo] > tol) & (left < quarters[:todo.size]) & (quarters[todo.size:] < right) #segments of adjacent floats stay
+            if not split.any() or xs.size + np.count_nonzero(split) > max_points:
+                break
+            where = todo[split]
+            #the midpoint of a split segment becomes a grid point and its quarter points the midpoints of the two halves
+            xs = np.insert(xs, where + 1, mids[where])
+            us = np.insert(us, where + 1, u_mids[where])
+            mids[where], u_mids[where] = quarters[:todo.size][split], u_q1[split]
+            mids = np.insert(mids, where + 1, quarters[todo.size:][split])
+            u_mids = np.insert(u_mids, where + 1, u_q3[split])
+            errors[where] = np.nan
+            errors = np.insert(errors, where + 1, np.nan)
+        bound = float(np.max(errors)) if errors.size else 0.0
+        super().__init__(list(zip(xs.tolist(), us.tolist())))
+        self.original = u
+        self.low, self.high = low, high
+        self.error_bound = bound
+
+    def _inside(self, payoff):
+        return (payoff >= self.low) & (payoff <= self.high)
+
+    def __call__(self, payoff):
+        if np.ndim(payoff) > 0:
+            payoff = np.asarray(payoff, dtype=float)
+            utils = np.interp(payoff, self.payoffs, self.utilities)
+            outside = ~self._inside(payoff)
+            if outside.any():
+                utils[outside] = _utility_of_array(self.original, payoff[outside])
+            return utils
+        if self.low <= payoff <= self.high:
+            return super().__call__(payoff)
+        return float(self.original(payoff))
+
+    def inverse(self, util):
+        """Payoff with U_tab(payoff) == util; utilities outside the table go to the original's inverse (nan without one)."""
+        us = self._inverse_us
+        original = getattr(self.original, 'inverse', None)
+        if np.ndim(util) > 0:
+            util = np.asarray(util, dtype=float)
+            payoffs = np.interp(util, us, self._inverse_xs)
+            outside = (util < us[0]) | (util > us[-1])
+            if outside.any():
+                payoffs[outside] = np.asarray(original(util[outside]), dtype=float) if original is not None else np.nan
+            return payoffs
+        if us[0] <= util <= us[-1]:
+            return super().inverse(util)
+        return float(original(util)) if original is not None else float('nan')
+
+    def derivative(self, payoff):
+        """Slope of the table's segment inside the range, the original's derivative outside it (0 without one)."""
+        original = getattr(self.original, 'derivative', None)
+        if np.ndim(payoff) > 0:
+            payoff = np.asarray(payoff, dtype=float)
+            slopes = super().derivative(payoff)
+            outside = ~self._inside(payoff)
+            if outside.any() and original is not None:
+                slopes[outside] = np.asarray(original(payoff[outside]), dtype=float)
+            return slopes
+        if self.low <= payoff < self.high or original is None:
+            return super().derivative(payoff)
+        return float(original(payoff))
+
+    def __repr__(self):
+        return f"TabulatedUtility(points={len(self._xs)}, range=({self.low}, {self.high}), error_bound={self.error_bound:.3g})"
+
+
+def tabulate_utility(u, lotteries, points=65, tol=None, max_points=1_000_000):
+    """Tabulates u over the payoff range of a collection of lotteries.
+
+        args:
+            u, utility function or utility object, increasing over the payoffs
+            lotteries, LotteryBatch or iterable of lotteries (list of dictionaries or Lottery); the range is the
+                       lowest and highest payoff of their reductions
+            points, tol, max_points, as in TabulatedUtility
+        returns:
+            TabulatedUtility over [lowest payoff, highest payoff]
+        raises:
+            ValueError: if there are no payoffs
+    """
+    if isinstance(lotteries, LotteryBatch):
+        if lotteries.payoffs.size == 0:
+            raise ValueError("The lotteries have no outcomes.")
+        low, high = float(lotteries.payoffs.min()), float(lotteries.payoffs.max())
+    else:
+        ranges = [_payoff_range(lottery) for lottery in lotteries] #cached reductions, the same ones certainty_equivalent uses
+        if not ranges:
+            raise ValueError("The lotteries have no outcomes.")
+        low, high = min(r[0] for r in ranges), max(r[1] for r in ranges)
+    return TabulatedUtility(u, low, high, points, tol, max_points)
+
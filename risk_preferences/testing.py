@@ -0,0 +1,22 @@
+"""Seeded random lotteries shared by the test suite and the benchmarks (plain Python, no NumPy)."""
+
+
+def nested_lottery(rng, outcomes, depth, max_pay=100.0):
+    """Random lottery with outcomes entries per node, one of which is a sub-lottery, depth levels down.
+
+        args:
+            rng, random.Random (the draws only depend on its state, so a seeded rng gives the same lottery)
+            outcomes, int, entries per (sub-)lottery
+            depth, int, levels of sub-lotteries below the top one (built without recursion, any depth works)
+            max_pay, float, payoffs are uniform on [1, max_pay], so every utility family is defined for them
+        returns:
+            lottery, list of dictionaries
+    """
+    levels = []
+    for _ in range(depth + 1): #the payoffs of every level, top first
+        weights = [rng.random() for _ in range(outcomes)]
+        total = sum(weights)
+        levels.append([{'out': rng.uniform(1.0, max_pay), 'prob': w / total} for w in weights])
+    for level in range(depth - 1, -1, -1): #then which entry holds the sub-lottery, deepest level first
+        levels[level][rng.randrange(outcomes)]['out'] = levels[level + 1]
+    return levels[0]
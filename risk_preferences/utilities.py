@@ -0,0 +1,254 @@
+"""Utility functions of money: linear, CARA, CRRA and quadratic, with their inverses and derivatives.
+
+    Everything here is plain Python (math only). The array versions and the utility objects are in families.py.
+"""
+import math
+from functools import lru_cache
+
+
+# Step 1: Code Utility Funtions
+def linear_utility(m, a=5, b=.75):
+    """linear utility of money
+    
+        args: m, float, amount of money.
+              a, float, intercept.
+              b, float, slope.
+              
+        returns: util, float, utility of money m.    
+    """
+    util = a + b*m
+    return util
+
+# Additional utility functions
+
+# 1. CARA (Constant Absolute Risk Aversion)
+# 2. CRRA (Constant Relative Risk Aversion)
+# 3. Quadratic utility
+
+
+def cara(m, a=0.5):
+    """Exponential Utility Constant Absolute Risk Aversion (CARA): u(m) = 1 - exp(-a*m)
+
+        args:
+            m(float): amount of money (payoff)
+            a(float): >0, absolute risk aversion parameter (larger a, more risk averse)
+        
+        returns:
+            util: float, utility of money m
+
+        raises:
+            ValueError: if a <= 0
+
+        Test case: 
+            cara(10, a=0.5) should return approximately 0.9932620530009145
+            cara(5, a=1.0) should return approximately 0.9932620530009145
+    """
+    if a <=0:
+        raise ValueError("Parameter 'a' must be > 0.")
+    util = 1 - math.exp(-a * m)
+    return util #this is the CARA utility returning the utility of money
+
+
+def crra(m, gamma=2.0):
+    """Power Utility Constant Relative Risk Aversion (CRRA). 
+
+        u(m) = (m^(1-gamma)-1) / (1 - gamma)        if gamma != 1
+            = ln(m)                                if gamma ==1  
+        args:
+            m (float): > 0, money/wealth
+            gamma (float): > 0, coefficient of relative risk aversion (larger gamma, more risk averse)
+
+        returns: 
+            util (float): utility of money m
+        
+        raises:
+            ValueError: if m <= 0 or gamma <= 0
+
+        Test cases:
+            crra(10, gamma=2) should return approximately  -0.9
+            crra(10, gamma=1) should return approximately 2.302585092
+    """
+    if m <= 0:
+        raise ValueError("Parameter 'm' must be > 0 for CRRA utility.")
+    if gamma <= 0:
+        raise ValueError("Parameter 'gamma must be > 0.")
+    if gamma == 1:
+        return math.log(m)
+    util = (m**(1 - gamma) - 1) / (1 - gamma)
+    return util  #returns the normal CRRA utility when gamma not equal to 1
+
+
+
+def quadratic(m, a=1.0, b=0.1):
+    """Quadratic utility: u(m) = a*m - 0.5*b*m^2
+    
+    args:
+        m (float): money/payoff
+        a (float): slope at zero wealth
+        b (float): > 0, curvature parameter (keeps the function concave)
+        
+    returns:
+        util (float): utility of money m
+
+    raises:
+        ValueError: if b <= 0 (would break concavity)
+        ValueError: if a - b*m <= 0 (would make marginal utility non-positive)
+
+    Test cases:
+        quadratic(5, a=1.0, b=0.1) should return 3.75
+        quadratic(15, a=2.0, b=0.2) should return 7.0
+    """
+
+    if b <= 0:
+        raise ValueError("Parameter 'b' must be > 0 to keep utility concave.")
+    if a - b*m <= 0:
+        raise ValueError("Inputs result in non-positive marginal utility (a - b*m <= 0). Choose smaller m or larger a, or smaller b.")
+    util = a*m - 0.5*b*(m**2)
+    return util
+
+# Inverses and derivatives of the utility functions
+# u^-1 lets certainty_equivalent solve u(ce) = eu in closed form instead of searching for ce,
+# and u'(m) lets the search use Newton steps when there is no closed form.
+
+def linear_utility_inverse(util, a=5, b=.75):
+    """Payoff m with linear_utility(m, a, b) == util: m = (util - a) / b"""
+    return (util - a) / b
+
+def linear_utility_derivative(m, a=5, b=.75):
+    """Marginal utility of linear_utility: u'(m) = b"""
+    return b
+
+
+def cara_inverse(util, a=0.5):
+    """Payoff m with cara(m, a) == util: m = -ln(1 - util) / a
+
+        raises:
+            ValueError: if util >= 1 (CARA utility never reaches 1)
+    """
+    return -math.log1p(-util) / a
+
+def cara_derivative(m, a=0.5):
+    """Marginal utility of cara: u'(m) = a*exp(-a*m)"""
+    return a * math.exp(-a * m)
+
+
+def crra_inverse(util, gamma=2.0):
+    """Payoff m with crra(m, gamma) == util.
+
+        m = (1 + (1-gamma)*util)^(1/(1-gamma))      if gamma != 1
+          = exp(util)                               if gamma == 1
+    """
+    if gamma == 1:
+        return math.exp(util)
+    return (1 + (1 - gamma) * util) ** (1 / (1 - gamma))
+
+def crra_derivative(m, gamma=2.0):
+    """Marginal utility of crra: u'(m) = m^(-gamma)"""
+    return m ** (-gamma)
+
+
+def quadratic_inverse(util, a=1.0, b=0.1):
+    """Payoff m with quadratic(m, a, b) == util, on the increasing part m < a/b.
+
+        m = (a - sqrt(a^2 - 2*b*util)) / b
+
+        raises:
+            ValueError: if util is above the peak utility a^2 / (2b)
+    """
+    return (a - math.sqrt(a*a - 2*b*util)) / b
+
+def quadratic_derivative(m, a=1.0, b=0.1):
+    """Marginal utility of quadratic: u'(m) = a - b*m"""
+    return a - b*m
+
+
+_UTILITY_INVERSES = { #utility function -> (inverse, derivative), used by invertible_utility
+    linear_utility: (linear_utility_inverse, linear_utility_derivative),
+    cara: (cara_inverse, cara_derivative),
+    crra: (crra_inverse, crra_derivative),
+    quadratic: (quadratic_inverse, quadratic_derivative),
+} #families.py adds the _vec functions when it is imported
+_SCALAR_UTILITIES = frozenset(_UTILITY_INVERSES) #the plain float functions above, which the scalar lottery functions call directly
+
+
+def invertible_utility(func, inverse=None, derivative=None, **params):
+    """Fixes the parameters of a utility function and attaches its inverse and derivative.
+
+        certainty_equivalent (and risk_premium) look for u.inverse and u.derivative:
+            u.inverse(util) returns the payoff with utility util, so ce = u.inverse(eu) directly
+            u.derivative(m) returns u'(m), used for Newton steps when there is no inverse
+        Any callable with these attributes works; this function builds one for the utility
+        functions above (or for any func if inverse/derivative are passed in).
+
+        args:
+            func, utility function func(m, **params)
+            inverse, optional function inverse(util, **params), looked up for the built-in utilities
+            derivative, optional function derivative(m, **params), looked up for the built-in utilities
+            **params, parameter values, e.g. a=0.5 or gamma=2.0
+        returns:
+            u, function of m with attributes u.inverse and u.derivative (None if unknown)
+
+        Test case:
+            u = invertible_utility(cara, a=0.5); u.inverse(u(10)) should return approximately 10.0
+    """
+    known_inverse, known_derivative = _UTILITY_INVERSES.get(func, (None, None))
+    inverse = inverse if inverse is not None else known_inverse
+    derivative = derivative if derivative is not None else known_derivative
+
+    def u(m):
+        return func(m, **params)
+    u.inverse = (lambda util: inverse(util, **params)) if inverse is not None else None
+    u.derivative = (lambda m: derivative(m, **params)) if derivative is not None else None
+    u.__name__ = getattr(func, '__name__', 'utility')
+    return u
+
+
+_UTILITY_FAMILIES = { #plain utility function -> name of the UtilityFamily with the same formula (families.py), used by as_utility
+    linear_utility: 'LinearUtility',
+    cara: 'CARAUtility',
+    crra: 'CRRAUtility',
+    quadratic: 'QuadraticUtility',
+} #families.py adds the _vec functions when it is imported
+
+
+def as_utility(u, **params):
+    """Adapter from the old calling style to utility objects.
+
+        A UtilityFamily is returned as it is (with params replaced if any are given), one of the utility
+        functions above becomes its UtilityFamily, and any other callable is returned unchanged (or wrapped
+        by invertible_utility if params are given), so every function taking u accepts all of them.
+        Without NumPy the utility functions above are wrapped by invertible_utility instead.
+        The utility object of a function and float params is built once and shared (utility objects never change).
+
+        raises:
+            ValueError: for a utility object with array parameters (a grid of utilities, not one)
+
+        Test case:
+            as_utility(cara, a=0.5)(10) should return approximately 0.9932620530009145
+    """
+    if hasattr(u, 'with_params'): #already a utility object
+        u = u.with_params(**params) if params else u
+    elif u in _UTILITY_FAMILIES:
+        try:
+            return _family_object(u, tuple(sorted(params.items())))
+        except TypeError: #array parameters are not hashable, build the object for this call only
+            u = _build_family_object(u, params)
+    else:
+        return invertible_utility(u, **params) if params else u
+    check = getattr(u, '_require_scalar_params', None)
+    if check is not None: #the functions taking u score lotteries with one utility, not a grid of them
+        check()
+    return u
+
+
+@lru_cache(maxsize=256)
+def _family_object(u, key):
+    return _build_family_object(u, dict(key))
+
+
+def _build_family_object(u, params):
+    try:
+        from . import families #imports NumPy, so only the first time a utility object is needed
+    except ImportError:
+        return invertible_utility(u, **params)
+    return getattr(families, _UTILITY_FAMILIES[u])(**params)
@@ -0,0 +1,23 @@
+"""Shared fixtures: seeded random compound lotteries."""
+import random
+
+import pytest
+
+from risk_preferences.testing import nested_lottery as _nested_lottery #the same lotteries the benchmarks use
+
+
+@pytest.fixture
+def rng():
+    return random.Random(20240601)
+
+
+@pytest.fixture
+def nested_lottery(rng):
+    """nested_lottery(outcomes, depth, max_pay=100.0) -> random list-of-dictionaries lottery from the seeded rng."""
+    return lambda outcomes, depth, max_pay=100.0: _nested_lottery(rng, outcomes, depth, max_pay)
+
+
+@pytest.fixture
+def lotteries(nested_lottery):
+    """A mixed menu: simple and compound lotteries of different sizes."""
+    return [nested_lottery(outcomes, depth) for outcomes in (2, 5, 10) for depth in (0, 1, 3)]
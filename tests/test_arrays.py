@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+import pytest
+
+import risk_preferences as rp
+from risk_preferences import (CARAUtility, CRRAUtility, Lottery, LotteryBatch, batch_certainty_equivalents,
+                              batch_expected_utilities, batch_expected_values, batch_risk_premiums, cara, crra, crra_vec)
+from risk_preferences.arrays import _lockstep_root
+
+UTILITIES = [cara, crra, CARAUtility(a=0.05), CRRAUtility(gamma=2.0), lambda m: math.sqrt(m)]
+
+
+@pytest.fixture
+def small_lotteries(nested_lottery):
+    """Payoffs up to 10: cara (a = 0.5) of larger payoffs is 1 up to rounding and its ce is ill-conditioned."""
+    return [nested_lottery(outcomes, depth, max_pay=10.0) for outcomes in (2, 5, 10) for depth in (0, 1, 3)]
+
+
+def test_lottery_round_trip(lotteries):
+    for lottery in lotteries:
+        assert Lottery.from_dicts(lottery).to_dicts() == lottery
+
+
+@pytest.mark.parametrize('u', UTILITIES)
+def test_batch_matches_scalar(small_lotteries, u):
+    lotteries = small_lotteries
+    batch = LotteryBatch.from_lotteries(lotteries)
+    np.testing.assert_allclose(batch_expected_values(batch), [rp.expected_value(lot) for lot in lotteries], rtol=1e-12)
+    np.testing.assert_allclose(batch_expected_utilities(batch, u), [rp.expected_utility(lot, u) for lot in lotteries], rtol=1e-12)
+    np.testing.assert_allclose(batch_certainty_equivalents(batch, u), [rp.certainty_equivalent(lot, u) for lot in lotteries],
+                               rtol=1e-8)
+    np.testing.assert_allclose(batch_risk_premiums(batch, u), [rp.risk_premium(lot, u) for lot in lotteries], atol=1e-7)
+
+
+def test_batch_accepts_lottery_objects(lotteries):
+    from_dicts = LotteryBatch.from_lotteries(lotteries)
+    from_arrays = LotteryBatch.from_lotteries([Lottery.from_dicts(lot) for lot in lotteries])
+    np.testing.assert_allclose(from_arrays.expected_values(), from_dicts.expected_values(), rtol=1e-12)
+
+
+def test_getitem(lotteries):
+    batch = LotteryBatch.from_lotteries(lotteries)
+    for j in (0, 3, -1, -len(batch)):
+        assert math.isclose(batch[j].expected_value(), rp.expected_value(lotteries[j]), rel_tol=1e-12)
+    for j in (len(batch), -len(batch) - 1):
+        with pytest.raises(IndexError):
+            batch[j]
+
+
+def test_slices_are_sub_batches(lotteries):
+    batch = LotteryBatch.from_lotteries(lotteries)
+    for j in (slice(None), slice(2, 5), slice(None, None, -1), slice(1, None, 3), slice(-3, None), slice(4, 2), slice(50, 60)):
+        sub = batch[j]
+        assert isinstance(sub, LotteryBatch) and len(sub) == len(lotteries[j])
+        np.testing.assert_allclose(sub.expected_values(), [rp.expected_value(lot) for lot in lotteries[j]], rtol=1e-12)
+        for k in range(len(sub)):
+            np.testing.assert_array_equal(sub[k].payoffs, batch[range(len(batch))[j][k]].payoffs)
+
+
+class _SearchedCRRA:
+    """crra_vec with gamma = 3 whose inverse only works for utilities below cutoff, so some lanes are searched."""
+
+    def __init__(self, cutoff, derivative=True):
+        self.cutoff = cutoff
+        if derivative:
+            self.derivative = lambda m: np.asarray(m, dtype=float) ** -3.0
+
+    def __call__(self, m):
+        return crra_vec(m, gamma=3.0)
+
+    def inverse(self, util):
+        util = np.asarray(util, dtype=float)
+        return np.where(util < self.cutoff, (1 - 2 * util) ** -0.5, np.nan)
+
+
+@pytest.mark.parametrize('cutoff', [-np.inf, 0.45, np.inf])
+@pytest.mark.parametrize('derivative', [True, False])
+def test_lockstep_lanes_match_scalar(nested_lottery, rng, cutoff, derivative):
+    lotteries = [nested_lottery(rng.choice((2, 5, 10)), rng.randrange(4), max_pay=rng.choice((1.5, 10.0, 1000.0)))
+                 for _ in range(40)] #brackets from narrow to wide, so the lanes converge after different iterations
+    lotteries[3] = [{'out': 4.0, 'prob': 1.0}] #one-outcome lanes
+    lotteries[17] = [{'out': [{'out': 6.0, 'prob': 1.0}], 'prob': 0.5}, {'out': 6.0, 'prob': 0.5}]
+    u = _SearchedCRRA(cutoff, derivative)
+    scalar = _SearchedCRRA(np.inf) #closed form for every lottery
+    with rp.instrumented() as stats:
+        ces = batch_certainty_equivalents(lotteries, u, tol=1e-12)
+    np.testing.assert_allclose(ces, [rp.certainty_equivalent(lot, scalar) for lot in lotteries], rtol=1e-9)
+    assert ces[3] == 4.0 and ces[17] == 6.0
+    assert ('batch.lockstep.iterations' in stats.counters) == (cutoff < np.inf)
+
+
+def test_lockstep_root_finishes_every_lane(rng):
+    low = np.array([rng.uniform(1.0, 5.0) for _ in range(30)])
+    high = low + np.logspace(-11, 3, low.size) #the first lanes are done at once, the last need many steps
+    roots = low + np.array([rng.random() for _ in range(low.size)]) * (high - low)
+    targets = crra_vec(roots, gamma=3.0)
+    for derivative in (None, lambda m: m ** -3.0):
+        x = _lockstep_root(lambda m: crra_vec(m, gamma=3.0), derivative, targets, low, high, tol=1e-13)
+        np.testing.assert_allclose(x, roots, rtol=1e-10)
+        assert np.all((low <= x) & (x <= high))
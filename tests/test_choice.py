@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from risk_preferences import CARAUtility, CRRAUtility, cara_vec, crra_vec
+from risk_preferences.choice import (build_holt_laury, holt_laury_choice_matrix, holt_laury_choices, holt_laury_intervals,
+                                     holt_laury_switch_points, holt_laury_thresholds)
+
+FAMILIES = [(crra_vec, 'gamma', lambda r: CRRAUtility(gamma=r), 3.0), #grid top for cara: much larger a makes u = 1 up to rounding
+            (cara_vec, 'a', lambda r: CARAUtility(a=r), 1.0)]
+MENUS = [build_holt_laury(), build_holt_laury(steps=25), build_holt_laury(high_A=5.0, low_A=4.5, high_B=9.0, low_B=2.0, steps=12)]
+
+
+def _brute_force_choices(pairs, utility, values):
+    """Choices row by row with the scalar engine, one subject at a time."""
+    return np.array([holt_laury_choices(pairs, utility(r)) for r in values])
+
+
+def _grid(top, thresholds, rng):
+    """Random parameter values, away from the thresholds where the choice is a rounding tie."""
+    values = np.array([rng.uniform(1e-3, top) for _ in range(200)])
+    finite = thresholds[np.isfinite(thresholds)]
+    if finite.size:
+        values = values[np.min(np.abs(values[:, None] - finite[None, :]), axis=1) > 1e-7]
+    return values
+
+
+@pytest.mark.parametrize('kernel, name, utility, top', FAMILIES)
+@pytest.mark.parametrize('pairs', MENUS)
+def test_thresholds_match_brute_force(kernel, name, utility, top, pairs, rng):
+    thresholds = holt_laury_thresholds(pairs, kernel, name)
+    values = _grid(top, thresholds, rng)
+    choices = _brute_force_choices(pairs, utility, values)
+    np.testing.assert_array_equal(holt_laury_choice_matrix(pairs, kernel, name, values), choices)
+    np.testing.assert_array_equal(choices, (values[:, None] < thresholds[None, :]).astype(int)) #safe exactly when r >= threshold
+    for row, threshold in enumerate(thresholds): #the scalar engine flips at the threshold, within the bisection tolerance
+        if np.isfinite(threshold):
+            assert holt_laury_choices([pairs[row]], utility(threshold + 1e-8)) == [0]
+            assert holt_laury_choices([pairs[row]], utility(threshold - 1e-8)) == [1]
+
+
+@pytest.mark.parametrize('kernel, name, utility, top', FAMILIES)
+def test_intervals_match_brute_force(kernel, name, utility, top, rng):
+    pairs = build_holt_laury()
+    thresholds = holt_laury_thresholds(pairs, kernel, name)
+    values = _grid(top, thresholds, rng)
+    rows = len(pairs)
+    choices = np.vstack([_brute_force_choices(pairs, utility, values),
+                         np.zeros(rows, dtype=int), #never switches
+                         np.ones(rows, dtype=int), #switches at the first row
+                         [rng.randrange(2) for _ in range(rows)], [1, 0] * (rows // 2)]) #likely / surely inconsistent
+    lower, upper, switch, consistent = holt_laury_intervals(choices, thresholds)
+    for j, subject in enumerate(choices):
+        first_risky = next((row for row in range(rows) if subject[row] == 1), rows) #scan for the switching row
+        assert switch[j] == first_risky
+        assert consistent[j] == all(subject[row] == (row >= first_risky) for row in range(rows))
+        if consistent[j]:
+            assert lower[j] == max([-np.inf] + list(thresholds[:first_risky]))
+            assert upper[j] == min([np.inf] + list(thresholds[first_risky:]))
+        else:
+            assert np.isnan(lower[j]) and np.isnan(upper[j])
+    assert np.all((lower[:values.size] <= values) & (values < upper[:values.size])) #every subject's own parameter is inside
+    assert (switch[values.size], upper[values.size]) == (rows, np.inf)
+    assert (switch[values.size + 1], lower[values.size + 1]) == (0, -np.inf)
+    assert not consistent[-1]
+
+
+def test_rows_decided_everywhere_in_bounds():
+    pairs = build_holt_laury()
+    thresholds = holt_laury_thresholds(pairs, crra_vec, 'gamma')
+    assert np.all(thresholds[:4] == -np.inf) #safe even for the least risk averse value in bounds
+    assert thresholds[-1] == np.inf #10 for sure beats 6 for sure at any gamma
+    assert np.all(np.diff(thresholds[np.isfinite(thresholds)]) > 0)
+    switch, consistent = holt_laury_switch_points(holt_laury_choice_matrix(pairs, crra_vec, 'gamma', [1e-6, 20.0]))
+    np.testing.assert_array_equal(switch, [4, 9])
+    assert consistent.all()
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import risk_preferences as rp
+from risk_preferences import CARAUtility, CRRAUtility, DominanceIndex, LinearUtility, cara, crra_vec, lottery_choice
+
+
+def _brute_force_frontier(lotteries, second, tol=1e-7):
+    """Pairwise dominance on the CDFs (or integrated CDFs) of the reduced lotteries at every payoff of the menu."""
+    reduced = [rp.reduce_lottery(lottery) for lottery in lotteries]
+    grid = np.unique([outcome['out'] for lottery in reduced for outcome in lottery])
+    curves = []
+    for lottery in reduced:
+        payoffs = np.array([outcome['out'] for outcome in lottery])
+        probs = np.array([outcome['prob'] for outcome in lottery])
+        cdf = np.array([probs[payoffs <= x].sum() for x in grid])
+        curves.append(np.concatenate(([0.0], np.cumsum(cdf[:-1] * np.diff(grid)))) if second else cdf)
+    dominated = [any(a != b and np.all(curves[a] <= curves[b] + tol) and (np.any(curves[a] < curves[b] - tol) or a < b)
+                     for a in range(len(lotteries))) for b in range(len(lotteries))]
+    return np.flatnonzero(~np.array(dominated))
+
+
+def _random_menu(rng, size):
+    menu = []
+    for _ in range(size):
+        k = int(rng.integers(1, 4))
+        payoffs, probs = rng.integers(1, 8, k).astype(float), rng.dirichlet(np.ones(k))
+        menu.append([{'out': float(x), 'prob': float(p)} for x, p in zip(payoffs, probs)])
+    return menu + [menu[0], [{'out': [dict(outcome) for outcome in menu[1]], 'prob': 1.0}]] #equal distributions
+
+
+def test_docstring_example():
+    index = DominanceIndex([[{'out': 1, 'prob': 1.0}], [{'out': 2, 'prob': 1.0}], [{'out': 0, 'prob': 0.5}, {'out': 4, 'prob': 0.5}]])
+    np.testing.assert_array_equal(index.frontier(), [1, 2])
+    np.testing.assert_array_equal(index.frontier('second'), [1])
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_frontier_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    menu = _random_menu(rng, int(rng.integers(5, 40)))
+    index = DominanceIndex(menu)
+    np.testing.assert_array_equal(index.frontier(), _brute_force_frontier(menu, second=False))
+    np.testing.assert_array_equal(index.frontier('second'), _brute_force_frontier(menu, second=True))
+    for u in (CRRAUtility(gamma=0.5), CARAUtility(a=1.0), cara, LinearUtility()):
+        for order in ('first', 'second'):
+            choice, eu = index.choose(u, order)
+            best, best_eu = lottery_choice(menu, u)
+            assert abs(eu - best_eu) < 1e-9
+            assert choice == best or abs(rp.expected_utility(menu[choice], u) - best_eu) < 1e-9 #a tie up to rounding
+    gammas = np.linspace(0.1, 3.0, 7)
+    for choice, gamma in zip(index.choice_matrix(crra_vec, 'gamma', gammas), gammas):
+        u = CRRAUtility(gamma=gamma)
+        assert abs(rp.expected_utility(menu[choice], u) - lottery_choice(menu, u)[1]) < 1e-9
+
+
+def test_bad_order():
+    with pytest.raises(ValueError):
+        DominanceIndex([[{'out': 1, 'prob': 1.0}]]).frontier('third')
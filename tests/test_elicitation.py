@@ -0,0 +1,90 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from risk_preferences.elicitation import (SegmentScheduler, fifty_fifty_ce, simulate_elicitation_batch, stepwise_elicitation,
+                                          utility_gap_priority, width_curvature_priority, width_priority)
+
+
+def _sorted_list_elicitation(min_pay, max_pay, num_questions, get_ce):
+    """stepwise_elicitation as it was before the scheduler: re-sort the segment list, pop the widest."""
+    points = [(min_pay, 0.0), (max_pay, 100.0)]
+    segments = [(min_pay, max_pay)]
+    def utility_at_exact(payoff_value):
+        return next(u for payoff, u in points if payoff == payoff_value)
+    for _ in range(num_questions):
+        segments.sort(key=lambda seg: seg[1] - seg[0], reverse=True)
+        left_payoff, right_payoff = segments.pop(0)
+        ce_payoff = float(get_ce(left_payoff, right_payoff))
+        ce_utility = 0.5 * utility_at_exact(left_payoff) + 0.5 * utility_at_exact(right_payoff)
+        points.append((ce_payoff, ce_utility))
+        points.sort(key=lambda p: p[0])
+        if ce_payoff - left_payoff > 1e-9:
+            segments.append((left_payoff, ce_payoff))
+        if right_payoff - ce_payoff > 1e-9:
+            segments.append((ce_payoff, right_payoff))
+    return points
+
+
+def _answerers(seed):
+    """Seeded subjects: exact ces of random CARA / CRRA utilities, midpoints (ties everywhere) and random
+    answers rounded to whole numbers (ties, repeated payoffs and answers at the segment ends)."""
+    rng = random.Random(seed)
+    for _ in range(5):
+        a, gamma = rng.uniform(0.001, 0.2), rng.uniform(0.1, 3.0)
+        yield lambda lo, hi, a=a: float(fifty_fifty_ce('cara', lo, hi, a))
+        yield lambda lo, hi, gamma=gamma: float(fifty_fifty_ce('crra', lo, hi, gamma))
+    yield lambda lo, hi: 0.5 * (lo + hi)
+    for _ in range(5):
+        draw = random.Random(rng.random())
+        yield lambda lo, hi, draw=draw: float(min(max(round(draw.uniform(lo, hi)), lo), hi))
+
+
+@pytest.mark.parametrize('num_questions', [1, 7, 40])
+def test_scheduler_matches_sorted_list(num_questions):
+    for get_ce, replay in zip(_answerers(1), _answerers(1)): #the same subject twice, the rounded answers draw from a stream
+        assert stepwise_elicitation(1.0, 100.0, num_questions, get_ce) == _sorted_list_elicitation(1.0, 100.0, num_questions, replay)
+
+
+def test_scheduler_breaks_ties_in_insertion_order():
+    scheduler = SegmentScheduler()
+    for left in (0.0, 10.0, 5.0, 30.0):
+        scheduler.push(left, left + 2.0, 0.0, 1.0)
+    scheduler.push(50.0, 60.0, 0.0, 1.0)
+    assert len(scheduler) == 5
+    assert [scheduler.pop() for _ in range(5)] == [(50.0, 60.0), (0.0, 2.0), (10.0, 12.0), (5.0, 7.0), (30.0, 32.0)]
+    by_gap = SegmentScheduler(utility_gap_priority)
+    by_gap.push(0.0, 50.0, 0.0, 10.0)
+    by_gap.push(50.0, 60.0, 10.0, 90.0)
+    assert by_gap.pop() == (50.0, 60.0)
+
+
+@pytest.mark.parametrize('family, median, min_pay', [('cara', 0.03, 0.0), ('crra', 0.5, 1.0), ('linear', 1.0, 0.0)])
+@pytest.mark.parametrize('num_questions', [1, 10, 25])
+def test_batch_matches_stepwise(family, median, min_pay, num_questions):
+    result = simulate_elicitation_batch(50, family, param_median=median, min_pay=min_pay, num_questions=num_questions, seed=3)
+    for points, param in zip(result.points, result.params):
+        get_ce = lambda lo, hi, param=param: float(fifty_fifty_ce(family, lo, hi, param))
+        expected = stepwise_elicitation(min_pay, 100.0, num_questions, get_ce)
+        np.testing.assert_allclose(points, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_batch_subjects_running_out_of_segments():
+    result = simulate_elicitation_batch(2, 'cara', params=[0.05, 0.05], min_pay=0.0, max_pay=1.5e-9, num_questions=3, seed=0)
+    assert np.all(np.isfinite(result.points[:, :3])) #both halves of the first segment are narrower than 1e-9
+    assert np.all(np.isnan(result.points[:, 3:]))
+    expected = stepwise_elicitation(0.0, 1.5e-9, 1, lambda lo, hi: float(fifty_fifty_ce('cara', lo, hi, 0.05))) #asking a second time finds no segment
+    np.testing.assert_allclose(result.points[0, :len(expected)], expected, rtol=1e-12)
+
+
+def test_width_curvature_priority():
+    assert width_curvature_priority(5.0, 5.0) is width_priority #no chord to compare with
+    assert width_curvature_priority(0.0, 100.0, 50.0, 50.0) is width_priority #flat chord
+    priority = width_curvature_priority(0.0, 100.0)
+    assert math.isclose(priority(20.0, 40.0, 20.0, 40.0), width_priority(20.0, 40.0, 20.0, 40.0)) #on the chord: the width
+    assert priority(20.0, 40.0, 20.0, 60.0) == pytest.approx(40.0) #slope 2 against chord slope 1
+    assert priority(20.0, 40.0, 20.0, 20.0) == pytest.approx(40.0) #flat segment, as far from the chord the other way
+    flat = stepwise_elicitation(0.0, 100.0, 12, lambda lo, hi: 0.5 * (lo + hi), width_curvature_priority(0.0, 100.0, 3.0, 3.0))
+    assert flat == stepwise_elicitation(0.0, 100.0, 12, lambda lo, hi: 0.5 * (lo + hi))
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from risk_preferences.choice import build_holt_laury
+from risk_preferences.estimation import (_choice_log_likelihood, _menu_design, _utility_and_param_derivative,
+                                         choice_probabilities, estimate_risk_parameters, simulate_choices)
+
+MENU = build_holt_laury(steps=20)
+
+
+@pytest.mark.parametrize('family, param, noise', [('crra', 0.6, 0.05), ('crra', 1.0, 0.05), ('crra', 2.0, 0.02),
+                                                  ('cara', 0.2, 0.02), ('cara', 0.05, 0.05)])
+def test_pooled_fit_recovers_the_simulated_subject(family, param, noise):
+    choices = simulate_choices(MENU, family, np.full(4000, param), noise, seed=11)
+    fit = estimate_risk_parameters(MENU, choices, family, pooled=True)
+    assert fit.converged.all() and fit.params.shape == (1,)
+    assert abs(fit.params[0] - param) < 4 * fit.std_errors[0, 0] and fit.std_errors[0, 0] < 0.1 * param
+    assert abs(fit.noise[0] - noise) < 4 * fit.std_errors[0, 1]
+    fixed = estimate_risk_parameters(MENU, choices, family, pooled=True, fixed_noise=noise)
+    assert fixed.noise[0] == pytest.approx(noise, rel=1e-12) and fixed.std_errors[0, 1] == 0.0
+    assert abs(fixed.params[0] - param) < 4 * fixed.std_errors[0, 0]
+
+
+def test_subject_fits_recover_a_population():
+    params = np.exp(np.random.default_rng(5).normal(np.log(0.7), 0.3, 300))
+    menu = build_holt_laury(steps=200) #many choices per subject, so every single fit is informative
+    choices = simulate_choices(menu, 'crra', params, 0.05, seed=12)
+    fit = estimate_risk_parameters(menu, choices, 'crra')
+    assert fit.converged.all() and fit.params.shape == params.shape
+    assert np.median(np.abs(fit.params - params)) < 0.05 and np.max(np.abs(fit.params - params)) < 0.3
+    assert np.corrcoef(fit.params, params)[0, 1] > 0.95
+    assert np.mean(np.abs(fit.params - params) < 2 * fit.std_errors[:, 0]) > 0.85 #standard errors of the right size
+
+
+@pytest.mark.parametrize('family, params', [('crra', [1.0, 1 + 2e-5, 1 - 5e-5, 0.6, 2.5]), ('cara', [0.05, 0.3, 1.5])])
+def test_gradient_matches_finite_differences(family, params):
+    payoffs, weights = _menu_design(MENU, family)
+    choices = simulate_choices(MENU, family, params, 0.05, seed=13).astype(float)
+    choices[0, 3] = np.nan #a missing choice adds nothing
+    observed = (choices == 0) | (choices == 1)
+    log_param, log_noise = np.log(params), np.full(len(params), np.log(0.05))
+
+    def total(log_param, log_noise):
+        return _choice_log_likelihood(payoffs, weights, family, choices, observed, log_param, log_noise)[0].sum(axis=1)
+
+    _ll, slope, grad_z, _info = _choice_log_likelihood(payoffs, weights, family, choices, observed, log_param, log_noise)
+    grad = np.einsum('nr,nri->ni', slope, grad_z)
+    h = 1e-6
+    numeric = np.stack([(total(log_param + h, log_noise) - total(log_param - h, log_noise)) / (2 * h),
+                        (total(log_param, log_noise + h) - total(log_param, log_noise - h)) / (2 * h)], axis=1)
+    np.testing.assert_allclose(grad, numeric, rtol=1e-5, atol=1e-7)
+
+
+def test_series_branch_joins_the_closed_form():
+    m = np.array([1.0, 1.5, 4.0, 10.0])
+    for gamma in (1.0, 1 + 1e-6, 1 - 3e-5):
+        util, d_util = _utility_and_param_derivative('crra', m, gamma)
+        c = 1 - gamma
+        exact = np.log(m) if c == 0 else (m ** c - 1) / c
+        np.testing.assert_allclose(util, exact, rtol=1e-9, atol=1e-15)
+        h = 1e-3 #outside the series branch on both sides
+        numeric = (_utility_and_param_derivative('crra', m, gamma + h)[0] - _utility_and_param_derivative('crra', m, gamma - h)[0]) / (2 * h)
+        np.testing.assert_allclose(d_util, numeric, rtol=1e-5, atol=1e-12)
+    np.testing.assert_allclose(_utility_and_param_derivative('crra', m, 1.0)[1], -0.5 * np.log(m) ** 2)
+
+
+def test_choice_probabilities_match_simulation():
+    probs = choice_probabilities(MENU, 'cara', [0.1, 0.4], 0.03)
+    choices = simulate_choices(MENU, 'cara', np.repeat([0.1, 0.4], 5000), 0.03, seed=14)
+    np.testing.assert_allclose(choices[:5000].mean(axis=0), probs[0], atol=0.03)
+    np.testing.assert_allclose(choices[5000:].mean(axis=0), probs[1], atol=0.03)
@@ -0,0 +1,51 @@
+import math
+
+import numpy as np
+import pytest
+
+import risk_preferences as rp
+from risk_preferences import CARAUtility, CRRAUtility, cara, crra
+
+PAYOFFS = [0.5, 1.0, 3.0, 10.0, 42.0]
+CASES = [(CARAUtility, cara, 'a', [0.05, 0.5, 1.0]), (CRRAUtility, crra, 'gamma', [0.5, 1.0, 2.0, 3.0])]
+
+
+@pytest.mark.parametrize('family, function, name, values', CASES)
+def test_scalar_params_match_function(family, function, name, values):
+    for value in values:
+        u = family(**{name: value})
+        for m in PAYOFFS:
+            assert math.isclose(u(m), function(m, **{name: value}), rel_tol=1e-12, abs_tol=1e-15)
+            if m <= 10.0: #cara of larger payoffs is 1 up to rounding, with no finite inverse
+                assert math.isclose(u.inverse(u(m)), m, rel_tol=1e-6)
+        np.testing.assert_allclose(u(np.array(PAYOFFS)), [function(m, **{name: value}) for m in PAYOFFS], rtol=1e-12)
+
+
+@pytest.mark.parametrize('family, function, name, values', CASES)
+def test_array_params_match_function(family, function, name, values):
+    u = family(**{name: values})
+    grid = u.evaluate(PAYOFFS)
+    assert grid.shape == (len(values), len(PAYOFFS))
+    for row, value in zip(grid, values):
+        np.testing.assert_allclose(row, [function(m, **{name: value}) for m in PAYOFFS], rtol=1e-12)
+    np.testing.assert_allclose(u(np.full(len(values), 3.0)), [function(3.0, **{name: v}) for v in values], rtol=1e-12)
+
+
+@pytest.mark.parametrize('family, function, name, values', CASES)
+def test_array_params_rejected_by_scalar_api(family, function, name, values):
+    u = family(**{name: values})
+    lottery = [{'out': 1.0, 'prob': 0.5}, {'out': 4.0, 'prob': 0.5}]
+    for call in (lambda: rp.expected_utility(lottery, u), lambda: rp.certainty_equivalent(lottery, u),
+                 lambda: rp.lottery_choice([lottery, lottery], u), lambda: u.expected_utility([1.0, 4.0], [0.5, 0.5]),
+                 lambda: rp.batch_expected_utilities([lottery], u), lambda: rp.LotteryHandle(lottery, u)):
+        with pytest.raises(ValueError, match='array parameters'):
+            call()
+
+
+def test_params_are_read_only():
+    u = CRRAUtility(gamma=2.0)
+    with pytest.raises(TypeError):
+        u.params['gamma'] = 1.0
+    with pytest.raises(ValueError):
+        u.params['gamma'][...] = 1.0
+    assert u == CRRAUtility(gamma=2.0) and hash(u) == hash(CRRAUtility(gamma=2.0)) and u != u.with_params(gamma=1.0)
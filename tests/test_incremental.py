@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+import risk_preferences as rp
+from risk_preferences import CARAUtility, CRRAUtility, LotteryHandle, cara
+
+
+def _paths(lottery, prefix=()):
+    for i, outcome in enumerate(lottery):
+        yield prefix + (i,)
+        if isinstance(outcome['out'], list):
+            yield from _paths(outcome['out'], prefix + (i,))
+
+
+def test_edits_match_recomputation(rng, nested_lottery):
+    u = CRRAUtility(gamma=0.5)
+    handle = LotteryHandle(nested_lottery(5, 4), u)
+    for step in range(200):
+        path = rng.choice(list(_paths(handle.to_dicts())))
+        r = rng.random()
+        if r < 0.4:
+            handle.set_prob(path, rng.random())
+        elif r < 0.8:
+            handle.set_outcome(path, rng.uniform(1.0, 100.0))
+        else:
+            handle.set_outcome(path, nested_lottery(3, 2), prob=rng.random())
+        lottery = handle.to_dicts()
+        other = rng.choice([None, CARAUtility(a=0.01), cara])
+        ref = u if other is None else other
+        rp.clear_reduction_cache()
+        assert math.isclose(handle.expected_value(), rp.expected_value(lottery), rel_tol=1e-9)
+        assert math.isclose(handle.expected_utility(other), rp.expected_utility(lottery, ref), rel_tol=1e-9)
+        assert math.isclose(handle.certainty_equivalent(other), rp.certainty_equivalent(lottery, ref), rel_tol=1e-9)
+
+
+def test_set_params_rebuilds(nested_lottery):
+    lottery = nested_lottery(5, 2)
+    u = CRRAUtility(gamma=0.5)
+    handle = LotteryHandle(lottery, u)
+    handle.certainty_equivalent()
+    with pytest.raises(TypeError): #parameters are fixed, so they cannot go stale under the cached eus
+        u.params['gamma'] = 2.0
+    handle.set_params(gamma=2.0)
+    assert math.isclose(handle.certainty_equivalent(), rp.certainty_equivalent(lottery, CRRAUtility(gamma=2.0)), rel_tol=1e-9)
+
+
+def test_equal_parameters_keep_cache(nested_lottery):
+    handle = LotteryHandle(nested_lottery(5, 2), CRRAUtility(gamma=0.5))
+    handle.expected_utility()
+    with rp.instrumented() as stats:
+        handle.expected_utility(CRRAUtility(gamma=0.5))
+    assert stats.counters.get('handle.rebuilds', 0) == 0
+
+
+def test_bad_paths(nested_lottery):
+    handle = LotteryHandle(nested_lottery(3, 1))
+    with pytest.raises(IndexError):
+        handle.set_prob((), 1.0)
+    with pytest.raises(IndexError):
+        handle.set_prob((99,), 1.0)
+    handle.set_utility(lambda m: m)
+    with pytest.raises(TypeError):
+        handle.set_params(a=1.0)
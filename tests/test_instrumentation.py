@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+import risk_preferences as rp
+from risk_preferences import CRRAUtility, batch_certainty_equivalents, cara, crra, instrumented
+from risk_preferences.instrumentation import active
+
+
+@pytest.fixture
+def fresh_cache():
+    rp.clear_reduction_cache()
+    yield
+    rp.clear_reduction_cache()
+
+
+class _NewtonOnly:
+    """crra with a derivative but no inverse, so certainty_equivalent searches with Newton steps."""
+    derivative = staticmethod(lambda m: m ** -2.0)
+
+    def __call__(self, m):
+        return crra(m)
+
+
+def test_counters_of_the_scalar_paths(fresh_cache, nested_lottery):
+    lottery = nested_lottery(5, 3)
+    distinct = len(rp.flatten_lottery(lottery).payoffs)
+    with instrumented() as stats:
+        rp.expected_utility(lottery, crra)
+        rp.certainty_equivalent(lottery, cara)
+        rp.certainty_equivalent(lottery, _NewtonOnly())
+        rp.certainty_equivalent(lottery, lambda m: m ** 0.5)
+    counters = stats.counters
+    assert counters['expected_utility.calls'] == 1
+    assert counters['reduction_cache.misses'] == 1 and counters['reduction_cache.hits'] == 3
+    assert counters['utility.evaluations'] == counters['utility.calls'] == 4 * distinct #one call per distinct payoff
+    assert counters['certainty_equivalent.closed_form'] == counters['certainty_equivalent.newton'] == 1
+    assert counters['certainty_equivalent.brent'] == 1
+    assert 0 < counters['solver.newton.iterations'] < 100 and 0 < counters['solver.brent.iterations'] < 100
+    assert stats.maxima == {'flatten.depth': 4} #three levels of sub-lotteries below the top
+    assert stats.stages['reduce'][0] == 4
+    assert stats.stages['certainty_equivalent.solve'][0] == stats.stages['certainty_equivalent.expected_utility'][0] == 3
+
+
+def test_array_and_batch_counters(fresh_cache, lotteries):
+    with instrumented() as stats:
+        rp.expected_utility(lotteries[0], CRRAUtility(gamma=0.5)) #one array call for all payoffs
+    assert stats.counters['utility.calls'] == 1 and stats.counters['utility.evaluations'] == 2
+    assert stats.maxima['flatten.depth'] == 1 #lotteries[0] is simple
+    with instrumented() as stats:
+        batch_certainty_equivalents(lotteries, _NewtonOnly())
+    counters = stats.counters
+    assert counters['batch.lotteries'] == len(lotteries)
+    assert counters['batch.lockstep.iterations'] > 0
+    assert counters['utility.calls'] < counters['utility.evaluations'] #scalar-only u: one call per payoff, but u' is array-aware
+    assert stats.maxima['flatten.depth'] == 4 #from_lotteries walks every lottery
+
+
+def test_blocks_nest_and_switch_off(fresh_cache, lotteries):
+    assert active() is None
+    outer = rp.Instrumentation()
+    with instrumented(outer):
+        rp.certainty_equivalent(lotteries[1], cara)
+        with instrumented() as inner:
+            assert active() is inner
+            rp.certainty_equivalent(lotteries[1], cara)
+        assert active() is outer
+    assert active() is None
+    rp.certainty_equivalent(lotteries[2], cara) #not recorded anywhere
+    assert inner.counters['reduction_cache.hits'] == 1 and 'reduction_cache.misses' not in inner.counters
+    assert outer.counters['reduction_cache.misses'] == 1 and 'reduction_cache.hits' not in outer.counters
+    with instrumented(outer): #keeps adding to the same counters
+        rp.certainty_equivalent(lotteries[1], cara)
+    assert outer.counters['reduction_cache.hits'] == 1 and outer.counters['certainty_equivalent.closed_form'] == 2
+    summary = json.loads(outer.to_json())
+    assert summary['counters'] == outer.counters and set(summary['stages']) == set(outer.stages)
+    assert all(stage['calls'] >= 1 and stage['max_seconds'] <= stage['total_seconds'] for stage in summary['stages'].values())
+    outer.reset()
+    assert outer.summary() == {'counters': {}, 'maxima': {}, 'stages': {}}
@@ -0,0 +1,172 @@
+import math
+
+import numpy as np
+import pytest
+
+import risk_preferences as rp
+from risk_preferences import Lottery, cara, crra, instrumented
+from risk_preferences.lotteries import _brent_root, _flatten, _newton_root, _solve_certainty_equivalent
+from risk_preferences.utilities import cara_inverse, crra_inverse
+
+
+@pytest.fixture
+def fresh_cache():
+    rp.set_reduction_cache_size(4096)
+    yield
+    rp.set_reduction_cache_size(4096) #back to the module default for the other tests
+
+
+def test_repeated_calls_hit_the_cache(fresh_cache, nested_lottery):
+    lottery = nested_lottery(5, 3)
+    ev, eu = rp.expected_value(lottery), rp.expected_utility(lottery, crra)
+    assert rp.reduction_cache_info().misses == 1 and rp.reduction_cache_info().hits == 1
+    with instrumented() as stats:
+        assert rp.expected_value(lottery) == ev
+        assert rp.expected_utility(lottery, crra) == eu
+        rp.certainty_equivalent(lottery, crra)
+    assert stats.counters['reduction_cache.hits'] == 3 and 'reduction_cache.misses' not in stats.counters
+    assert rp.reduction_cache_info().misses == 1 and rp.reduction_cache_info().currsize == 1
+    summary = rp.flatten_lottery(lottery) #the uncached reduction gives the same numbers
+    assert math.isclose(ev, summary.ev, rel_tol=1e-12)
+    assert math.isclose(eu, sum(p * crra(x) for x, p in zip(summary.payoffs, summary.probs)), rel_tol=1e-12)
+
+
+def test_equal_lotteries_share_an_entry(fresh_cache, nested_lottery):
+    lottery = nested_lottery(4, 2)
+    copy = [dict(outcome) for outcome in lottery]
+    rp.expected_value(lottery)
+    rp.expected_value(copy)
+    rp.expected_value(Lottery.from_dicts(lottery).to_dicts())
+    assert rp.reduction_cache_info().misses == 1 and rp.reduction_cache_info().hits == 2
+
+
+def test_clear_and_resize_invalidate(fresh_cache, lotteries):
+    for lottery in lotteries:
+        rp.expected_value(lottery)
+    assert rp.reduction_cache_info().currsize == len(lotteries)
+    rp.clear_reduction_cache()
+    info = rp.reduction_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (0, 0, 0)
+    rp.set_reduction_cache_size(2)
+    for lottery in lotteries + lotteries[-2:]:
+        rp.expected_value(lottery)
+    info = rp.reduction_cache_info()
+    assert (info.maxsize, info.currsize, info.hits, info.misses) == (2, 2, 2, len(lotteries))
+    rp.expected_value(lotteries[0]) #evicted long ago
+    assert rp.reduction_cache_info().misses == len(lotteries) + 1
+
+
+def test_empty_lotteries(fresh_cache):
+    for lottery in ([], Lottery([], [])):
+        summary = rp.lottery_summary(lottery)
+        assert summary.payoffs == () and math.isnan(summary.low) and math.isnan(summary.high)
+        assert rp.expected_value(lottery) == 0.0
+        with pytest.raises(ValueError, match='no outcomes'):
+            rp.certainty_equivalent(lottery, crra)
+
+
+class _Utility:
+    """u with only the attributes given, to steer _solve_certainty_equivalent onto one path."""
+
+    def __init__(self, u, **attributes):
+        self.u = u
+        self.__dict__.update(attributes)
+
+    def __call__(self, m):
+        return self.u(m)
+
+
+def _failing_inverse(util):
+    raise ValueError("outside the inverse's range")
+
+
+CLOSED_FORMS = [(lambda m, g=g: crra(m, gamma=g), lambda m, g=g: m ** -g, lambda x, g=g: crra_inverse(x, gamma=g))
+                for g in (0.5, 1.0, 3.0)] + \
+               [(lambda m, a=a: cara(m, a=a), lambda m, a=a: a * math.exp(-a * m), lambda x, a=a: cara_inverse(x, a=a))
+                for a in (0.1, 0.5)]
+
+
+@pytest.mark.parametrize('u, du, inverse', CLOSED_FORMS)
+def test_root_finders_match_closed_form(u, du, inverse, rng):
+    for _ in range(20):
+        low, high = sorted(rng.uniform(1.0, 10.0) for _ in range(2))
+        target = inverse(u(low) + rng.random() * (u(high) - u(low)))
+        gap = lambda m: u(m) - u(target)
+        assert math.isclose(_newton_root(gap, du, low, high, tol=1e-12), target, rel_tol=1e-9)
+        assert math.isclose(_brent_root(gap, low, high, tol=1e-12), target, rel_tol=1e-9)
+        assert _newton_root(gap, lambda m: 0.0, low, high, tol=1e-12) == pytest.approx(target, rel=1e-9) #no slope: bisection
+        shift = u(high) - u(low) + 1.0
+        assert _newton_root(lambda m: gap(m) + shift, du, low, high) == low #root below the bracket: clamped to it
+        assert _brent_root(lambda m: gap(m) - shift, low, high) == high
+
+
+@pytest.mark.parametrize('u, du, inverse', CLOSED_FORMS)
+def test_solver_paths_agree(u, du, inverse, nested_lottery):
+    lottery = nested_lottery(4, 2, max_pay=10.0)
+    summary = rp.lottery_summary(lottery)
+    eu = sum(p * u(x) for x, p in zip(summary.payoffs, summary.probs))
+    exact = inverse(eu)
+    paths = {'closed_form': _Utility(u, inverse=inverse, derivative=du),
+             'newton': _Utility(u, inverse=_failing_inverse, derivative=du), #the inverse fails, so search with Newton steps
+             'brent': _Utility(u, inverse=_failing_inverse)} #and without a derivative, Brent's method
+    for path, utility in paths.items():
+        stats = rp.Instrumentation()
+        ce = _solve_certainty_equivalent(utility, eu, summary.low, summary.high, 1e-12, stats)
+        assert stats.counters == {f'certainty_equivalent.{path}': 1}
+        assert math.isclose(ce, exact, rel_tol=1e-9)
+
+
+def test_degenerate_lotteries_return_the_payoff():
+    for lottery in ([{'out': 7.0, 'prob': 1.0}], [{'out': 7.0, 'prob': 0.3}, {'out': [{'out': 7.0, 'prob': 1.0}], 'prob': 0.7}]):
+        for u in (crra, cara, _Utility(crra)):
+            assert rp.certainty_equivalent(lottery, u) == 7.0
+    stats = rp.Instrumentation()
+    assert _solve_certainty_equivalent(_Utility(crra), crra(7.0), 7.0, 7.0, 1e-9, stats) == 7.0
+    assert stats.counters == {} #no solver ran
+
+
+def _recursive_reduce(lottery):
+    """reduce_lottery as it was before the iterative pass: recursion, then the payoffs sorted."""
+    payoff_prob = {}
+    def walk(lot, weight):
+        for outcome in lot:
+            prob, out = outcome['prob'] * weight, outcome['out']
+            if isinstance(out, list):
+                walk(out, prob)
+            else:
+                payoff_prob[float(out)] = payoff_prob.get(float(out), 0.0) + prob
+    walk(lottery, 1.0)
+    return [{'out': x, 'prob': payoff_prob[x]} for x in sorted(payoff_prob)]
+
+
+def test_reduction_matches_recursive_version(fresh_cache, lotteries, nested_lottery, rng):
+    repeated = [nested_lottery(6, 3) for _ in range(5)]
+    for lottery in repeated: #equal payoffs in different branches, so probabilities get merged
+        lottery[0]['out'] = lottery[-1]['out'] = 5.0
+    for lottery in lotteries + repeated + [[{'out': 3, 'prob': 1.0}], [{'out': [], 'prob': 0.5}, {'out': 1, 'prob': 0.5}]]:
+        expected = _recursive_reduce(lottery)
+        assert rp.reduce_lottery(lottery) == expected #same payoffs, same order, same sums (the key is walked in the same order)
+        payoff_prob, ev = _flatten(lottery)
+        summary = rp.flatten_lottery(lottery)
+        assert list(summary.payoffs) == sorted(payoff_prob) == [item['out'] for item in expected]
+        assert summary.probs == pytest.approx([item['prob'] for item in expected], rel=1e-12)
+        assert ev == pytest.approx(sum(item['out'] * item['prob'] for item in expected), rel=1e-12)
+
+
+def test_deep_nesting_needs_no_recursion(fresh_cache):
+    depth = 5000 #five times the default recursion limit
+    lottery, ev = [{'out': 0.0, 'prob': 1.0}], 0.0
+    for k in range(1, depth + 1): #k with probability 1/2, else the lottery built so far
+        lottery, ev = [{'out': float(k), 'prob': 0.5}, {'out': lottery, 'prob': 0.5}], 0.5 * k + 0.5 * ev
+    with instrumented() as stats:
+        summary = rp.lottery_summary(lottery)
+    assert stats.maxima['flatten.depth'] == depth + 1
+    assert summary.payoffs == tuple(float(k) for k in range(depth + 1)) and summary.probs[-1] == 0.5
+    assert math.isclose(summary.ev, ev, rel_tol=1e-12) and math.isclose(rp.flatten_lottery(lottery).ev, ev, rel_tol=1e-12)
+    assert rp.reduce_lottery(lottery) == [{'out': x, 'prob': p} for x, p in zip(summary.payoffs, summary.probs)]
+    assert math.isclose(rp.certainty_equivalent(lottery, lambda m: m), ev, rel_tol=1e-9)
+    arrays = Lottery.from_dicts(lottery)
+    assert rp.lottery_key(arrays.to_dicts()) == rp.lottery_key(lottery) #== on the dictionaries would recurse
+    assert math.isclose(arrays.expected_value(), ev, rel_tol=1e-12)
+    batch = rp.make_random_lottery_batch(3, depth=depth, seed=7)
+    np.testing.assert_allclose(batch.segment_sum(batch.probs), 1.0, rtol=1e-9)
@@ -0,0 +1,54 @@
+import functools
+
+import numpy as np
+import pytest
+
+from risk_preferences import (CARAUtility, LotteryBatch, batch_certainty_equivalents, cara_vec, crra_vec,
+                              invertible_utility, lottery_choice, parallel_expected_utilities, parallel_lottery_choice,
+                              parallel_sweep)
+from risk_preferences.parallel import SharedLotteryBatch, _run_shard
+
+
+@pytest.fixture
+def batch(lotteries):
+    return LotteryBatch.from_lotteries(lotteries * 20)
+
+
+def test_sweep_does_not_depend_on_workers_or_shards(batch):
+    gammas = [0.5, 1.0, 2.0]
+    serial = parallel_sweep(batch, crra_vec, 'gamma', gammas, workers=1)
+    sharded = parallel_sweep(batch, crra_vec, 'gamma', gammas, workers=3, shard_size=7)
+    assert np.array_equal(serial, sharded)
+    for row, gamma in zip(serial, gammas):
+        expected = batch_certainty_equivalents(batch, invertible_utility(crra_vec, gamma=gamma))
+        np.testing.assert_allclose(row, expected, rtol=1e-9)
+
+
+def test_expected_utilities_match_batch(batch):
+    u = functools.partial(cara_vec, a=0.05)
+    assert np.array_equal(parallel_expected_utilities(batch, u, workers=2, shard_size=11), batch.expected_utilities(u))
+
+
+def test_lottery_choice_matches_scalar(lotteries):
+    u = functools.partial(cara_vec, a=0.05)
+    menus = [lotteries[i:i + 3] for i in range(len(lotteries) - 2)] + [[]]
+    choices = parallel_lottery_choice(menus, u, workers=2, shard_size=2)
+    assert [c[0] for c in choices] == [lottery_choice(menu, u)[0] for menu in menus]
+
+
+def test_worker_errors_are_not_masked(batch):
+    with pytest.raises(FileNotFoundError):
+        _run_shard((('no-such-block', '<f8', 1),) * 3, 0, 1, 'ev', ('callable', None), 1e-9)
+    with SharedLotteryBatch(batch) as shared, pytest.raises(IndexError): #used to become UnboundLocalError in the cleanup
+        _run_shard(shared.spec, len(batch) + 5, len(batch) + 6, 'ev', ('callable', None), 1e-9)
+
+
+def test_unpicklable_utilities_fail_up_front(batch):
+    def closure(m):
+        return cara_vec(m, a=0.05)
+    for u in (lambda m: cara_vec(m, a=0.05), closure):
+        with pytest.raises(TypeError, match='cannot be pickled'):
+            parallel_expected_utilities(batch, u, workers=2, shard_size=11)
+        assert np.array_equal(parallel_expected_utilities(batch, u, workers=1), batch.expected_utilities(u)) #no processes, no pickling
+    u = CARAUtility(a=0.05) #utility objects pickle
+    np.testing.assert_allclose(parallel_expected_utilities(batch, u, workers=2, shard_size=11), batch.expected_utilities(u))
@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+import pytest
+
+import risk_preferences as rp
+from risk_preferences import CARAUtility, CRRAUtility
+from risk_preferences.sampling import AliasTree, _alias_table, monte_carlo_evaluate, sample_payoffs
+
+
+def _table_probs(threshold, alias):
+    """Probability of drawing each outcome from a (threshold, alias) table."""
+    n = len(threshold)
+    probs = [t / n for t in threshold]
+    for column, t in enumerate(threshold):
+        probs[alias[column]] += (1.0 - t) / n
+    return probs
+
+
+def test_alias_tables_are_exact(rng):
+    for probs in ([1.0], [0.5, 0.5], [0.999, 0.001], [3.0, 1.0, 0.0, 4.0], [rng.random() for _ in range(50)]):
+        threshold, alias = _alias_table(probs)
+        assert all(0.0 <= t <= 1.0 for t in threshold)
+        np.testing.assert_allclose(_table_probs(threshold, alias), np.array(probs) / sum(probs), atol=1e-12)
+
+
+def test_sample_frequencies_match_probabilities(nested_lottery):
+    shared = [{'out': 1.0, 'prob': 0.25}, {'out': 2.0, 'prob': 0.75}]
+    lotteries = [nested_lottery(6, 3),
+                 [{'out': shared, 'prob': 0.5}, {'out': [{'out': shared, 'prob': 0.9}, {'out': 3.0, 'prob': 0.1}], 'prob': 0.5}]]
+    n = 400_000
+    for lottery in lotteries:
+        summary = rp.flatten_lottery(lottery)
+        draws = sample_payoffs(lottery, n, seed=21)
+        assert set(np.unique(draws)) <= set(summary.payoffs)
+        probs = np.array(summary.probs)
+        freqs = np.array([np.count_nonzero(draws == x) for x in summary.payoffs]) / n
+        assert np.all(np.abs(freqs - probs) < 5 * np.sqrt(probs * (1 - probs) / n) + 1e-12) #every payoff within 5 standard errors
+        np.testing.assert_array_equal(sample_payoffs(lottery, n, seed=21), draws) #same seed, same draws
+    assert AliasTree(lotteries[1]).num_nodes == 3 #shared is compiled once
+
+
+@pytest.mark.parametrize('u', [CRRAUtility(gamma=2.0), CARAUtility(a=0.05), lambda m: math.log1p(m)])
+def test_monte_carlo_converges_to_the_exact_values(nested_lottery, u):
+    lottery = nested_lottery(8, 2)
+    exact_ce, exact_ev = rp.certainty_equivalent(lottery, u), rp.expected_value(lottery)
+    ses = []
+    for samples in (10_000, 160_000, 2_560_000):
+        result = monte_carlo_evaluate(lottery, u, max_samples=samples, block_size=200_000, seed=5)
+        assert result.samples == samples
+        assert abs(result.ce - exact_ce) < 5 * result.ce_se and abs(result.ev - exact_ev) < 5 * result.ev_se
+        assert abs(result.rp - (exact_ev - exact_ce)) < 5 * result.rp_se
+        ses.append(result.ce_se)
+    np.testing.assert_allclose(np.array(ses[:-1]) / ses[1:], 4.0, rtol=0.1) #16 times the samples, a quarter of the error
+    assert ses[-1] < 0.05
+    stopped = monte_carlo_evaluate(lottery, u, target_se=0.1, block_size=10_000, seed=5)
+    assert stopped.ce_se <= 0.1 and stopped.samples < 2_560_000 and abs(stopped.ce - exact_ce) < 5 * stopped.ce_se
@@ -0,0 +1,85 @@
+import csv
+import json
+import math
+
+import pytest
+
+import risk_preferences as rp
+from risk_preferences import parse_param_grid, score_file, write_lottery_file
+
+LINES = [
+    '[{"out": 1, "prob": 0.5}, {"out": 9, "prob": 0.5}]',
+    '{"id": "neg", "lottery": [{"out": -5, "prob": 0.5}, {"out": 9, "prob": 0.5}]}',
+    '{"id": "nokey", "lottery": [{"o": 1, "prob": 1}]}',
+    'not json',
+    '[{"out": 4, "prob": 1}]',
+]
+
+
+@pytest.fixture
+def mixed_file(tmp_path):
+    path = tmp_path / 'in.jsonl'
+    path.write_text('\n'.join(LINES) + '\n')
+    return str(path)
+
+
+def _rows(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_scores_match_scalar_functions(tmp_path, lotteries):
+    source, target = str(tmp_path / 'in.jsonl'), str(tmp_path / 'out.csv')
+    write_lottery_file(source, lotteries)
+    grid = parse_param_grid('crra', ['gamma=0.5,2'])
+    assert score_file(source, target, 'crra', grid, workers=2, chunk_size=4) == len(lotteries)
+    rows = _rows(target)
+    assert len(rows) == 2 * len(lotteries)
+    for row in rows:
+        lottery, u = lotteries[int(row['id'])], rp.CRRAUtility(gamma=float(row['gamma']))
+        assert row['error'] == ''
+        assert math.isclose(float(row['ce']), rp.certainty_equivalent(lottery, u), rel_tol=1e-8)
+
+
+def test_invalid_lotteries_get_an_error(mixed_file, tmp_path):
+    target = str(tmp_path / 'out.csv')
+    with pytest.warns(UserWarning):
+        assert score_file(mixed_file, target, 'crra', parse_param_grid('crra', ['gamma=0.5,2']), chunk_size=2) == 5
+    rows = _rows(target)
+    assert [row['id'] for row in rows[::2]] == ['0', 'neg', 'nokey', '3', '4']
+    errors = {row['id']: row['error'] for row in rows}
+    assert errors['0'] == errors['4'] == ''
+    assert 'CRRA' in errors['neg'] and 'KeyError' in errors['nokey'] and 'line 4' in errors['3']
+    assert all(math.isnan(float(row['ce'])) for row in rows if row['error'])
+    assert float(rows[-1]['ce']) == 4.0
+
+
+def test_jsonl_output_marks_errors_only(mixed_file, tmp_path):
+    target = str(tmp_path / 'out.jsonl')
+    with pytest.warns(UserWarning):
+        score_file(mixed_file, target, 'cara')
+    records = [json.loads(line) for line in open(target)]
+    assert [('error' in record) for record in records] == [False, False, True, True, False]
+
+
+def test_strict_checks_grid_before_writing(mixed_file, tmp_path):
+    target = tmp_path / 'out.csv'
+    with pytest.raises(ValueError, match='undefined for some payoffs'):
+        score_file(mixed_file, str(target), 'crra', strict=True, check_range=True)
+    assert not target.exists()
+    with pytest.raises(ValueError, match='must be > 0'): #parameters outside the family's range, also before any output
+        score_file(mixed_file, str(target), 'crra', parse_param_grid('crra', ['gamma=-1']))
+    assert not target.exists()
+
+
+def test_blank_csv_lines_are_skipped(tmp_path, lotteries):
+    source, target = tmp_path / 'in.csv', str(tmp_path / 'out.csv')
+    write_lottery_file(str(source), lotteries[:3])
+    lines = source.read_text().splitlines()
+    source.write_text('\n'.join([lines[0], ''] + [line for row in lines[1:] for line in (row, '  ')]) + '\n\n')
+    assert score_file(str(source), target, 'crra', strict=True) == 3
+    rows = _rows(target)
+    assert [row['id'] for row in rows] == ['0', '1', '2'] and all(row['error'] == '' for row in rows)
+    for row in rows:
+        assert math.isclose(float(row['ce']), rp.certainty_equivalent(lotteries[int(row['id'])], rp.CRRAUtility()),
+                            rel_tol=1e-8)
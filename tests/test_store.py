@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from risk_preferences import (Lottery, LotteryBatch, LotteryStoreWriter, make_random_lottery_batch, open_lottery_store,
+                              write_lottery_store)
+
+
+def test_round_trip(tmp_path, lotteries):
+    path = str(tmp_path / 'store')
+    with LotteryStoreWriter(path, chunk_size=4) as writer:
+        writer.write_many(lotteries[:5])
+        writer.write(Lottery.from_dicts(lotteries[5]))
+        writer.write_many(lotteries[6:])
+    store = open_lottery_store(path)
+    assert len(store) == len(lotteries)
+    for j in (0, 5, -1):
+        assert store[j].to_dicts() == Lottery.from_dicts(lotteries[j]).to_dicts()
+    expected = LotteryBatch.from_lotteries(lotteries)
+    np.testing.assert_allclose(store.batch.expected_values(), expected.expected_values(), rtol=1e-12)
+    chunks = [batch.expected_values() for batch in store.iter_batches(chunk_size=4)]
+    np.testing.assert_allclose(np.concatenate(chunks), expected.expected_values(), rtol=1e-12)
+
+
+def test_batch_round_trip(tmp_path):
+    batch = make_random_lottery_batch(1_000, depth=2, seed=3)
+    store = write_lottery_store(str(tmp_path / 'store'), batch)
+    np.testing.assert_array_equal(store.batch.payoffs, batch.payoffs)
+    np.testing.assert_array_equal(store.batch.probs, batch.probs)
+    np.testing.assert_array_equal(store.batch.offsets, batch.offsets)
+
+
+def test_empty_store_and_overwrite(tmp_path):
+    path = str(tmp_path / 'store')
+    with LotteryStoreWriter(path):
+        pass
+    assert len(open_lottery_store(path)) == 0
+    with pytest.raises(FileExistsError):
+        LotteryStoreWriter(path)
+    write_lottery_store(path, [[{'out': 1.0, 'prob': 1.0}]], overwrite=True)
+    assert open_lottery_store(path)[0].to_dicts() == [{'out': 1.0, 'prob': 1.0}]
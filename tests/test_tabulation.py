@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from risk_preferences import (CRRAUtility, LotteryBatch, PiecewiseUtility, TabulatedUtility, batch_certainty_equivalents,
+                              cara, tabulate_utility)
+
+PIECEWISE_POINTS = [(0, 0), (10, 5), (20, 30), (30, 35), (40, 60), (50, 65), (60, 90), (100, 100)]
+
+
+def _largest_error(table, u, low, high):
+    payoffs = np.linspace(low, high, 100_001)
+    return float(np.max(np.abs(table(payoffs) - np.asarray(u(payoffs), dtype=float))))
+
+
+@pytest.mark.parametrize('u, low, high, tol', [
+    (CRRAUtility(gamma=2.0), 1.0, 100.0, 1e-9),
+    (lambda m: np.sqrt(m), 0.0, 100.0, 1e-6),
+    (lambda m: m + 3.0 * np.sin(m), 0.0, 100.0, 1e-6), #inflection points
+])
+def test_error_bound_holds(u, low, high, tol):
+    table = TabulatedUtility(u, low, high, tol=tol)
+    assert table.error_bound <= tol
+    assert _largest_error(table, u, low, high) <= table.error_bound
+
+
+def test_piecewise_is_exact():
+    u = PiecewiseUtility(PIECEWISE_POINTS)
+    table = TabulatedUtility(u, 0.0, 100.0, points=3, tol=1e-6)
+    assert table.error_bound == 0.0
+    assert _largest_error(table, u, -10.0, 110.0) < 1e-12
+
+
+def test_outside_range_uses_original():
+    table = TabulatedUtility(cara, 1.0, 10.0)
+    assert table(20.0) == cara(20.0)
+    np.testing.assert_array_equal(table(np.array([0.5, 20.0])), [cara(0.5), cara(20.0)])
+
+
+def test_batch_certainty_equivalents(lotteries):
+    u = CRRAUtility(gamma=0.5)
+    batch = LotteryBatch.from_lotteries(lotteries)
+    table = tabulate_utility(u, lotteries, tol=1e-10)
+    np.testing.assert_allclose(batch_certainty_equivalents(batch, table), batch_certainty_equivalents(batch, u), rtol=1e-6)